@@ -1,24 +1,47 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import os
 import pickle
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import normalize
-from sklearn.metrics.pairwise import cosine_similarity
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from flask_cors import CORS
 from pymongo import MongoClient
-from bson import json_util, ObjectId
+from pymongo.errors import ExecutionTimeout
+from bson import ObjectId
 from sentence_transformers import util
 import torch
 from sentence_transformers import SentenceTransformer
-from tqdm import tqdm
 from datetime import datetime
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import h5py
 import json
+import logging
+import base64
+import contextvars
+import gzip
+import hashlib
+import re
+import sys
+import time
 import unicodedata
-from collections import defaultdict
+import weakref
+from bisect import bisect_left
+from functools import wraps
+from collections import defaultdict, OrderedDict
+
+from bitacora import configurar_logging, id_peticion_actual, iniciar_peticion, terminar_peticion
+from busqueda_exacta import BuscadorExacto, limitar_hilos_blas
+from perfilado import perfilador
+from serializacion import FORMATOS_JSON, serializar, cuerpo_respuesta
+from snapshot import MatrizCSR, abrir_snapshot_actual
+from tiempos import (SERVER_TIMING, etapa, iniciar_medicion, medicion_actual, metricas, registrar_cache,
+                     registrar_consulta_mongo, terminar_medicion)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Sin brotli las respuestas se comprimen solo con gzip
 
 
 def _normalize_name(s):
@@ -32,41 +55,735 @@ def _normalize_name(s):
 app = Flask(__name__)
 CORS(app)
 
-# Data files live in archivos_para_el_backend/ next to this script
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archivos_para_el_backend')
+# ========== LOGGING ==========
+
+# Niveles, formato y muestreo se configuran con AUTHORCOLAB_LOG_* (ver bitacora.py)
+log = configurar_logging()
+
+@app.before_request
+def iniciar_registro_peticion():
+    iniciar_peticion(request.headers.get('X-Request-ID'))
+    request.environ['authorcolab.inicio'] = time.perf_counter()
+    # Tiempos por etapa de la petición (ver tiempos.py)
+    medicion = iniciar_medicion()
+    # Perfil de CPU y memoria si se pidió con X-Perfilar o /api/admin/perfilado (ver perfilado.py)
+    request.environ['authorcolab.perfil'] = perfilador.iniciar(
+        request.headers.get('X-Perfilar'), request.method, request.path, request.full_path.rstrip('?'),
+        id_peticion_actual(), medicion
+    )
+
+@app.after_request
+def registrar_peticion(response):
+    response.headers['X-Request-ID'] = id_peticion_actual()
+    ms = (time.perf_counter() - request.environ['authorcolab.inicio']) * 1000
+    log.info("%s %s %s %.1fms", request.method, request.path, response.status_code, ms,
+             extra={'metodo': request.method, 'ruta': request.path, 'estado': response.status_code,
+                    'ms': round(ms, 1)})
+    
+    medicion = medicion_actual()
+    if medicion is not None and (SERVER_TIMING or request.headers.get('X-Server-Timing') == '1'):
+        response.headers['Server-Timing'] = medicion.server_timing()
+    # La ruta es la regla de Flask (/api/instituciones/<pais>), no la URL: pocas series
+    metodo, ruta, estado = request.method, request.url_rule.rule if request.url_rule else 'sin_ruta', response.status_code
+    perfil = request.environ.get('authorcolab.perfil')
+    if perfil is not None:
+        response.headers['X-Perfil'] = perfil if perfil == 'ocupado' else perfil.id
+    
+    def terminar():
+        # En streaming, después de enviar el último byte
+        if perfil is not None and perfil != 'ocupado':
+            perfilador.terminar(perfil, ruta, estado)
+        if medicion is not None:
+            metricas.registrar(medicion, metodo, ruta, estado)
+        terminar_medicion()
+        terminar_peticion()
+    
+    response.call_on_close(terminar)
+    return response
+
+# Data files live in archivos_para_el_backend/ next to this script (o en AUTHORCOLAB_DATA_DIR,
+# p. ej. los datos sintéticos de benchmark_endpoints.py)
+DATA_DIR = os.environ.get('AUTHORCOLAB_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archivos_para_el_backend'))
+
+# Snapshot mapeado en memoria de esos archivos (ver construir_snapshot.py); si no
+# existe se leen los .h5/.pkl originales
+DIR_SNAPSHOTS = os.environ.get('AUTHORCOLAB_SNAPSHOT_DIR', os.path.join(DATA_DIR, 'snapshot'))
 
 # ========== CONFIGURACIÓN MEJORADA CON MATRICES ==========
 
-client = MongoClient('mongodb://localhost:27017/')
-db = client['openalex_ia']
+# ========== REPOSITORIO MONGO ==========
 
-# Cargar el modelo de Sentence Transformers
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Disposición de los datos en MongoDB:
+#   'por_pais'    -> una colección por entidad y país (works_ar, ..., works_ve), la original
+#   'consolidado' -> una colección por entidad (works, institutions, authors, ...) con campo
+#                    'country' y el _id original en 'doc_id' (ver migrar_colecciones_consolidadas.py)
+ALMACENAMIENTO = os.environ.get('AUTHORCOLAB_ALMACENAMIENTO', 'por_pais')
 
-# Variables para matrices de obras
-matrices_cargadas = {}
-pca_models = {}
+PAISES_LATAM = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt',
+                'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
 
-# ========== CARGA DE DATOS PARA AUTORES SIMILARES ==========
+# Configuración de la conexión (variables de entorno). El pool debería cubrir los
+# hilos de todos los workers WSGI que comparten el proceso: workers x threads.
+CONFIG_MONGO = {
+    'uri': os.environ.get('AUTHORCOLAB_MONGO_URI', 'mongodb://localhost:27017/'),
+    'db': os.environ.get('AUTHORCOLAB_MONGO_DB', 'openalex_ia'),
+    'max_pool_size': int(os.environ.get('AUTHORCOLAB_MONGO_MAX_POOL', 50)),
+    'min_pool_size': int(os.environ.get('AUTHORCOLAB_MONGO_MIN_POOL', 0)),
+    'server_selection_timeout_ms': int(os.environ.get('AUTHORCOLAB_MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    'connect_timeout_ms': int(os.environ.get('AUTHORCOLAB_MONGO_CONNECT_TIMEOUT_MS', 5000)),
+    'socket_timeout_ms': int(os.environ.get('AUTHORCOLAB_MONGO_SOCKET_TIMEOUT_MS', 30000)),
+    'read_preference': os.environ.get('AUTHORCOLAB_MONGO_READ_PREFERENCE', 'primaryPreferred'),
+    # Documentos por lote del cursor (el primer lote por defecto de MongoDB es de 101)
+    'batch_size': int(os.environ.get('AUTHORCOLAB_MONGO_BATCH_SIZE', 1000)),
+    # Máximo de valores por $in; listas más largas se parten en varias consultas
+    'max_in': int(os.environ.get('AUTHORCOLAB_MONGO_MAX_IN', 5000)),
+    # Segundos entre lecturas de la versión de los datos de MongoDB (ver version_datos)
+    'version_ttl': float(os.environ.get('AUTHORCOLAB_MONGO_VERSION_TTL', 60)),
+}
 
-print("Cargando datos para autores similares desde HDF5 y PCA model...")
+# Documento opcional {'_id': 'version_datos', 'version': ...} que los procesos de carga
+# actualizan al modificar la base; sin él, la versión sale de dbStats
+COLECCION_METADATOS = 'metadatos'
 
-# Cargar modelo PCA
-try:
-    with open(os.path.join(DATA_DIR, 'pca_model_completo_ponderado.pkl'), 'rb') as f:
-        pca_model = pickle.load(f)
-    print("✅ Modelo PCA cargado correctamente")
-except FileNotFoundError:
-    print("⚠️  No se encontró el modelo PCA, continuando sin él...")
-    pca_model = None
-
-# Cargar datos desde HDF5
-authors_df = None
-author_name_to_id = None
-author_id_to_name = None
+# Límites superiores (ms) de los buckets de los histogramas de latencia
+BUCKETS_LATENCIA_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
 
-try:
-    with h5py.File(os.path.join(DATA_DIR, 'autores_reducidos_completo_ponderado.h5'), 'r') as f:
+class HistogramaLatencias:
+    """Histograma de latencias por (colección, operación), seguro entre hilos"""
+    
+    def __init__(self, buckets=BUCKETS_LATENCIA_MS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def registrar(self, coleccion, operacion, segundos):
+        ms = segundos * 1000
+        with self._lock:
+            serie = self._series.get((coleccion, operacion))
+            if serie is None:
+                serie = self._series[(coleccion, operacion)] = {
+                    'conteos': [0] * len(self.buckets), 'total': 0, 'suma_ms': 0.0, 'max_ms': 0.0
+                }
+            serie['conteos'][bisect_left(self.buckets, ms)] += 1
+            serie['total'] += 1
+            serie['suma_ms'] += ms
+            serie['max_ms'] = max(serie['max_ms'], ms)
+    
+    def _percentil(self, serie, q):
+        """Estimación del percentil q como el límite superior del bucket que lo contiene"""
+        objetivo = q * serie['total']
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, serie['conteos']):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return serie['max_ms'] if limite == float('inf') else limite
+        return serie['max_ms']
+    
+    def resumen(self):
+        with self._lock:
+            series = {clave: dict(serie, conteos=list(serie['conteos'])) for clave, serie in self._series.items()}
+        
+        resumen = []
+        for (coleccion, operacion), serie in sorted(series.items()):
+            resumen.append({
+                'coleccion': coleccion,
+                'operacion': operacion,
+                'consultas': serie['total'],
+                'media_ms': serie['suma_ms'] / serie['total'],
+                'p50_ms': self._percentil(serie, 0.50),
+                'p95_ms': self._percentil(serie, 0.95),
+                'p99_ms': self._percentil(serie, 0.99),
+                'max_ms': serie['max_ms'],
+                'buckets': {
+                    ('+Inf' if limite == float('inf') else str(limite)): conteo
+                    for limite, conteo in zip(self.buckets, serie['conteos'])
+                }
+            })
+        return resumen
+
+def _traducir_claves(query):
+    """_id -> doc_id, también dentro de $or / $and / $nor"""
+    return {
+        ('doc_id' if k == '_id' else k): [_traducir_claves(q) for q in v] if k in ('$or', '$and', '$nor') else v
+        for k, v in query.items()
+    }
+
+def _traducir_query(query, paises):
+    """Adapta una query por país a la colección consolidada (_id -> doc_id, + country)"""
+    query = _traducir_claves(query)
+    query['country'] = paises[0] if len(paises) == 1 else {'$in': list(paises)}
+    return query
+
+def _traducir_proyeccion(proyeccion):
+    """
+    Adapta una proyección a la colección consolidada (_id -> doc_id). En una de
+    inclusión se agrega country, y doc_id salvo que se excluya _id; las claves en 0
+    se quitan, porque MongoDB no admite mezclar inclusión y exclusión (salvo _id)
+    """
+    if not proyeccion:
+        return None
+    if any(proyeccion.values()):
+        traducida = {k: v for k, v in proyeccion.items() if k != '_id' and v}
+        # _id se incluye por defecto, igual que en MongoDB
+        if proyeccion.get('_id', 1):
+            traducida['doc_id'] = 1
+        traducida['country'] = 1
+    else:
+        traducida = {('doc_id' if k == '_id' else k): v for k, v in proyeccion.items()}
+    traducida['_id'] = 0
+    return traducida
+
+def _restaurar_documento(doc):
+    """Devuelve el documento consolidado con la forma original (doc_id -> _id) y su país"""
+    doc.pop('_id', None)
+    if 'doc_id' in doc:
+        doc['_id'] = doc.pop('doc_id')
+    return doc.pop('country', None), doc
+
+class PlazoVencido(Exception):
+    """La tarea superó su plazo (ver plazo_consultas) antes de terminar sus consultas"""
+
+# Instante (time.monotonic) tras el cual las consultas de la tarea en curso se abandonan:
+# lo fija cada país de la búsqueda en todos los países para liberar su hilo al vencer
+plazo_consultas = contextvars.ContextVar('plazo_consultas', default=None)
+
+class RepositorioMongo:
+    """
+    Acceso a MongoDB del backend: un único MongoClient con pool y timeouts
+    configurados, consultas por país o consolidadas (ver ALMACENAMIENTO), $in
+    grandes partidos en lotes e histogramas de latencia por colección.
+    """
+    
+    def __init__(self, config=CONFIG_MONGO, almacenamiento=ALMACENAMIENTO):
+        self.config = config
+        self.almacenamiento = almacenamiento
+        self.latencias = HistogramaLatencias()
+        self.reconectar()
+    
+    def reconectar(self):
+        """
+        Crea un MongoClient nuevo. MongoClient no sobrevive a un fork: los workers de
+        gunicorn llaman a esto al arrancar (ver gunicorn.conf.py)
+        """
+        config = self.config
+        self.client = MongoClient(
+            config['uri'],
+            maxPoolSize=config['max_pool_size'],
+            minPoolSize=config['min_pool_size'],
+            serverSelectionTimeoutMS=config['server_selection_timeout_ms'],
+            connectTimeoutMS=config['connect_timeout_ms'],
+            socketTimeoutMS=config['socket_timeout_ms'],
+            readPreference=config['read_preference'],
+            appname='authorcolab-backend',
+        )
+        self.db = self.client[config['db']]
+        # Cache de list_collection_names() para no consultarlo en cada búsqueda
+        self._colecciones = set()
+        self._colecciones_expira = 0.0
+        self._version = ''
+        self._version_expira = 0.0
+    
+    def usar_cliente(self, client):
+        """
+        Usa un cliente ya creado (p. ej. mongomock en benchmark_endpoints.py) en lugar
+        del configurado en CONFIG_MONGO
+        """
+        self.client = client
+        self.db = client[self.config['db']]
+        self._colecciones = set()
+        self._colecciones_expira = 0.0
+        self._version = ''
+        self._version_expira = 0.0
+    
+    def ping(self, timeout_ms=1000):
+        """Comprueba que MongoDB responde; devuelve None o el mensaje de error"""
+        try:
+            self.client.admin.command('ping', maxTimeMS=timeout_ms)
+            return None
+        except Exception as e:
+            return str(e)
+    
+    @property
+    def consolidado(self):
+        return self.almacenamiento == 'consolidado'
+    
+    # ----- colecciones -----
+    
+    def nombres_colecciones(self, ttl=60):
+        """Nombres de las colecciones de la base, refrescados cada ttl segundos"""
+        ahora = time.monotonic()
+        if ahora >= self._colecciones_expira:
+            inicio = time.perf_counter()
+            self._colecciones = set(self.db.list_collection_names())
+            self.latencias.registrar('*', 'list_collection_names', time.perf_counter() - inicio)
+            self._colecciones_expira = ahora + ttl
+        return self._colecciones
+    
+    def version_datos(self):
+        """
+        Versión de los datos de la base, releída cada CONFIG_MONGO['version_ttl']
+        segundos: el campo 'version' del documento 'version_datos' de
+        COLECCION_METADATOS o, si no existe, objetos y bytes de dbStats (cambian al
+        insertar, borrar o modificar documentos). Si MongoDB no responde se conserva
+        la última versión leída.
+        """
+        ahora = time.monotonic()
+        if ahora < self._version_expira:
+            return self._version
+        self._version_expira = ahora + self.config.get('version_ttl', 60)
+        inicio = time.perf_counter()
+        try:
+            metadatos = self.db[COLECCION_METADATOS].find_one({'_id': 'version_datos'}, max_time_ms=1000)
+            if metadatos and metadatos.get('version') is not None:
+                self._version = f"doc:{metadatos['version']}"
+            else:
+                stats = self.db.command('dbStats', maxTimeMS=1000)
+                self._version = f"stats:{stats.get('objects')}:{stats.get('dataSize')}"
+        except Exception as e:
+            log.warning("No se pudo leer la versión de los datos de MongoDB: %s", e)
+        self.latencias.registrar('*', 'version_datos', time.perf_counter() - inicio)
+        return self._version
+    
+    def coleccion_existe(self, nombre):
+        return nombre in self.nombres_colecciones()
+    
+    def existe_entidad(self, entidad, pais):
+        """Indica si hay datos de la entidad (works, institutions, ...) para el país"""
+        if self.consolidado:
+            return self.coleccion_existe(entidad)
+        return self.coleccion_existe(f'{entidad}_{pais.lower()}')
+    
+    def paises_con_entidad(self, entidad):
+        """Países que tienen colección para la entidad"""
+        if self.consolidado:
+            return list(PAISES_LATAM)
+        prefijo = f'{entidad}_'
+        return sorted(col[len(prefijo):] for col in self.nombres_colecciones() if col.startswith(prefijo))
+    
+    # ----- consultas -----
+    
+    def _partir_in(self, query):
+        """
+        Parte un {'_id': {'$in': [...]}} demasiado grande en varias queries equivalentes
+        (en la colección consolidada la clave ya viene traducida a doc_id)
+        """
+        clave = 'doc_id' if 'doc_id' in query else '_id'
+        condicion = query.get(clave)
+        if not isinstance(condicion, dict) or len(condicion) != 1 or '$in' not in condicion:
+            return [query]
+        valores = list(condicion['$in'])
+        tamano = self.config['max_in']
+        if len(valores) <= tamano:
+            return [query]
+        return [dict(query, **{clave: {'$in': valores[i:i + tamano]}}) for i in range(0, len(valores), tamano)]
+    
+    def _find(self, coleccion, query, proyeccion, limite=0):
+        """Itera los documentos de find() registrando el tiempo que pasa esperando a MongoDB"""
+        transcurrido = 0.0
+        operacion = 'find_one' if limite == 1 else 'find'
+        plazo = plazo_consultas.get()
+        try:
+            for sub_query in self._partir_in(query):
+                inicio = time.perf_counter()
+                cursor = self.db[coleccion].find(sub_query, proyeccion, limit=limite)
+                if plazo is not None:
+                    restante = plazo - time.monotonic()
+                    if restante <= 0:
+                        raise PlazoVencido(f'plazo vencido antes de consultar {coleccion}')
+                    # MongoDB corta la consulta (ExecutionTimeout) si no termina a tiempo
+                    cursor = cursor.max_time_ms(max(1, int(restante * 1000)))
+                cursor = iter(cursor.batch_size(self.config['batch_size']))
+                transcurrido += time.perf_counter() - inicio
+                while True:
+                    inicio = time.perf_counter()
+                    doc = next(cursor, None)
+                    transcurrido += time.perf_counter() - inicio
+                    if doc is None:
+                        break
+                    yield doc
+        finally:
+            self.latencias.registrar(coleccion, operacion, transcurrido)
+            registrar_consulta_mongo(transcurrido)
+    
+    def buscar(self, entidad, pais, query, proyeccion=None, limite=0):
+        """find() sobre la entidad de un país; devuelve los documentos con su forma original"""
+        pais = pais.lower()
+        if not self.consolidado:
+            return self._find(f'{entidad}_{pais}', query, proyeccion, limite)
+        cursor = self._find(entidad, _traducir_query(query, [pais]), _traducir_proyeccion(proyeccion), limite)
+        return (_restaurar_documento(doc)[1] for doc in cursor)
+    
+    def buscar_uno(self, entidad, pais, query, proyeccion=None):
+        """find_one() sobre la entidad de un país"""
+        documentos = self.buscar(entidad, pais, query, proyeccion, limite=1)
+        try:
+            return next(documentos, None)
+        finally:
+            documentos.close()
+    
+    def buscar_en_paises(self, entidad, paises, query, proyeccion=None):
+        """
+        find() sobre la entidad en varios países. Con almacenamiento consolidado es una
+        sola consulta con country $in; por país recorre las colecciones existentes.
+        Devuelve pares (pais, documento).
+        """
+        paises = [p.lower() for p in paises]
+        if self.consolidado:
+            cursor = self._find(entidad, _traducir_query(query, paises), _traducir_proyeccion(proyeccion))
+            return (_restaurar_documento(doc) for doc in cursor)
+        return (
+            (pais, doc)
+            for pais in paises if self.coleccion_existe(f'{entidad}_{pais}')
+            for doc in self._find(f'{entidad}_{pais}', query, proyeccion)
+        )
+    
+    def buscar_uno_en_paises(self, entidad, paises, query, proyeccion=None):
+        """
+        Primer documento que cumple la query, respetando el orden de preferencia de paises.
+        Devuelve (pais, documento) o (None, None).
+        """
+        paises = [p.lower() for p in paises]
+        if self.consolidado:
+            encontrados = dict(self.buscar_en_paises(entidad, paises, query, proyeccion))
+            for pais in paises:
+                if pais in encontrados:
+                    return pais, encontrados[pais]
+            return None, None
+        for pais in paises:
+            if self.coleccion_existe(f'{entidad}_{pais}'):
+                doc = self.buscar_uno(entidad, pais, query, proyeccion)
+                if doc:
+                    return pais, doc
+        return None, None
+    
+    # ----- estadísticas -----
+    
+    def estadisticas(self):
+        config = {k: v for k, v in self.config.items() if k != 'uri'}
+        return {
+            'almacenamiento': self.almacenamiento,
+            'config': config,
+            'latencias': self.latencias.resumen()
+        }
+
+repositorio = RepositorioMongo()
+
+# ========== CACHES DE RESULTADOS ==========
+
+def tamano_aproximado(valor, _profundidad=0):
+    """Estimación barata (en bytes) del tamaño de un resultado para la eviction de las caches"""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if _profundidad > 3:
+        return sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            tamano_aproximado(k, _profundidad + 1) + tamano_aproximado(v, _profundidad + 1) for k, v in valor.items()
+        )
+    if isinstance(valor, (list, tuple)):
+        if len(valor) > 100:
+            # Muestrear listas largas
+            muestra = valor[::len(valor) // 100]
+            return sys.getsizeof(valor) + len(valor) * sum(
+                tamano_aproximado(v, _profundidad + 1) for v in muestra
+            ) // len(muestra)
+        return sys.getsizeof(valor) + sum(tamano_aproximado(v, _profundidad + 1) for v in valor)
+    return sys.getsizeof(valor)
+
+# Caches registradas por nombre (para las estadísticas)
+caches_resultados = {}
+
+class CacheResultados:
+    """
+    Cache LRU segura entre hilos, con límite de tamaño en bytes estimados y
+    expiración opcional (ttl, en segundos). Lleva la cuenta de aciertos y fallos.
+    """
+    
+    def __init__(self, nombre, max_bytes, ttl=None):
+        self.nombre = nombre
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (valor, tamaño, expira)
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.evictions = 0
+        caches_resultados[nombre] = self
+    
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[2] is not None and entrada[2] < time.monotonic():
+                self._quitar(clave)
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+            else:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+        registrar_cache(self.nombre, entrada is not None)
+        return None if entrada is None else entrada[0]
+    
+    def guardar(self, clave, valor, tamano=None):
+        tamano = tamano_aproximado(valor) if tamano is None else tamano
+        if tamano > self.max_bytes:
+            return
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (valor, tamano, expira)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.evictions += 1
+    
+    def _quitar(self, clave):
+        _, tamano, _ = self._entradas.pop(clave)
+        self._bytes -= tamano
+    
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+    
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'evictions': self.evictions
+            }
+
+# ========== CARGA DE COMPONENTES ==========
+
+class ComponenteNoDisponible(Exception):
+    """Un componente necesario para la petición falló al cargarse"""
+
+class CargadorComponentes:
+    """
+    Carga por etapas de los componentes pesados del backend (modelo de embeddings,
+    PCA, autores, matrices de obras). Cada componente se carga una sola vez, en un
+    hilo propio: todos en paralelo al arrancar (iniciar_en_segundo_plano) o, si aún
+    no empezó, en la primera petición que lo necesita (asegurar). Mientras tanto
+    los endpoints que no lo usan responden normalmente.
+    """
+    
+    def __init__(self, hilos=4):
+        self._cargadores = {}
+        self._futuros = {}
+        self._errores = {}
+        self._segundos = {}
+        self._lock = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='carga')
+    
+    def registrar(self, nombre, funcion):
+        self._cargadores[nombre] = funcion
+    
+    def _cargar(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            self._cargadores[nombre]()
+        except Exception as e:
+            self._errores[nombre] = str(e)
+            log.error("Error cargando %s: %s", nombre, e)
+        finally:
+            self._segundos[nombre] = round(time.perf_counter() - inicio, 2)
+    
+    def _iniciar(self, nombre):
+        with self._lock:
+            if nombre not in self._futuros:
+                self._futuros[nombre] = self._ejecutor.submit(self._cargar, nombre)
+            return self._futuros[nombre]
+    
+    def iniciar_en_segundo_plano(self, nombres=None):
+        for nombre in nombres or self._cargadores:
+            self._iniciar(nombre)
+    
+    def asegurar(self, *nombres):
+        """Espera a que los componentes estén cargados (iniciando su carga si hace falta)"""
+        futuros = [(nombre, self._iniciar(nombre)) for nombre in nombres]
+        for nombre, futuro in futuros:
+            futuro.result()
+            if nombre in self._errores:
+                raise ComponenteNoDisponible(f'{nombre}: {self._errores[nombre]}')
+    
+    def asegurar_todos(self):
+        self.iniciar_en_segundo_plano()
+        for nombre in self._cargadores:
+            self._futuros[nombre].result()
+    
+    def estado(self):
+        """Estado de cada componente: 'pendiente', 'cargando', 'listo' o 'error'"""
+        estados = {}
+        for nombre in self._cargadores:
+            futuro = self._futuros.get(nombre)
+            if futuro is None:
+                estados[nombre] = {'estado': 'pendiente'}
+            elif not futuro.done():
+                estados[nombre] = {'estado': 'cargando'}
+            elif nombre in self._errores:
+                estados[nombre] = {'estado': 'error', 'error': self._errores[nombre]}
+            else:
+                estados[nombre] = {'estado': 'listo', 'segundos': self._segundos.get(nombre)}
+        return estados
+
+componentes = CargadorComponentes()
+
+def requiere_componentes(*nombres):
+    """
+    Decorador para endpoints: espera a que los componentes estén cargados antes de
+    atender la petición; responde 503 si alguno falló al cargarse
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            try:
+                componentes.asegurar(*nombres)
+            except ComponenteNoDisponible as e:
+                return jsonify({'error': f'Componente no disponible: {e}'}), 503
+            return vista(*args, **kwargs)
+        return envoltura
+    return decorador
+
+# Puntajes y top k exactos por bloques en paralelo, para obras y autores
+buscador_exacto = BuscadorExacto()
+
+# Modelo de embeddings (se asigna al cargarse, ver componentes.registrar más abajo).
+# Los datos precalculados viven en un ConjuntoDatos por versión (ver registro_datos)
+model = None
+
+# Cache binaria de los datos de autores ya procesados (DataFrame e índices): evita
+# decodificar el HDF5 y hacer json.loads por fila en cada arranque
+DIR_CACHE = os.environ.get('AUTHORCOLAB_CACHE_DIR', os.path.join(DATA_DIR, 'cache'))
+
+def calcular_version_datos(version_snapshot=None):
+    """
+    Versión de los datos servidos: huella de la versión del snapshot, o de los
+    archivos de archivos_para_el_backend (nombre, tamaño y fecha de modificación), y
+    del nombre de la base de MongoDB. Se puede fijar con AUTHORCOLAB_VERSION_DATOS.
+    Los cambios en el contenido de la base los sigue version_resultados.
+    """
+    if os.environ.get('AUTHORCOLAB_VERSION_DATOS'):
+        return os.environ['AUTHORCOLAB_VERSION_DATOS']
+    huella = hashlib.sha1(CONFIG_MONGO['db'].encode('utf-8'))
+    if version_snapshot:
+        huella.update(version_snapshot.encode('utf-8'))
+    elif os.path.isdir(DATA_DIR):
+        for nombre in sorted(os.listdir(DATA_DIR)):
+            if nombre.endswith(('.h5', '.pkl')):
+                info = os.stat(os.path.join(DATA_DIR, nombre))
+                huella.update(f'{nombre}:{info.st_size}:{info.st_mtime_ns}'.encode('utf-8'))
+    return huella.hexdigest()[:16]
+
+# Partes de un ConjuntoDatos, cada una con su cargador (ver CARGADORES_DATOS)
+PARTES_DATOS = ('pca_autores', 'autores', 'conceptos_autores', 'vecinos_autores', 'matrices_obras', 'columnas_obras')
+
+class ConjuntoDatos:
+    """
+    Una versión de los datos precalculados: modelo PCA de autores, autores e índice
+    de nombres, matrices de obras y sus modelos PCA. Cada parte se carga una sola
+    vez (cargar) y después no se modifica; para cambiar de versión se crea otro
+    conjunto (ver RegistroDatos).
+    """
+    
+    def __init__(self, version, snapshot=None):
+        self.version = version
+        self.snapshot = snapshot  # Snapshot mapeado en memoria, o None para leer los .h5/.pkl
+        self.pca_model = None
+        self.authors_df = None
+        self.author_name_to_id = None
+        self.author_id_to_name = None
+        self.indice_ids_autores = None  # pd.Index de 'Author ID': ID -> fila de authors_df
+        self.vectores_autores = None    # Vectores de authors_df normalizados (float32), para productos en lote
+        self.colaboraciones_autores = None  # 'Collaboration Count' normalizado entre 0 y 1 (ranking híbrido)
+        self.indice_nombres_autores = None
+        self.conceptos_autores = None
+        self.vecinos_autores = None
+        self.nombres_instituciones_autores = []
+        self.matriz_obras = None  # El snapshot o el h5py.File de matriz_obras_separadas.h5
+        self.pca_models = {}
+        self.datos_obras = None   # Ver obtener_datos_matriz_obras
+        self.columnas_obras = None  # Citas y años de las obras de la matriz (ver ColumnasObras)
+        self._cargadas = set()
+        self._locks = {parte: threading.Lock() for parte in PARTES_DATOS}
+    
+    def ruta_artefacto(self, nombre):
+        """Ruta de un .pkl: la copia del snapshot si la tiene, o la de DATA_DIR"""
+        if self.snapshot is not None and self.snapshot.tiene(nombre):
+            return self.snapshot.ruta(nombre)
+        return os.path.join(DATA_DIR, nombre)
+    
+    def cargar(self, parte):
+        with self._locks[parte]:
+            if parte not in self._cargadas:
+                CARGADORES_DATOS[parte](self)
+                self._cargadas.add(parte)
+    
+    def cargar_todo(self):
+        with ThreadPoolExecutor(max_workers=len(PARTES_DATOS), thread_name_prefix='carga-datos') as ejecutor:
+            list(ejecutor.map(self.cargar, PARTES_DATOS))
+    
+    def disponibles(self):
+        """Partes cargadas con datos (no cuentan las que faltan por archivos ausentes)"""
+        valores = {'pca_autores': self.pca_model, 'autores': self.authors_df,
+                   'conceptos_autores': self.conceptos_autores, 'vecinos_autores': self.vecinos_autores,
+                   'matrices_obras': self.matriz_obras, 'columnas_obras': self.columnas_obras}
+        return {parte for parte, valor in valores.items() if valor is not None}
+    
+    def calentar(self):
+        """Recorre una vez los vectores de obras para traer a memoria las páginas del snapshot"""
+        if self.datos_obras is None:
+            return
+        for nombre in ('titulo_normalizado', 'conceptos_normalizado'):
+            vectores = self.datos_obras[nombre]
+            for inicio in range(0, len(vectores), 65536):
+                np.sum(vectores[inicio:inicio + 65536])
+
+def nuevo_conjunto_datos():
+    """ConjuntoDatos (aún sin cargar) del snapshot activo de DIR_SNAPSHOTS, o de los archivos originales"""
+    try:
+        snapshot = abrir_snapshot_actual(DIR_SNAPSHOTS)
+    except Exception as e:
+        log.warning("No se pudo abrir el snapshot en %s: %s", DIR_SNAPSHOTS, e)
+        snapshot = None
+    return ConjuntoDatos(calcular_version_datos(snapshot.version if snapshot else None), snapshot)
+
+def cargar_modelo():
+    """Cargar el modelo de Sentence Transformers"""
+    global model
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    log.info("Modelo de embeddings cargado")
+
+def cargar_pca_autores(conjunto):
+    try:
+        with open(conjunto.ruta_artefacto('pca_model_completo_ponderado.pkl'), 'rb') as f:
+            conjunto.pca_model = pickle.load(f)
+        log.info("Modelo PCA cargado correctamente")
+    except FileNotFoundError:
+        log.warning("No se encontró el modelo PCA, continuando sin él...")
+
+# ========== CARGA DE DATOS PARA AUTORES SIMILARES ==========
+
+def extract_institution_names(institutions_json):
+    """Extraer nombres de instituciones desde el string JSON"""
+    try:
+        instituciones = json.loads(institutions_json)
+        return [inst.get('display_name', '') for inst in instituciones if inst.get('display_name')]
+    except:
+        return []
+
+def _leer_autores_h5(ruta):
+    """Lee el HDF5 de autores y devuelve (DataFrame sin la columna Vector, vectores reducidos)"""
+    with h5py.File(ruta, 'r') as f:
         vectores_reducidos = f['autores_reducidos'][:]
         metadata_group = f['metadata']
         
@@ -79,51 +796,388 @@ try:
             'institutions_json': [inst.decode('utf-8') if isinstance(inst, bytes) else inst for inst in metadata_group['institutions_json'][:]]
         }
 
-    print(f"✅ Datos de autores cargados: {len(metadata['ids'])} autores, {vectores_reducidos.shape[1]} dimensiones")
+    log.info("Datos de autores cargados: %s autores, %s dimensiones", len(metadata['ids']), vectores_reducidos.shape[1])
+    
+    # Los índices por Author ID (get_indexer) exigen IDs únicos: se conserva la primera fila de cada uno
+    repetidos = pd.Index(metadata['ids']).duplicated()
+    if repetidos.any():
+        log.warning("%s filas con Author ID repetido en %s, se conserva la primera de cada autor",
+                    int(repetidos.sum()), os.path.basename(ruta))
+        unicos = np.flatnonzero(~repetidos)
+        metadata = {clave: [valores[i] for i in unicos] if isinstance(valores, list) else valores[unicos]
+                    for clave, valores in metadata.items()}
+        vectores_reducidos = vectores_reducidos[unicos]
 
     # Crear DataFrame con la información de los autores
-    print("Creando DataFrame de autores...")
-    authors_df = pd.DataFrame({
+    log.debug("Creando DataFrame de autores...")
+    df = pd.DataFrame({
         'Author ID': metadata['ids'],
         'Name': metadata['nombres'],
         'Country': metadata['paises'],
         'Collaboration Count': metadata['collaboration_counts'],
         'Institutions JSON': metadata['institutions_json'],
-        'Vector': list(vectores_reducidos)  # Vectores reducidos por PCA
     })
 
-    # Función para extraer nombres de instituciones desde JSON
-    def extract_institution_names(institutions_json):
-        """Extraer nombres de instituciones desde el string JSON"""
-        try:
-            instituciones = json.loads(institutions_json)
-            return [inst.get('display_name', '') for inst in instituciones if inst.get('display_name')]
-        except:
-            return []
-
     # Agregar nombres de instituciones al DataFrame
-    authors_df['Institution Names'] = authors_df['Institutions JSON'].apply(extract_institution_names)
-    authors_df['Primary Institution'] = authors_df['Institution Names'].apply(
+    df['Institution Names'] = df['Institutions JSON'].apply(extract_institution_names)
+    df['Primary Institution'] = df['Institution Names'].apply(
         lambda x: x[0] if x else 'Sin institución'
     )
+    return df, vectores_reducidos
+
+# Cambia si cambia lo que se guarda en la cache (p. ej. la estructura del índice)
+FORMATO_CACHE_AUTORES = 3
+
+def _ruta_cache_autores(ruta_h5):
+    """La cache se invalida sola si cambia el HDF5 (tamaño o fecha de modificación)"""
+    info = os.stat(ruta_h5)
+    return os.path.join(DIR_CACHE, f'autores_v{FORMATO_CACHE_AUTORES}_{info.st_size}_{info.st_mtime_ns}.pkl')
 
+def _guardar_cache_autores(ruta_cache, datos):
+    try:
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        temporal = f'{ruta_cache}.{os.getpid()}.tmp'
+        with open(temporal, 'wb') as f:
+            pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta_cache)
+        log.info("Cache de autores guardada en %s", ruta_cache)
+    except OSError as e:
+        log.warning("No se pudo guardar la cache de autores: %s", e)
+
+def _datos_autores_snapshot(snapshot):
+    """Datos de autores desde el snapshot: vectores e índice de nombres mapeados en memoria"""
+    instituciones = list(snapshot.textos('autores_nombres_instituciones'))
+    instituciones_autor = snapshot.csr('autores_instituciones')
+    indptr = instituciones_autor.indptr.tolist()
+    indices = instituciones_autor.indices.tolist()
+    nombres_instituciones = [[instituciones[j] for j in indices[a:b]] for a, b in zip(indptr, indptr[1:])]
+    
+    df = pd.DataFrame({
+        'Author ID': list(snapshot.textos('autores_ids')),
+        'Name': list(snapshot.textos('autores_nombres')),
+        'Country': list(snapshot.textos('autores_paises')),
+        'Collaboration Count': np.array(snapshot.array('autores_collaboration_counts')),
+        'Institutions JSON': list(snapshot.textos('autores_instituciones_json')),
+        'Institution Names': nombres_instituciones,
+        'Primary Institution': [x[0] if x else 'Sin institución' for x in nombres_instituciones]
+    })
+    return {
+        'autores': df,
+        'vectores': snapshot.array('autores_vectores'),
+        'indice': IndiceNombresAutores.desde_csr(
+            snapshot.textos('autores_vocabulario'), snapshot.csr('autores_postings'), df['Author ID'].values
+        ),
+        'instituciones': instituciones
+    }
+
+def cargar_autores(conjunto):
+    """
+    DataFrame de autores, diccionarios nombre <-> ID, índice de nombres y lista de
+    instituciones, desde el snapshot, la cache binaria o el HDF5
+    """
+    log.info("Cargando datos para autores similares desde HDF5 y PCA model...")
+    ruta = os.path.join(DATA_DIR, 'autores_reducidos_completo_ponderado.h5')
+    snapshot = conjunto.snapshot
+    if snapshot is not None and snapshot.tiene('autores_vectores'):
+        datos = _datos_autores_snapshot(snapshot)
+        log.info("Datos de autores cargados desde el snapshot: %s autores", len(datos['autores']))
+    elif not os.path.exists(ruta):
+        log.warning("No se encontró el archivo HDF5 de autores, la funcionalidad de autores similares no estará disponible")
+        return
+    elif os.path.exists(_ruta_cache_autores(ruta)):
+        with open(_ruta_cache_autores(ruta), 'rb') as f:
+            datos = pickle.load(f)
+        log.info("Datos de autores cargados desde la cache: %s autores", len(datos['autores']))
+    else:
+        df, vectores = _leer_autores_h5(ruta)
+        instituciones = set()
+        for nombres in df['Institution Names']:
+            instituciones.update(nombres)
+        datos = {
+            'autores': df,
+            'vectores': vectores,
+            'indice': IndiceNombresAutores(df['Author ID'].values, df['Name'].values),
+            'instituciones': sorted(instituciones)
+        }
+        _guardar_cache_autores(_ruta_cache_autores(ruta), datos)
+    
+    df = datos['autores']
+    if not df['Author ID'].is_unique:
+        # Solo un snapshot anterior a la deduplicación de _leer_autores_h5 puede llegar aquí
+        raise ValueError("Author ID repetido en los datos de autores: vuelva a construir el snapshot")
+    
     # Crear diccionarios para búsqueda rápida
-    author_name_to_id = {name: author_id for author_id, name in zip(metadata['ids'], metadata['nombres'])}
-    author_id_to_name = {author_id: name for author_id, name in zip(metadata['ids'], metadata['nombres'])}
+    conjunto.author_name_to_id = {name: author_id for author_id, name in zip(df['Author ID'], df['Name'])}
+    conjunto.author_id_to_name = {author_id: name for author_id, name in zip(df['Author ID'], df['Name'])}
+    conjunto.indice_nombres_autores = datos['indice']
+    conjunto.nombres_instituciones_autores = datos['instituciones']
+    conjunto.indice_ids_autores = pd.Index(df['Author ID'])
+    # Vectores reducidos por PCA con filas de norma 1: la similitud coseno es un
+    # producto punto (las filas nulas quedan en 0)
+    conjunto.vectores_autores = np.nan_to_num(normalizar_filas(np.asarray(datos['vectores'], dtype=np.float32)))
+    conjunto.colaboraciones_autores = normalizar_conteos(df['Collaboration Count'].values)
+    conjunto.authors_df = df
+    
+    log.info("Índice de nombres de autores: %s tokens", len(datos['indice'].vocabulario))
+    log.info("Datos de autores procesados correctamente")
+
+# ========== ÍNDICE DE NOMBRES DE AUTORES ==========
+
+# Máximo de autores distintos que puede resolver un filtro por nombre; por encima
+# (p. ej. "a") se vuelve al $regex para no mandar un $in gigante a MongoDB
+MAX_AUTORES_FILTRO = 5000
+
+def _tokenizar_nombre(nombre):
+    """Tokens de un nombre normalizados igual que _normalize_name (sin acentos, minúsculas)"""
+    return [t for t in re.split(r'[^0-9a-z]+', _normalize_name(nombre)) if t]
+
+class IndiceNombresAutores:
+    """
+    Índice invertido token -> filas de autores, construido desde la metadata HDF5.
+    Un nombre de consulta coincide con un autor si cada token de la consulta es
+    prefijo de algún token de su nombre ("andres carv" -> "Andrés Carvallo").
+    """
+    
+    def __init__(self, ids, nombres):
+        postings = defaultdict(list)
+        for fila, nombre in enumerate(nombres):
+            for token in set(_tokenizar_nombre(nombre)):
+                postings[token].append(fila)
+        
+        vocabulario = sorted(postings)
+        self._inicializar(vocabulario, MatrizCSR.desde_listas([postings[token] for token in vocabulario]), ids)
+    
+    @classmethod
+    def desde_csr(cls, vocabulario, postings, ids):
+        """Índice ya construido (p. ej. mapeado en memoria desde el snapshot)"""
+        indice = cls.__new__(cls)
+        indice._inicializar(vocabulario, postings, ids)
+        return indice
+    
+    def _inicializar(self, vocabulario, postings, ids):
+        self.vocabulario = vocabulario  # Tokens ordenados (lista o TablaTextos)
+        self.postings = postings        # MatrizCSR: token -> filas de autores, ordenadas
+        self.ids = np.asarray(ids, dtype=object)
+    
+    def _filas_con_prefijo(self, prefijo):
+        """Filas de autores con algún token que empieza por prefijo (búsqueda binaria en el vocabulario)"""
+        inicio = bisect_left(self.vocabulario, prefijo)
+        fin = bisect_left(self.vocabulario, prefijo + '\uffff', lo=inicio)
+        if inicio == fin:
+            return np.empty(0, dtype=np.int32)
+        # Los tokens con el prefijo son contiguos en el vocabulario: sus postings también
+        filas = self.postings.indices[self.postings.indptr[inicio]:self.postings.indptr[fin]]
+        if fin - inicio == 1:
+            return filas
+        return np.unique(filas)
+    
+    def resolver(self, nombre, limite=None):
+        """Devuelve los IDs de autor cuyo nombre contiene todos los tokens de la consulta"""
+        tokens = _tokenizar_nombre(nombre)
+        if not tokens:
+            return []
+        
+        filas = None
+        # Empezar por los tokens más largos, que suelen ser los más selectivos
+        for token in sorted(tokens, key=len, reverse=True):
+            filas_token = self._filas_con_prefijo(token)
+            filas = filas_token if filas is None else np.intersect1d(filas, filas_token, assume_unique=True)
+            if len(filas) == 0:
+                return []
+        
+        if limite is not None and len(filas) > limite:
+            return None
+        return self.ids[filas].tolist()
+
+def resolver_filtro_autor(nombre):
+    """
+    Resuelve el filtro 'autor' a una lista de IDs de autor usando el índice de nombres.
+    Devuelve None si el índice no está disponible o el nombre es demasiado ambiguo.
+    """
+    componentes.asegurar('autores')
+    indice = datos_activos().indice_nombres_autores
+    if indice is None:
+        return None
+    return indice.resolver(nombre, limite=MAX_AUTORES_FILTRO)
+
+PREFIJO_OPENALEX = 'https://openalex.org/'
+
+def variantes_id_openalex(ids):
+    """
+    Cada ID de OpenAlex en sus dos formas ('A123' y 'https://openalex.org/A123'): el
+    Author ID del HDF5 y authorships.author.id no tienen por qué usar la misma
+    """
+    variantes = []
+    for id_ in ids:
+        corto = id_[len(PREFIJO_OPENALEX):] if id_.startswith(PREFIJO_OPENALEX) else id_
+        variantes += [corto, PREFIJO_OPENALEX + corto]
+    return variantes
+
+def obtener_trabajos_de_autores(pais, author_ids):
+    """
+    Obtiene el conjunto de work_ids de los autores desde la posting list
+    author_works_<pais> (creada con crear_indice_autores.py).
+    Devuelve None si la colección no existe en esta base.
+    """
+    if not repositorio.existe_entidad('author_works', pais):
+        return None
+    
+    relaciones = repositorio.buscar(
+        'author_works', pais,
+        {'author_id': {'$in': author_ids}},
+        {'_id': 0, 'work_id': 1}
+    )
+    return {r['work_id'] for r in relaciones}
+
+# ========== VECINOS PRECALCULADOS DE AUTORES ==========
+
+# Tabla de los K autores más similares de cada autor (ver construir_vecinos_autores.py)
+ARCHIVO_VECINOS_AUTORES = 'vecinos_autores.h5'
+
+class VecinosAutores:
+    """
+    Los K autores más similares de cada autor: fila de authors_df -> filas de sus
+    vecinos, de más a menos similar (int32, -1 donde no hay vecino). Las similitudes
+    se recalculan al responder (ver similares_desde_vecinos), así que no se cargan.
+    """
+    
+    def __init__(self, vecinos):
+        self.vecinos = vecinos
+    
+    @property
+    def k(self):
+        return self.vecinos.shape[1]
 
-    print("✅ Datos de autores procesados correctamente")
+def huella_autores(ids, vectores):
+    """
+    Huella de los IDs y vectores normalizados de los autores. construir_vecinos_autores.py
+    la guarda en la tabla para detectar que se calculó con otro HDF5 de autores.
+    """
+    huella = hashlib.sha1('\n'.join(map(str, ids)).encode('utf-8'))
+    huella.update(np.ascontiguousarray(vectores, dtype=np.float32))
+    return huella.hexdigest()
 
-except FileNotFoundError:
-    print("⚠️  No se encontró el archivo HDF5 de autores, la funcionalidad de autores similares no estará disponible")
-    authors_df = None
-    author_name_to_id = None
-    author_id_to_name = None
+def leer_vecinos_autores_h5(ruta, ids_autores, huella=None):
+    """
+    VecinosAutores del HDF5 con filas y vecinos traducidos a las posiciones de ids_autores.
+    Con 'huella' (ver huella_autores), lanza ValueError si la tabla es de otros autores.
+    """
+    with h5py.File(ruta, 'r') as f:
+        if huella is not None and f.attrs.get('huella_autores') != huella:
+            raise ValueError(f"{os.path.basename(ruta)} no corresponde a los datos de autores actuales "
+                             f"(vuelva a ejecutar construir_vecinos_autores.py)")
+        ids = _decodificar(f['autores_ids'][:])
+        vecinos = f['vecinos'][:]
+    
+    # Fila del HDF5 -> fila de ids_autores (-1 si el autor ya no está)
+    posiciones = pd.Index(ids_autores).get_indexer(ids)
+    vecinos = np.where(vecinos >= 0, posiciones[np.maximum(vecinos, 0)], -1).astype(np.int32)
+    
+    filas = pd.Index(ids).get_indexer(ids_autores)
+    alineados = np.full((len(filas), vecinos.shape[1]), -1, dtype=np.int32)
+    alineados[filas >= 0] = vecinos[filas[filas >= 0]]
+    return VecinosAutores(alineados)
+
+def cargar_vecinos_autores(conjunto):
+    """Tabla de vecinos, desde el snapshot o vecinos_autores.h5, alineada con authors_df"""
+    conjunto.cargar('autores')
+    if conjunto.authors_df is None:
+        return
+    
+    snapshot = conjunto.snapshot
+    ruta = os.path.join(DATA_DIR, ARCHIVO_VECINOS_AUTORES)
+    if snapshot is not None and snapshot.tiene('autores_vecinos'):
+        vecinos = VecinosAutores(snapshot.array('autores_vecinos'))
+    elif os.path.exists(ruta):
+        ids = conjunto.authors_df['Author ID']
+        try:
+            # Una tabla de otros autores no es el top-K exacto y omite a los autores nuevos
+            vecinos = leer_vecinos_autores_h5(ruta, ids, huella_autores(ids, conjunto.vectores_autores))
+        except ValueError as e:
+            log.warning("%s; los autores similares se calculan sobre todos los autores", e)
+            return
+    else:
+        log.warning("No se encontró %s, los autores similares se calculan sobre todos los autores", ARCHIVO_VECINOS_AUTORES)
+        return
+    
+    conjunto.vecinos_autores = vecinos
+    log.info("Vecinos de autores cargados: %s autores x %s vecinos", len(vecinos.vecinos), vecinos.k)
 
 # ========== FUNCIONES PARA CONCEPTOS DE AUTORES ==========
 
+# Conceptos de todos los autores precalculados (ver construir_conceptos_autores.py)
+ARCHIVO_CONCEPTOS_AUTORES = 'conceptos_autores.h5'
+
+class ConceptosAutores:
+    """
+    concepts_weighted_by_citations de cada autor como matriz dispersa autor x concepto:
+    adyacencia CSR (fila de authors_df -> columnas de concepto), el puntaje de cada
+    entrada en 'valores' y el nombre de cada columna en 'nombres'
+    """
+    
+    def __init__(self, adyacencia, valores, nombres):
+        self.adyacencia = adyacencia
+        self.valores = valores
+        self.nombres = nombres
+    
+    def top(self, filas, top_n=10):
+        """
+        Conceptos con mayor promedio entre los autores de 'filas': suma de las filas
+        dividida por el número de autores que tienen cada concepto
+        """
+        submatriz, posiciones = self.adyacencia.seleccionar(filas)
+        columnas, inversa = np.unique(submatriz.indices, return_inverse=True)
+        sumas = np.bincount(inversa, weights=self.valores[posiciones], minlength=len(columnas))
+        conteos = np.bincount(inversa, minlength=len(columnas))
+        promedios = sumas / np.maximum(conteos, 1)
+        
+        orden = np.argsort(-promedios, kind='stable')[:top_n]
+        return [
+            {
+                'concepto': self.nombres[columnas[i]],
+                'promedio_ponderado': float(promedios[i]),
+                'total_autores': int(conteos[i])
+            }
+            for i in orden
+        ]
+
+def leer_conceptos_autores_h5(ruta, ids_autores):
+    """ConceptosAutores del HDF5 con las filas reordenadas según ids_autores (sin conceptos si faltan)"""
+    with h5py.File(ruta, 'r') as f:
+        ids = _decodificar(f['autores_ids'][:])
+        nombres = _decodificar(f['conceptos'][:])
+        adyacencia = MatrizCSR(f['indptr'][:], f['indices'][:])
+        valores = f['valores'][:]
+    
+    filas = pd.Index(ids).get_indexer(ids_autores)
+    adyacencia, posiciones = adyacencia.seleccionar(filas)
+    return ConceptosAutores(adyacencia, valores[posiciones], nombres)
+
+def cargar_conceptos_autores(conjunto):
+    """Matriz autor x concepto, desde el snapshot o conceptos_autores.h5, alineada con authors_df"""
+    conjunto.cargar('autores')
+    if conjunto.authors_df is None:
+        return
+    
+    snapshot = conjunto.snapshot
+    ruta = os.path.join(DATA_DIR, ARCHIVO_CONCEPTOS_AUTORES)
+    if snapshot is not None and snapshot.tiene('autores_conceptos'):
+        conceptos = ConceptosAutores(
+            snapshot.csr('autores_conceptos'), snapshot.array('autores_conceptos_valores'), snapshot.textos('conceptos_nombres')
+        )
+    elif os.path.exists(ruta):
+        conceptos = leer_conceptos_autores_h5(ruta, conjunto.authors_df['Author ID'])
+    else:
+        log.warning("No se encontró %s, los conceptos de autores similares se consultarán en MongoDB", ARCHIVO_CONCEPTOS_AUTORES)
+        return
+    
+    conjunto.conceptos_autores = conceptos
+    log.info("Conceptos de autores cargados: %s conceptos, %s entradas", len(conceptos.nombres), len(conceptos.valores))
+
 def obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10):
     """
-    Obtiene los conceptos más comunes entre los autores similares
+    Obtiene los conceptos más comunes entre los autores similares, sumando sus filas
+    de la matriz autor x concepto (o, sin ella, consultando MongoDB)
     
     Args:
         result_df (DataFrame): DataFrame con los autores similares
@@ -133,34 +1187,43 @@ def obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10):
     Returns:
         list: Lista de diccionarios con conceptos y sus promedios ponderados
     """
+    # Obtener todos los IDs de autores (incluyendo el objetivo)
+    author_ids = [target_author_id] + result_df['Author ID'].tolist()
+    
+    datos = datos_activos()
+    try:
+        componentes.asegurar('conceptos_autores')
+    except ComponenteNoDisponible as e:
+        log.warning("Conceptos de autores no disponibles, se consultan en MongoDB: %s", e)
+    if datos.conceptos_autores is not None:
+        filas = datos.indice_ids_autores.get_indexer(author_ids)
+        return datos.conceptos_autores.top(filas[filas >= 0], top_n)
+    
+    return conceptos_autores_mongo(author_ids, top_n)
+
+def conceptos_autores_mongo(author_ids, top_n=10):
+    """Conceptos más comunes de los autores sumando concepts_weighted_by_citations de MongoDB"""
     try:
-        # Obtener todos los IDs de autores (incluyendo el objetivo)
-        author_ids = [target_author_id] + result_df['Author ID'].tolist()
-        
         # Buscar en todas las colecciones de autores por país
         conceptos_acumulados = defaultdict(float)
         conteo_conceptos = defaultdict(int)
         
-        # Obtener lista de colecciones de autores
-        colecciones_autores = [col for col in db.list_collection_names() if col.startswith('authors_')]
+        autores = repositorio.buscar_en_paises(
+            'authors', repositorio.paises_con_entidad('authors'),
+            {'_id': {'$in': author_ids}},
+            {'_id': 1, 'concepts_weighted_by_citations': 1}
+        )
         
-        for coleccion in colecciones_autores:
-            # Buscar autores en esta colección
-            autores = list(db[coleccion].find(
-                {'_id': {'$in': author_ids}},
-                {'_id': 1, 'concepts_weighted_by_citations': 1}
-            ))
+        for _, autor in autores:
+            concepts_data = autor.get('concepts_weighted_by_citations', [])
             
-            for autor in autores:
-                concepts_data = autor.get('concepts_weighted_by_citations', [])
+            for concepto in concepts_data:
+                nombre = concepto.get('display_name')
+                score = concepto.get('weighted_average_score', 0)
                 
-                for concepto in concepts_data:
-                    nombre = concepto.get('display_name')
-                    score = concepto.get('weighted_average_score', 0)
-                    
-                    if nombre and score > 0:
-                        conceptos_acumulados[nombre] += score
-                        conteo_conceptos[nombre] += 1
+                if nombre and score > 0:
+                    conceptos_acumulados[nombre] += score
+                    conteo_conceptos[nombre] += 1
         
         # Calcular promedios y preparar resultados
         conceptos_promedio = []
@@ -179,42 +1242,515 @@ def obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10):
         return conceptos_promedio[:top_n]
     
     except Exception as e:
-        print(f"Error obteniendo conceptos de autores: {str(e)}")
+        log.error("Error obteniendo conceptos de autores: %s", e)
         return []
 
-def cargar_matrices_obras():
-    """Cargar matrices HDF5 y modelos PCA para búsqueda semántica"""
-    global matrices_cargadas, pca_models
-    
+def cargar_matrices_obras(conjunto):
+    """Cargar matrices (snapshot o HDF5) y modelos PCA para búsqueda semántica"""
     try:
         # Cargar matriz principal
-        matrices_cargadas['obras'] = h5py.File(os.path.join(DATA_DIR, 'matriz_obras_separadas.h5'), 'r')
+        snapshot = conjunto.snapshot
+        if snapshot is not None and snapshot.tiene('obras_titulo_normalizado'):
+            matriz = snapshot
+        else:
+            matriz = h5py.File(os.path.join(DATA_DIR, 'matriz_obras_separadas.h5'), 'r')
+            # El archivo se cierra cuando ya nadie usa el conjunto: tras una recarga, al
+            # terminar las peticiones que aún lo tenían fijado (o si esta carga falla)
+            weakref.finalize(conjunto, matriz.close)
         
         # Cargar modelos PCA
-        with open(os.path.join(DATA_DIR, 'pca_titulo.pkl'), 'rb') as f:
-            pca_models['titulo'] = pickle.load(f)
-        with open(os.path.join(DATA_DIR, 'pca_conceptos.pkl'), 'rb') as f:
-            pca_models['conceptos'] = pickle.load(f)
-            
-        print("✅ Matrices de obras cargadas correctamente")
+        with open(conjunto.ruta_artefacto('pca_titulo.pkl'), 'rb') as f:
+            conjunto.pca_models['titulo'] = pickle.load(f)
+        with open(conjunto.ruta_artefacto('pca_conceptos.pkl'), 'rb') as f:
+            conjunto.pca_models['conceptos'] = pickle.load(f)
+        
+        conjunto.matriz_obras = matriz
+        log.info("Matrices de obras cargadas correctamente")
         
     except Exception as e:
-        print(f"⚠️  No se pudieron cargar las matrices: {e}")
-        matrices_cargadas['obras'] = None
+        log.warning("No se pudieron cargar las matrices: %s", e)
+        conjunto.matriz_obras = None
+
+def _decodificar(valores):
+    return [v.decode('utf-8') if isinstance(v, bytes) else v for v in valores]
+
+def normalizar_filas(vectores):
+    """Normaliza cada fila a norma 1 (las filas nulas quedan en NaN)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+
+def normalizar_conteos(valores):
+    """Conteos (citas, colaboraciones) en escala logarítmica entre 0 y 1: log1p(valor) / log1p(máximo)"""
+    escala = np.log1p(np.maximum(np.asarray(valores, dtype=np.float64), 0))
+    maximo = escala.max() if len(escala) else 0
+    return (escala / maximo if maximo > 0 else escala).astype(np.float32)
+
+def instituciones_de_obras_json(instituciones_json):
+    """IDs de institución de cada obra a partir del JSON de la metadata del HDF5"""
+    resultado = []
+    for texto in instituciones_json:
+        try:
+            resultado.append([inst.get('id') for inst in json.loads(texto) if inst.get('id')])
+        except:
+            resultado.append([])
+    return resultado
+
+class InstitucionesDeObras:
+    """IDs de institución de cada obra de la matriz, como adyacencia CSR sobre una tabla de IDs"""
+    
+    def __init__(self, adyacencia, ids_instituciones):
+        self.adyacencia = adyacencia
+        self.ids_instituciones = ids_instituciones
+    
+    def de_obra(self, idx):
+        return [self.ids_instituciones[j] for j in self.adyacencia.fila(idx)]
+
+def _datos_obras_h5(matriz):
+    metadata = matriz['metadata']
+    paises = np.array([p.upper() for p in _decodificar(metadata['paises'][:])])
+    
+    instituciones_obras = instituciones_de_obras_json(_decodificar(metadata['instituciones_json'][:]))
+    ids_instituciones = sorted({i for instituciones in instituciones_obras for i in instituciones})
+    posicion = {institucion_id: j for j, institucion_id in enumerate(ids_instituciones)}
+    adyacencia = MatrizCSR.desde_listas([[posicion[i] for i in instituciones] for instituciones in instituciones_obras])
+    
+    return {
+        'ids': _decodificar(metadata['ids'][:]),
+        'indices_por_pais': {pais: np.flatnonzero(paises == pais) for pais in np.unique(paises)},
+        'instituciones': InstitucionesDeObras(adyacencia, ids_instituciones),
+        'titulo_normalizado': normalizar_filas(matriz['titulo_vectores'][:]),
+        'conceptos_normalizado': normalizar_filas(matriz['conceptos_vectores'][:]),
+    }
+
+def _datos_obras_snapshot(snapshot):
+    por_pais = snapshot.csr('obras_por_pais')
+    return {
+        'ids': snapshot.textos('obras_ids'),
+        'indices_por_pais': {pais: por_pais.fila(i) for i, pais in enumerate(snapshot.manifest['paises_obras'])},
+        'instituciones': InstitucionesDeObras(snapshot.csr('obras_instituciones'), snapshot.textos('obras_ids_instituciones')),
+        'titulo_normalizado': snapshot.array('obras_titulo_normalizado'),
+        'conceptos_normalizado': snapshot.array('obras_conceptos_normalizado'),
+    }
+
+def obtener_datos_matriz_obras():
+    """
+    Metadata y vectores normalizados de la matriz de obras: ids, índices de las obras
+    de cada país, instituciones de cada obra (ver InstitucionesDeObras) y vectores.
+    Del snapshot se abren mapeados en memoria; del HDF5 se leen y procesan al cargar
+    las matrices (cargar_componente_matrices) y se comparten entre peticiones.
+    """
+    return datos_activos().datos_obras
 
-# Cargar matrices al iniciar
-cargar_matrices_obras()
+def indices_obras_pais(pais):
+    """Índices (ordenados) de las obras del país en la matriz"""
+    return obtener_datos_matriz_obras()['indices_por_pais'].get(pais.upper(), np.empty(0, dtype=np.int64))
+
+def cargar_componente_matrices(conjunto):
+    """Matrices de obras, modelos PCA y vectores normalizados listos para buscar"""
+    cargar_matrices_obras(conjunto)
+    matriz = conjunto.matriz_obras
+    if matriz is None:
+        return
+    if matriz is conjunto.snapshot:
+        conjunto.datos_obras = _datos_obras_snapshot(matriz)
+    else:
+        conjunto.datos_obras = _datos_obras_h5(matriz)
+
+# ========== COLUMNAS DE OBRAS PARA EL RANKING HÍBRIDO ==========
+
+# Citas y año de publicación de las obras de la matriz (ver construir_columnas_obras.py)
+ARCHIVO_COLUMNAS_OBRAS = 'columnas_obras.h5'
+
+class ColumnasObras:
+    """
+    Columnas numéricas de las obras de la matriz, alineadas con sus filas: citas
+    normalizadas (ver normalizar_conteos) y año de publicación (0 = desconocido).
+    Se leen en el mismo recorrido que las similitudes (ver ajustes_ranking_trabajos).
+    """
+    
+    def __init__(self, citas, anios):
+        self.citas = normalizar_conteos(citas)
+        self.anios = anios
+        conocidos = np.asarray(anios)[np.asarray(anios) > 0]
+        self.anio_maximo = int(conocidos.max()) if len(conocidos) else 0
+    
+    def recencia(self, filas, vida_media):
+        """0.5 ** (años de diferencia con la obra más reciente / vida_media) de cada fila (0 sin año)"""
+        anios = np.asarray(self.anios[filas], dtype=np.float32)
+        with np.errstate(over='ignore'):
+            decaimiento = np.power(np.float32(0.5), (self.anio_maximo - anios) / np.float32(vida_media))
+        return np.where(anios > 0, decaimiento, 0).astype(np.float32)
+
+def leer_columnas_obras_h5(ruta, ids_obras):
+    """(citas, años) del HDF5 alineados con ids_obras (0 para las obras que no están)"""
+    with h5py.File(ruta, 'r') as f:
+        ids = _decodificar(f['obras_ids'][:])
+        citas = f['cited_by_count'][:]
+        anios = f['publication_year'][:]
+    
+    filas = pd.Index(ids).get_indexer(list(ids_obras))
+    encontradas = filas >= 0
+    citas_alineadas = np.zeros(len(filas), dtype=np.int32)
+    anios_alineados = np.zeros(len(filas), dtype=np.int16)
+    citas_alineadas[encontradas] = citas[filas[encontradas]]
+    anios_alineados[encontradas] = anios[filas[encontradas]]
+    return citas_alineadas, anios_alineados
+
+def cargar_columnas_obras(conjunto):
+    """Citas y años de las obras, desde el snapshot o columnas_obras.h5, alineados con la matriz"""
+    conjunto.cargar('matrices_obras')
+    if conjunto.datos_obras is None:
+        return
+    
+    snapshot = conjunto.snapshot
+    ruta = os.path.join(DATA_DIR, ARCHIVO_COLUMNAS_OBRAS)
+    if snapshot is not None and snapshot.tiene('obras_citas'):
+        columnas = ColumnasObras(snapshot.array('obras_citas'), snapshot.array('obras_anios'))
+    elif os.path.exists(ruta):
+        columnas = ColumnasObras(*leer_columnas_obras_h5(ruta, conjunto.datos_obras['ids']))
+    else:
+        log.warning("No se encontró %s, los trabajos se ordenan solo por similitud", ARCHIVO_COLUMNAS_OBRAS)
+        return
+    
+    conjunto.columnas_obras = columnas
+    log.info("Columnas de obras cargadas: %s obras (año más reciente %s)", len(columnas.citas), columnas.anio_maximo)
+
+CARGADORES_DATOS = {
+    'pca_autores': cargar_pca_autores,
+    'autores': cargar_autores,
+    'conceptos_autores': cargar_conceptos_autores,
+    'vecinos_autores': cargar_vecinos_autores,
+    'matrices_obras': cargar_componente_matrices,
+    'columnas_obras': cargar_columnas_obras,
+}
+
+# ========== VERSIONES DE LOS DATOS ==========
+
+class RegistroDatos:
+    """
+    Versión activa de los datos. Cada petición fija el conjunto activo al empezar
+    (ver fijar_datos_peticion) y lo usa hasta terminar: recargar() carga y calienta
+    la nueva versión en segundo plano y la activa con una sola asignación, sin
+    cortar las peticiones que siguen usando la anterior.
+    """
+    
+    def __init__(self):
+        self.activo = nuevo_conjunto_datos()
+        if self.activo.snapshot is not None:
+            log.info("Usando snapshot %s", self.activo.snapshot.version)
+        self.recargas = 0
+        self.ultima_recarga = None
+        self.error = None
+        self._version_fallida = None
+        self._lock = threading.Lock()  # Una recarga a la vez
+    
+    def recargar(self):
+        """Carga la versión disponible si difiere de la activa; devuelve True si la activó"""
+        with self._lock:
+            nuevo = nuevo_conjunto_datos()
+            if nuevo.version in (self.activo.version, self._version_fallida):
+                return False
+            
+            log.info("Cargando la versión de datos %s (activa: %s)", nuevo.version, self.activo.version)
+            inicio = time.perf_counter()
+            try:
+                nuevo.cargar_todo()
+                faltan = self.activo.disponibles() - nuevo.disponibles()
+                if faltan:
+                    raise ValueError(f"no se pudo cargar: {', '.join(sorted(faltan))}")
+                nuevo.calentar()
+            except Exception as e:
+                # No reintentar la misma versión hasta que cambie otra vez
+                self._version_fallida = nuevo.version
+                self.error = f'{nuevo.version}: {e}'
+                log.error("No se activó la versión de datos %s: %s", nuevo.version, e)
+                return False
+            
+            anterior = self.activo
+            self.activo = nuevo
+            self.recargas += 1
+            self.ultima_recarga = datetime.now().isoformat(timespec='seconds')
+            self.error = None
+            # Las claves de cache_busquedas y cache_respuestas (vía ETag) incluyen la
+            # versión: las entradas anteriores ya no se usan y se liberan aquí.
+            # cache_rankings se conserva para que los cursores abiertos terminen su ranking.
+            cache_busquedas.limpiar()
+            cache_respuestas.limpiar()
+            log.info("Versión de datos %s activa en lugar de %s (%.1fs)",
+                     nuevo.version, anterior.version, time.perf_counter() - inicio)
+            return True
+    
+    def vigilar(self, intervalo):
+        """Revisa cada 'intervalo' segundos, en un hilo aparte, si hay otra versión (p. ej. un nuevo ACTUAL)"""
+        def revisar():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    self.recargar()
+                except Exception as e:
+                    log.error("Error revisando la versión de datos: %s", e)
+        
+        threading.Thread(target=revisar, name='vigilar-datos', daemon=True).start()
+    
+    def estado(self):
+        return {
+            'version': self.activo.version,
+            'snapshot': self.activo.snapshot.version if self.activo.snapshot is not None else None,
+            'recargas': self.recargas,
+            'ultima_recarga': self.ultima_recarga,
+            'error': self.error
+        }
+
+registro_datos = RegistroDatos()
+
+# Segundos entre revisiones de una nueva versión de los datos (0 = no revisar)
+INTERVALO_VIGILANCIA_DATOS = int(os.environ.get('AUTHORCOLAB_VIGILAR_DATOS', 30))
+
+def iniciar_vigilancia_datos():
+    """Con gunicorn se llama en cada worker (post_fork): los hilos no sobreviven al fork"""
+    if INTERVALO_VIGILANCIA_DATOS > 0:
+        registro_datos.vigilar(INTERVALO_VIGILANCIA_DATOS)
+
+_datos_peticion = contextvars.ContextVar('datos_peticion', default=None)
+
+def datos_activos():
+    """Conjunto de datos fijado por la petición en curso, o el activo fuera de una petición"""
+    return _datos_peticion.get() or registro_datos.activo
+
+def version_resultados():
+    """
+    Versión de la que dependen las respuestas y resultados cacheados: la de los datos
+    precalculados más la de MongoDB (repositorio.version_datos), salvo que
+    AUTHORCOLAB_VERSION_DATOS la fije
+    """
+    if os.environ.get('AUTHORCOLAB_VERSION_DATOS'):
+        return datos_activos().version
+    return f'{datos_activos().version}:{repositorio.version_datos()}'
+
+@app.before_request
+def fijar_datos_peticion():
+    _datos_peticion.set(registro_datos.activo)
+
+@app.after_request
+def agregar_version_datos(response):
+    response.headers['X-Dataset-Version'] = datos_activos().version
+    # Soltar el conjunto cuando termina de enviarse la respuesta (en streaming, después
+    # del generador; teardown_request llega antes): si no, el hilo retendría la versión
+    # anterior hasta su próxima petición
+    response.call_on_close(lambda: _datos_peticion.set(None))
+    return response
+
+componentes.registrar('modelo_embeddings', cargar_modelo)
+for _parte in PARTES_DATOS:
+    componentes.registrar(_parte, lambda parte=_parte: datos_activos().cargar(parte))
+
+# ========== RANKING HÍBRIDO ==========
+
+# Pesos por defecto del ranking híbrido (0 = ordenar solo por similitud). Cada
+# petición puede cambiarlos: ver pesos_ranking_trabajos y peso_colaboraciones
+PESO_CITAS_RANKING = float(os.environ.get('AUTHORCOLAB_RANKING_PESO_CITAS', 0))
+PESO_RECENCIA_RANKING = float(os.environ.get('AUTHORCOLAB_RANKING_PESO_RECENCIA', 0))
+VIDA_MEDIA_RECENCIA = float(os.environ.get('AUTHORCOLAB_RANKING_VIDA_MEDIA', 5))
+PESO_COLABORACIONES_RANKING = float(os.environ.get('AUTHORCOLAB_RANKING_PESO_COLABORACIONES', 0))
+
+class ParametroInvalido(ValueError):
+    """Parámetro de la petición fuera de rango (400)"""
+
+def pesos_ranking_trabajos(args):
+    """Pesos del ranking híbrido de trabajos según los parámetros de la petición"""
+    vida_media = args.get('vida_media_recencia', VIDA_MEDIA_RECENCIA, type=float)
+    if vida_media <= 0:
+        raise ParametroInvalido('vida_media_recencia debe ser mayor que 0')
+    return {
+        'citas': args.get('peso_citas', PESO_CITAS_RANKING, type=float),
+        'recencia': args.get('peso_recencia', PESO_RECENCIA_RANKING, type=float),
+        'vida_media': vida_media
+    }
+
+def tabla_columnas_obras(datos):
+    """Columnas de obras del conjunto, o None si no hay"""
+    try:
+        componentes.asegurar('columnas_obras')
+    except ComponenteNoDisponible as e:
+        log.warning("Columnas de obras no disponibles: %s", e)
+        return None
+    return datos.columnas_obras
+
+def ajustes_ranking_trabajos(pesos):
+    """
+    Ajustes de buscador_exacto (ver busqueda_exacta.py) para ordenar trabajos por
+    similitud + peso de citas * citas normalizadas + peso de recencia * recencia.
+    Sin pesos, o sin columnas de obras, no hay ajustes: se ordena por similitud.
+    """
+    if not pesos or not (pesos['citas'] or pesos['recencia']):
+        return []
+    columnas = tabla_columnas_obras(datos_activos())
+    if columnas is None:
+        return []
+    ajustes = []
+    if pesos['citas']:
+        ajustes.append((lambda filas: columnas.citas[filas], pesos['citas']))
+    if pesos['recencia']:
+        ajustes.append((lambda filas: columnas.recencia(filas, pesos['vida_media']), pesos['recencia']))
+    return ajustes
+
+def pesos_ranking_usados(pesos, metodo, consulta):
+    """
+    Pesos del ranking híbrido con los que se ordenó una respuesta de trabajos: vacío
+    si no se aplicaron (método tradicional, sin consulta o sin columnas de obras)
+    """
+    if metodo != 'matrices' or not consulta:
+        return {}
+    if (pesos['citas'] or pesos['recencia']) and tabla_columnas_obras(datos_activos()) is None:
+        return {}
+    return pesos
+
+def peso_colaboraciones_peticion(data):
+    """Peso de las colaboraciones en el ranking de autores (collaborationWeight del cuerpo de la petición)"""
+    peso = float(data.get('collaborationWeight', PESO_COLABORACIONES_RANKING) or 0)
+    if not np.isfinite(peso):
+        raise ParametroInvalido('collaborationWeight debe ser un número finito')
+    return peso
+
+def ajustes_colaboraciones(datos, peso):
+    """Ajuste de buscador_exacto que suma peso * colaboraciones normalizadas de cada autor"""
+    if not peso:
+        return []
+    colaboraciones = datos.colaboraciones_autores
+    return [(lambda filas: colaboraciones[filas], peso)]
 
 # ========== FUNCIONES PARA AUTORES SIMILARES ==========
 
-def find_similar_authors(author_name, authors_df, top_n=10, country=None, institution=None, collaboration_min=None, collaboration_max=None):
-    """Encontrar autores similares usando los vectores reducidos por PCA"""
+def mascara_autores(authors_df, country=None, institution=None, collaboration_min=None, collaboration_max=None):
+    """Filas de authors_df que cumplen los filtros de autores similares (array booleano)"""
+    mascara = np.ones(len(authors_df), dtype=bool)
+    if country:
+        mascara &= (authors_df['Country'] == country).values
+    if institution:
+        # Búsqueda parcial en los nombres de instituciones
+        institucion = institution.lower()
+        mascara &= np.fromiter(
+            (any(institucion in inst.lower() for inst in nombres) for nombres in authors_df['Institution Names']),
+            dtype=bool, count=len(authors_df)
+        )
+    if collaboration_min is not None:
+        mascara &= (authors_df['Collaboration Count'] >= collaboration_min).values
+    if collaboration_max is not None:
+        mascara &= (authors_df['Collaboration Count'] <= collaboration_max).values
+    return mascara
+
+def tabla_vecinos(datos):
+    """Tabla de vecinos precalculada del conjunto, o None si no hay"""
+    try:
+        componentes.asegurar('vecinos_autores')
+    except ComponenteNoDisponible as e:
+        log.warning("Vecinos de autores no disponibles: %s", e)
+        return None
+    return datos.vecinos_autores
+
+def similares_desde_vecinos(datos, tabla, fila, top_n, filtrar=None):
+    """
+    Top N de autores similares del autor de 'fila' leídos de la tabla de vecinos:
+    (filas de authors_df, similitudes), o None si la tabla no alcanza y hay que
+    recorrer todos los autores. 'filtrar' recibe las filas de los vecinos y
+    devuelve cuáles cumplen los filtros; alcanza si al menos N los cumplen.
+    Las similitudes se recalculan en float32 (la tabla solo da los candidatos).
+    """
+    if tabla is None or top_n > tabla.k:
+        return None
+    vecinos = np.asarray(tabla.vecinos[fila])
+    vecinos = vecinos[vecinos >= 0]
+    if filtrar is not None:
+        vecinos = vecinos[filtrar(vecinos)]
+    if len(vecinos) < top_n:
+        return None
+    
+    similitudes = datos.vectores_autores[vecinos] @ datos.vectores_autores[fila]
+    orden = np.argsort(-similitudes, kind='stable')[:top_n]
+    return vecinos[orden], similitudes[orden]
+
+# Columnas del DataFrame que devuelve find_similar_authors
+COLUMNAS_AUTORES_SIMILARES = ['Author ID', 'Name', 'Similarity', 'Country', 'Collaboration Count',
+                              'Primary Institution', 'Institution Names', 'Institutions JSON']
+
+def find_similar_authors(author_name, authors_df, top_n=10, country=None, institution=None, collaboration_min=None, collaboration_max=None,
+                         collaboration_weight=0):
+    """
+    Encontrar autores similares usando los vectores reducidos por PCA. Con
+    collaboration_weight > 0 el orden es el del ranking híbrido (similitud +
+    peso * colaboraciones normalizadas); 'Similarity' sigue siendo la similitud.
+    """
     
     if authors_df is None:
         return pd.DataFrame(), None
     
+    with etapa('resolver_autor'):
+        author_name, target_author_id = resolver_autor_objetivo(author_name, authors_df)
+    if target_author_id is None:
+        log.debug("No se encontró ID para el autor: %s", author_name)
+        return pd.DataFrame(), None
+    log.debug("Autor encontrado: %s -> ID: %s", author_name, target_author_id)
+    
+    # Obtener el vector del autor objetivo
+    with etapa('resolver_autor'):
+        target_row = authors_df[authors_df['Author ID'] == target_author_id]
+    if target_row.empty:
+        return pd.DataFrame()
+    
+    target_author_idx = target_row.index[0]
+    # Todas las filas del autor objetivo (una sola con IDs únicos, ver _leer_autores_h5)
+    filas_objetivo = target_row.index.to_numpy()
+
+    # Con la tabla de vecinos precalculada basta leer la fila del autor, si tiene
+    # suficientes vecinos que cumplan los filtros
+    filtrar = None
+    if country or institution or collaboration_min is not None or collaboration_max is not None:
+        filtrar = lambda filas: mascara_autores(
+            authors_df.iloc[filas], country, institution, collaboration_min, collaboration_max
+        )
+    datos = datos_activos()
+    ajustes = ajustes_colaboraciones(datos, collaboration_weight)
+    # La tabla de vecinos solo sirve para ordenar por similitud
+    with etapa('vecinos'):
+        desde_tabla = None if ajustes else similares_desde_vecinos(datos, tabla_vecinos(datos), target_author_idx, top_n, filtrar)
+    if desde_tabla is None:
+        # Aplicar filtros
+        with etapa('filtros'):
+            candidatos = np.flatnonzero(
+                mascara_autores(authors_df, country, institution, collaboration_min, collaboration_max)
+            )
+            # Sin el autor objetivo, comparando por ID como antes
+            candidatos = candidatos[~np.isin(candidatos, filas_objetivo)]
+        
+        # Sin candidatos, o solo el autor objetivo
+        if len(candidatos) == 0:
+            return pd.DataFrame()
+        
+        # Top N exacto entre los autores filtrados (ver busqueda_exacta.py)
+        with etapa('top_k'):
+            vector_objetivo = datos.vectores_autores[target_author_idx]
+            filas, puntajes = buscador_exacto.top_k(
+                datos.vectores_autores, vector_objetivo, top_n, filas=candidatos, ajustes=ajustes
+            )
+            validos = np.isfinite(puntajes[0])
+            filas = filas[0][validos]
+            similitudes = datos.vectores_autores[filas] @ vector_objetivo if ajustes else puntajes[0][validos]
+            desde_tabla = filas, similitudes
+    
+    with etapa('resultado'):
+        filas, similitudes = desde_tabla
+        result_df = authors_df.iloc[filas].copy()
+        result_df['Similarity'] = similitudes
+        return result_df[COLUMNAS_AUTORES_SIMILARES], target_author_id
+
+def resolver_autor_objetivo(author_name, authors_df):
+    """
+    (nombre, ID) del autor pedido: coincidencia exacta, después por nombre
+    normalizado y por último parcial. El ID es None si no hay ninguna.
+    """
     # Obtener el ID del autor objetivo: exact match, then normalized, then partial
     query_norm = _normalize_name(author_name)
+    author_name_to_id = datos_activos().author_name_to_id
     target_author_id = author_name_to_id.get(author_name)
     if target_author_id is None:
         for name, aid in author_name_to_id.items():
@@ -230,417 +1766,614 @@ def find_similar_authors(author_name, authors_df, top_n=10, country=None, instit
         elif len(matching) > 1:
             for _, row in matching.iterrows():
                 if _normalize_name(row['Name']) == query_norm:
-                    target_author_id = row['Author ID']
-                    author_name = row['Name']
-                    break
-            if target_author_id is None:
-                target_author_id = matching['Author ID'].iloc[0]
-                author_name = matching['Name'].iloc[0]
-    if target_author_id is None:
-        print(f"⚠️ No se encontró ID para el autor: {author_name}")
-        return pd.DataFrame(), None
-    print(f"✅ Autor encontrado: {author_name} -> ID: {target_author_id}")
-    
-    # Obtener el vector del autor objetivo
-    target_row = authors_df[authors_df['Author ID'] == target_author_id]
-    if target_row.empty:
-        return pd.DataFrame()
-    
-    target_vector = target_row['Vector'].values[0].reshape(1, -1)
-    target_author_idx = target_row.index[0]
+                    target_author_id = row['Author ID']
+                    author_name = row['Name']
+                    break
+            if target_author_id is None:
+                target_author_id = matching['Author ID'].iloc[0]
+                author_name = matching['Name'].iloc[0]
+    return author_name, target_author_id
 
-    # Comenzar con una copia del dataframe original
-    filtered_df = authors_df.copy()
+# Tamaño máximo de un bloque de similitudes (objetivos x candidatos, float32) al
+# procesar un lote de autores, y máximo de autores por petición
+MB_BLOQUE_AUTORES = int(os.environ.get('AUTHORCOLAB_LOTE_AUTORES_MB', 64))
+MAX_LOTE_AUTORES = int(os.environ.get('AUTHORCOLAB_MAX_LOTE_AUTORES', 10000))
+# Máximo de autores similares por autor del lote (valores mayores se recortan)
+MAX_SIMILARES_LOTE = int(os.environ.get('AUTHORCOLAB_MAX_SIMILARES_LOTE', 100))
 
-    # Aplicar filtros
-    if country:
-        filtered_df = filtered_df[filtered_df['Country'] == country]
-    
-    if institution:
-        # Filtrar por institución (búsqueda parcial en nombres de instituciones)
-        filtered_df = filtered_df[filtered_df['Institution Names'].apply(
-            lambda inst_list: any(institution.lower() in inst.lower() for inst in inst_list)
-        )]
-    
-    if collaboration_min is not None:
-        filtered_df = filtered_df[filtered_df['Collaboration Count'] >= collaboration_min]
+def similares_en_lote(datos, filas, top_n, mascara=None, peso_colaboraciones=0):
+    """
+    Top N de autores similares de varios autores a la vez. 'filas' son las filas de
+    los autores objetivo en authors_df y 'mascara' marca los autores que cumplen los
+    filtros (None = todos). Los autores que la tabla de vecinos alcanza a responder
+    se leen de ella; para el resto las similitudes se calculan como producto de
+    matrices (buscador_exacto) por bloques de objetivos, de modo que cada bloque
+    ocupe a lo sumo AUTHORCOLAB_LOTE_AUTORES_MB. Genera (fila, filas de autores, similitudes) por
+    objetivo, en orden y a medida que termina cada bloque. Con peso_colaboraciones
+    el orden es el del ranking híbrido (ver find_similar_authors) y no se usa la tabla.
+    """
+    vectores = datos.vectores_autores
+    ajustes = ajustes_colaboraciones(datos, peso_colaboraciones)
+    tabla = None if ajustes else tabla_vecinos(datos)
+    filtrar = None if mascara is None else (lambda vecinos: mascara[vecinos])
+    total = len(vectores) if mascara is None else int(np.count_nonzero(mascara))
+    por_bloque = max(1, MB_BLOQUE_AUTORES * 1024 * 1024 // max(total * 4, 1))
+    k = min(top_n, total)
+    candidatos = None if mascara is None else np.flatnonzero(mascara)
     
-    if collaboration_max is not None:
-        filtered_df = filtered_df[filtered_df['Collaboration Count'] <= collaboration_max]
+    for inicio in range(0, len(filas), por_bloque):
+        bloque = filas[inicio:inicio + por_bloque]
+        resultados = [similares_desde_vecinos(datos, tabla, fila, top_n, filtrar) for fila in bloque]
+        pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+        
+        if pendientes and k > 0:
+            objetivos = bloque[pendientes]
+            mejores, valores = buscador_exacto.top_k(
+                vectores, vectores[objetivos], k, filas=candidatos, excluir=objetivos, ajustes=ajustes
+            )
+            validos = np.isfinite(valores)
+            if ajustes:
+                valores = np.einsum('qkd,qd->qk', vectores[mejores], vectores[objetivos])
+            for i, indices, sims, validas in zip(pendientes, mejores, valores, validos):
+                resultados[i] = (indices[validas], sims[validas])
+        else:
+            for i in pendientes:
+                resultados[i] = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        
+        for fila, (indices, sims) in zip(bloque, resultados):
+            yield fila, indices, sims
 
-    if filtered_df.empty:
-        return pd.DataFrame()
+def autores_json(df, filas, similitudes):
+    """Autores de las filas de authors_df con su similitud, con los campos de /api/find_similar_authors"""
+    ids = df['Author ID'].values
+    nombres = df['Name'].values
+    paises = df['Country'].values
+    colaboraciones = df['Collaboration Count'].values
+    principales = df['Primary Institution'].values
+    instituciones = df['Institution Names'].values
+    return [{
+        'Author ID': ids[i],
+        'Name': nombres[i],
+        'Similarity': float(s),
+        'Country': paises[i],
+        'Collaboration Count': int(colaboraciones[i]),
+        'Primary Institution': principales[i],
+        'Institutions': instituciones[i]
+    } for i, s in zip(np.asarray(filas).tolist(), np.asarray(similitudes).tolist())]
 
-    # Excluir al autor objetivo
-    filtered_df = filtered_df[filtered_df['Author ID'] != target_author_id]
+def resultados_lote_autores(datos, filas, top_n, mascara=None, peso_colaboraciones=0):
+    """Resultado de cada autor del lote, con los mismos campos que /api/find_similar_authors"""
+    df = datos.authors_df
+    for fila, indices, sims in similares_en_lote(datos, filas, top_n, mascara, peso_colaboraciones):
+        yield {
+            'author_id': df['Author ID'].values[fila],
+            'author_name': df['Name'].values[fila],
+            'similar_authors': autores_json(df, indices, sims)
+        }
 
-    if filtered_df.empty:
-        return pd.DataFrame()
+def codificar_consulta_autores(consulta):
+    """
+    Vectoriza un tema con el modelo de embeddings y lo proyecta al espacio de los
+    autores con su PCA (pca_model_completo_ponderado.pkl), normalizado
+    """
+    with etapa('codificar'):
+        embedding_consulta = model.encode([consulta])[0]
+    with etapa('pca'):
+        vector = datos_activos().pca_model.transform([embedding_consulta])[0].astype(np.float32)
+    norma = np.linalg.norm(vector)
+    return vector / norma if norma > 0 else vector
 
-    # Calcular similitud coseno con los autores filtrados
-    filtered_vectors = np.vstack(filtered_df['Vector'].values)
-    similarities = cosine_similarity(filtered_vectors, target_vector).flatten()
-    
-    filtered_df = filtered_df.copy()
-    filtered_df['Similarity'] = similarities
+def buscar_autores_por_tema(consulta, top_n, mascara=None, peso_colaboraciones=0):
+    """
+    Top N de autores (entre los que marca 'mascara', o todos) más cercanos a un tema
+    libre: (filas de authors_df, similitudes). Sin autor de referencia no sirve la
+    tabla de vecinos, así que es una búsqueda exacta (buscador_exacto). Con
+    peso_colaboraciones el orden es el del ranking híbrido.
+    """
+    datos = datos_activos()
+    candidatos = None if mascara is None else np.flatnonzero(mascara)
+    ajustes = ajustes_colaboraciones(datos, peso_colaboraciones)
+    vector = codificar_consulta_autores(consulta)
+    filas, puntajes = buscador_exacto.top_k(
+        datos.vectores_autores, vector, top_n, filas=candidatos, ajustes=ajustes
+    )
+    validos = np.isfinite(puntajes[0])
+    filas = filas[0][validos]
+    return filas, datos.vectores_autores[filas] @ vector if ajustes else puntajes[0][validos]
+
+def lineas_lote_autores(resultados, resumen):
+    """Líneas NDJSON de un lote de autores: una 'autor' por autor y un resumen"""
+    for resultado in resultados:
+        yield {'tipo': 'autor', 'datos': resultado}
+    yield dict(resumen, tipo='resumen')
+
+# Figuras de Plotly de /api/find_similar_authors
+FIGURAS_AUTORES = ('similarity_plot', 'demographics_plot', 'collaborations_plot', 'concepts_plot')
+
+def figuras_pedidas(valor):
+    """
+    Figuras a construir según el parámetro 'figures': 'plotly' (todas, por defecto),
+    'datos' (ninguna, y en su lugar chart_data), 'ninguna', o los nombres de las
+    figuras separados por comas (p. ej. 'demographics_plot,concepts_plot').
+    Devuelve (nombres, incluir chart_data); ParametroInvalido si no es texto ni lista de textos.
+    """
+    if isinstance(valor, (list, tuple)) and all(isinstance(nombre, str) for nombre in valor):
+        valor = ','.join(valor)
+    elif valor is not None and not isinstance(valor, str):
+        raise ParametroInvalido('figures debe ser un texto o una lista de textos')
+    valor = (valor or 'plotly').strip().lower()
+    if valor == 'plotly':
+        return FIGURAS_AUTORES, False
+    if valor == 'datos':
+        return (), True
+    if valor in ('ninguna', 'none'):
+        return (), False
     
-    # Ordenar por similitud y tomar los top N
-    result_df = filtered_df.sort_values(by='Similarity', ascending=False).head(top_n)
+    nombres = tuple(nombre.strip() for nombre in valor.split(',') if nombre.strip())
+    desconocidas = [nombre for nombre in nombres if nombre not in FIGURAS_AUTORES]
+    if desconocidas:
+        raise ValueError(f"Figuras desconocidas: {', '.join(desconocidas)}. "
+                         f"Opciones: plotly, datos, ninguna o {', '.join(FIGURAS_AUTORES)}")
+    return nombres, False
+
+def figuras_json(figures):
+    """Figuras de Plotly serializadas a JSON, como las espera el frontend"""
+    with etapa('figuras_json'):
+        return {k: v.to_json() for k, v in figures.items()}
 
-    return result_df[['Author ID', 'Name', 'Similarity', 'Country', 'Collaboration Count', 
-                     'Primary Institution', 'Institution Names', 'Institutions JSON']], target_author_id
+def datos_graficos(result_df):
+    """
+    Datos compactos de los gráficos de autores similares que no están ya en la
+    respuesta: distribución por país y por institución principal (top 5). Los de
+    similitud y colaboraciones salen de similar_authors y el de conceptos de top_concepts.
+    """
+    paises = result_df['Country'].value_counts()
+    instituciones = result_df['Primary Institution'].value_counts().head(5)
+    return {
+        'countries': {'labels': paises.index.tolist(), 'values': paises.values.tolist()},
+        'institutions': {'labels': instituciones.index.tolist(), 'values': instituciones.values.tolist()}
+    }
 
-def create_visualizations(target_author, result_df, target_author_id):
-    """Crea visualizaciones para los autores similares encontrados"""
+def create_visualizations(target_author, result_df, target_author_id, conceptos_top=None, nombres=FIGURAS_AUTORES):
+    """
+    Crea visualizaciones para los autores similares encontrados (solo las figuras de
+    'nombres'). conceptos_top: los de obtener_conceptos_autores_similares si ya se
+    calcularon para la respuesta
+    """
     figures = {}
     
-    if result_df.empty:
+    if result_df.empty or not nombres:
         return figures
     
-    # 1. Gráfico de similitud (barras horizontales)
-    fig_similarity = go.Figure()
-    
-    # Ordenar por similitud
-    result_df_sorted = result_df.sort_values('Similarity', ascending=True)
-    
-    fig_similarity.add_trace(go.Bar(
-        y=result_df_sorted['Name'],
-        x=result_df_sorted['Similarity'],
-        orientation='h',
-        marker_color='#1f77b4',
-        name='Similitud',
-        text=result_df_sorted['Similarity'].round(3),
-        textposition='auto'
-    ))
+    # Plotly se importa recién aquí: su import pesa en el arranque y solo se usa para estas figuras
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
     
-    fig_similarity.update_layout(
-        title=f'Top {len(result_df)} Autores Similares a {target_author}',
-        xaxis_title='Puntaje de Similitud',
-        yaxis_title='Autor',
-        height=600,
-        margin=dict(l=150, r=20, t=80, b=20)
-    )
-    figures['similarity_plot'] = fig_similarity
+    # 1. Gráfico de similitud (barras horizontales)
+    if 'similarity_plot' in nombres:
+        fig_similarity = go.Figure()
+        
+        # Ordenar por similitud
+        result_df_sorted = result_df.sort_values('Similarity', ascending=True)
+        
+        fig_similarity.add_trace(go.Bar(
+            y=result_df_sorted['Name'],
+            x=result_df_sorted['Similarity'],
+            orientation='h',
+            marker_color='#1f77b4',
+            name='Similitud',
+            text=result_df_sorted['Similarity'].round(3),
+            textposition='auto'
+        ))
+        
+        fig_similarity.update_layout(
+            title=f'Top {len(result_df)} Autores Similares a {target_author}',
+            xaxis_title='Puntaje de Similitud',
+            yaxis_title='Autor',
+            height=600,
+            margin=dict(l=150, r=20, t=80, b=20)
+        )
+        figures['similarity_plot'] = fig_similarity
     
     # 2. Gráfico de distribución demográfica
-    fig_demographics = make_subplots(
-        rows=1, cols=2,
-        subplot_titles=("Distribución por País", "Distribución por Institución"),
-        specs=[[{"type": "pie"}, {"type": "pie"}]]
-    )
-    
-    # Gráfico de países
-    country_counts = result_df['Country'].value_counts()
-    if not country_counts.empty:
-        fig_demographics.add_trace(
-            go.Pie(
-                labels=country_counts.index,
-                values=country_counts.values,
-                name="Países",
-                hole=0.4,
-                textinfo='label+percent'
-            ),
-            row=1, col=1
+    if 'demographics_plot' in nombres:
+        fig_demographics = make_subplots(
+            rows=1, cols=2,
+            subplot_titles=("Distribución por País", "Distribución por Institución"),
+            specs=[[{"type": "pie"}, {"type": "pie"}]]
+        )
+        
+        # Gráfico de países
+        country_counts = result_df['Country'].value_counts()
+        if not country_counts.empty:
+            fig_demographics.add_trace(
+                go.Pie(
+                    labels=country_counts.index,
+                    values=country_counts.values,
+                    name="Países",
+                    hole=0.4,
+                    textinfo='label+percent'
+                ),
+                row=1, col=1
+            )
+        
+        # Gráfico de instituciones (mostrar solo las top 5)
+        institution_counts = result_df['Primary Institution'].value_counts().head(5)
+        if not institution_counts.empty:
+            fig_demographics.add_trace(
+                go.Pie(
+                    labels=institution_counts.index,
+                    values=institution_counts.values,
+                    name="Instituciones",
+                    hole=0.4,
+                    textinfo='label+percent'
+                ),
+                row=1, col=2
+            )
+        
+        fig_demographics.update_layout(
+            title_text=f'Distribución Demográfica',
+            height=400,
+            margin=dict(t=80)
         )
+        figures['demographics_plot'] = fig_demographics
     
-    # Gráfico de instituciones (mostrar solo las top 5)
-    institution_counts = result_df['Primary Institution'].value_counts().head(5)
-    if not institution_counts.empty:
-        fig_demographics.add_trace(
-            go.Pie(
-                labels=institution_counts.index,
-                values=institution_counts.values,
-                name="Instituciones",
-                hole=0.4,
-                textinfo='label+percent'
+    # 3. Gráfico de colaboraciones vs similitud
+    if 'collaborations_plot' in nombres:
+        fig_collaborations = go.Figure()
+        
+        fig_collaborations.add_trace(go.Scatter(
+            x=result_df['Collaboration Count'],
+            y=result_df['Similarity'],
+            mode='markers',
+            marker=dict(
+                size=10,
+                color=result_df['Similarity'],
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Similitud")
             ),
-            row=1, col=2
+            text=result_df['Name'],
+            hovertemplate=(
+                "<b>%{text}</b><br>" +
+                "Colaboraciones: %{x}<br>" +
+                "Similitud: %{y:.3f}<br>" +
+                "<extra></extra>"
+            )
+        ))
+        
+        fig_collaborations.update_layout(
+            title='Relación entre Colaboraciones y Similitud',
+            xaxis_title='Número de Colaboraciones',
+            yaxis_title='Similitud',
+            height=500
         )
+        figures['collaborations_plot'] = fig_collaborations
     
-    fig_demographics.update_layout(
-        title_text=f'Distribución Demográfica',
-        height=400,
-        margin=dict(t=80)
-    )
-    figures['demographics_plot'] = fig_demographics
+    # 4. Gráfico de conceptos más comunes
+    if 'concepts_plot' in nombres:
+        if conceptos_top is None:
+            conceptos_top = obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10)
+        
+        if conceptos_top:
+            fig_conceptos = go.Figure()
+            
+            conceptos_nombres = [c['concepto'] for c in conceptos_top]
+            conceptos_promedios = [c['promedio_ponderado'] for c in conceptos_top]
+            conceptos_autores = [c['total_autores'] for c in conceptos_top]
+            
+            # Crear texto para hover
+            hover_text = []
+            for i, concepto in enumerate(conceptos_top):
+                hover_text.append(
+                    f"Concepto: {concepto['concepto']}<br>" +
+                    f"Promedio ponderado: {concepto['promedio_ponderado']:.3f}<br>" +
+                    f"Autores que lo tienen: {concepto['total_autores']}"
+                )
+            
+            fig_conceptos.add_trace(go.Bar(
+                x=conceptos_promedios,
+                y=conceptos_nombres,
+                orientation='h',
+                marker_color='#ff7f0e',
+                text=[f"{p:.3f}" for p in conceptos_promedios],
+                textposition='auto',
+                hovertemplate=hover_text
+            ))
+            
+            fig_conceptos.update_layout(
+                title='Top 10 Conceptos Más Comunes entre Autores Similares',
+                xaxis_title='Promedio Ponderado de Relevancia',
+                yaxis_title='Concepto',
+                height=500,
+                margin=dict(l=150, r=20, t=80, b=20)
+            )
+            figures['concepts_plot'] = fig_conceptos
     
-    # 3. Gráfico de colaboraciones vs similitud
-    fig_collaborations = go.Figure()
-    
-    fig_collaborations.add_trace(go.Scatter(
-        x=result_df['Collaboration Count'],
-        y=result_df['Similarity'],
-        mode='markers',
-        marker=dict(
-            size=10,
-            color=result_df['Similarity'],
-            colorscale='Viridis',
-            showscale=True,
-            colorbar=dict(title="Similitud")
-        ),
-        text=result_df['Name'],
-        hovertemplate=(
-            "<b>%{text}</b><br>" +
-            "Colaboraciones: %{x}<br>" +
-            "Similitud: %{y:.3f}<br>" +
-            "<extra></extra>"
-        )
-    ))
+    return figures
+
+# ========== FUNCIONES MEJORADAS CON MATRICES ==========
+
+def codificar_consulta(consulta):
+    """Vectoriza la consulta y la proyecta con PCA a los espacios de título y conceptos (normalizados)"""
+    with etapa('codificar'):
+        embedding_consulta = model.encode([consulta])[0]
+    with etapa('pca'):
+        pca_models = datos_activos().pca_models
+        consulta_titulo = pca_models['titulo'].transform([embedding_consulta])[0]
+        consulta_conceptos = pca_models['conceptos'].transform([embedding_consulta])[0]
     
-    fig_collaborations.update_layout(
-        title='Relación entre Colaboraciones y Similitud',
-        xaxis_title='Número de Colaboraciones',
-        yaxis_title='Similitud',
-        height=500
+    return (consulta_titulo / np.linalg.norm(consulta_titulo),
+            consulta_conceptos / np.linalg.norm(consulta_conceptos))
+
+def terminos_obras(consulta_vectores, peso_titulo, peso_conceptos):
+    """Términos (matriz, consulta, peso) de buscador_exacto para la similitud título/conceptos"""
+    datos = obtener_datos_matriz_obras()
+    consulta_titulo_norm, consulta_conceptos_norm = consulta_vectores
+    return [
+        (datos['titulo_normalizado'], consulta_titulo_norm, peso_titulo),
+        (datos['conceptos_normalizado'], consulta_conceptos_norm, peso_conceptos)
+    ]
+
+def puntuar_obras(consulta_vectores, peso_titulo, peso_conceptos, indices=None):
+    """
+    Similitud ponderada título/conceptos de la consulta con las obras de la matriz
+    (todas, o solo las filas de indices)
+    """
+    # Por bloques de filas en paralelo (ver busqueda_exacta.py)
+    return buscador_exacto.puntuar(terminos_obras(consulta_vectores, peso_titulo, peso_conceptos), indices)
+
+def _geo_valido(geo):
+    return bool(
+        geo and 
+        geo.get('latitude') is not None and 
+        geo.get('longitude') is not None and
+        not np.isnan(geo.get('latitude', np.nan)) and
+        not np.isnan(geo.get('longitude', np.nan))
     )
-    figures['collaborations_plot'] = fig_collaborations
+
+# Resultados de buscar_instituciones_con_matrices por (país, consulta, pesos, filtros).
+# El umbral no forma parte de la clave: cada entrada guarda las obras agrupadas con el
+# umbral con que se calcularon y sirve para cualquier umbral mayor o igual filtrando.
+cache_busquedas = CacheResultados(
+    'busquedas_instituciones',
+    max_bytes=int(os.environ.get('AUTHORCOLAB_CACHE_BUSQUEDAS_MB', 256)) * 1024 * 1024,
+    ttl=int(os.environ.get('AUTHORCOLAB_CACHE_BUSQUEDAS_TTL', 3600))
+)
+
+def clave_busqueda(pais, consulta, peso_titulo, peso_conceptos, filtros):
+    # all-MiniLM-L6-v2 no distingue mayúsculas: 'Redes' y 'redes  ' son la misma consulta
+    consulta_normalizada = ' '.join(consulta.lower().split())
+    # Con la versión, una petición que termina sobre los datos anteriores después de
+    # una recarga no deja en cache resultados que se servirían con la versión nueva
+    return json.dumps([
+        version_resultados(), pais.upper(), consulta_normalizada, round(float(peso_titulo), 6), round(float(peso_conceptos), 6),
+        sorted((filtros or {}).items())
+    ], default=str, ensure_ascii=False)
+
+def agrupar_obras_por_institucion(pais, indices_relevantes, similitudes_relevantes, filtros=None):
+    """
+    Agrupa las obras relevantes de un país por institución, completa las instituciones
+    con sus datos de MongoDB y aplica los filtros - INCLUYE INSTITUCIONES SIN GEO
     
-    # 4. Gráfico de conceptos más comunes
-    conceptos_top = obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10)
-    
-    if conceptos_top:
-        fig_conceptos = go.Figure()
-        
-        conceptos_nombres = [c['concepto'] for c in conceptos_top]
-        conceptos_promedios = [c['promedio_ponderado'] for c in conceptos_top]
-        conceptos_autores = [c['total_autores'] for c in conceptos_top]
-        
-        # Crear texto para hover
-        hover_text = []
-        for i, concepto in enumerate(conceptos_top):
-            hover_text.append(
-                f"Concepto: {concepto['concepto']}<br>" +
-                f"Promedio ponderado: {concepto['promedio_ponderado']:.3f}<br>" +
-                f"Autores que lo tienen: {concepto['total_autores']}"
-            )
+    Devuelve un grupo por institución con sus datos, las obras que pasan los filtros
+    (índices en la matriz, ids y similitudes, en orden de la matriz) y las obras
+    relevantes antes de filtros; ver instituciones_desde_grupos.
+    """
+    datos = obtener_datos_matriz_obras()
+    ids_obras = datos['ids']
+    instituciones = datos['instituciones']
+    
+    # 1. Obras relevantes de cada institución
+    with etapa('instituciones_obras'):
+        obras_por_institucion = defaultdict(list)
+        for posicion, idx in enumerate(indices_relevantes):
+            for institucion_id in instituciones.de_obra(idx):
+                obras_por_institucion[institucion_id].append(posicion)
+    
+    if not obras_por_institucion:
+        return []
+    
+    # 2. Datos completos de las instituciones (una consulta $in, no una por institución)
+    with etapa('mongo_instituciones'):
+        instituciones_datos = obtener_instituciones_por_ids(list(obras_por_institucion), pais)
+    
+    # 3. Filtros: una sola consulta para todas las obras relevantes del país
+    ids_validos = None
+    if filtros:
+        with etapa('filtros'):
+            work_ids = list({
+                ids_obras[indices_relevantes[p]]
+                for posiciones in obras_por_institucion.values() for p in posiciones
+            })
+            ids_validos = {str(w) for w in aplicar_filtros_trabajos(pais, work_ids, filtros)}
+    
+    grupos = []
+    depurar = log.isEnabledFor(logging.DEBUG)
+    for institucion_id, posiciones in obras_por_institucion.items():
+        institucion_data = instituciones_datos.get(institucion_id)
+        if not institucion_data:
+            continue
         
-        fig_conceptos.add_trace(go.Bar(
-            x=conceptos_promedios,
-            y=conceptos_nombres,
-            orientation='h',
-            marker_color='#ff7f0e',
-            text=[f"{p:.3f}" for p in conceptos_promedios],
-            textposition='auto',
-            hovertemplate=hover_text
-        ))
+        posiciones_filtradas = posiciones if ids_validos is None else [
+            p for p in posiciones if ids_obras[indices_relevantes[p]] in ids_validos
+        ]
+        if depurar:
+            log.debug("%s: %s obras relevantes, %s después de filtros",
+                      institucion_data.get('name', 'Sin nombre'), len(posiciones), len(posiciones_filtradas))
+        if not posiciones_filtradas:
+            continue
         
-        fig_conceptos.update_layout(
-            title='Top 10 Conceptos Más Comunes entre Autores Similares',
-            xaxis_title='Promedio Ponderado de Relevancia',
-            yaxis_title='Concepto',
-            height=500,
-            margin=dict(l=150, r=20, t=80, b=20)
-        )
-        figures['concepts_plot'] = fig_conceptos
+        indices = indices_relevantes[posiciones]
+        similitudes = similitudes_relevantes[posiciones]
+        grupos.append({
+            'id': institucion_id,
+            'datos': {campo: institucion_data[campo] for campo in ('name', 'geo', 'type', 'ror', 'image_url')
+                      if campo in institucion_data},
+            'indices': indices if ids_validos is None else indices_relevantes[posiciones_filtradas],
+            'ids': [ids_obras[indices_relevantes[p]] for p in posiciones_filtradas],
+            'similitudes': similitudes if ids_validos is None else similitudes_relevantes[posiciones_filtradas],
+            # Obras relevantes antes de filtros: fijan el orden de la respuesta
+            'indices_sin_filtrar': indices,
+            'similitudes_sin_filtrar': similitudes,
+            # Máximo sobre las obras relevantes antes de filtros, como en la respuesta
+            'max_similitud': float(similitudes_relevantes[posiciones].max())
+        })
     
-    return figures
+    return grupos
 
-# ========== FUNCIONES MEJORADAS CON MATRICES ==========
+def instituciones_desde_grupos(grupos, umbral_similitud=None):
+    """
+    Respuesta de instituciones a partir de los grupos de agrupar_obras_por_institucion.
+    Con umbral_similitud, solo cuentan las obras con similitud >= umbral (grupos
+    calculados con un umbral menor).
+    """
+    seleccion = []
+    for grupo in grupos:
+        if umbral_similitud is None:
+            posiciones = np.arange(len(grupo['ids']))
+            primera = grupo['indices_sin_filtrar'][0]
+        else:
+            posiciones = np.flatnonzero(grupo['similitudes'] >= umbral_similitud)
+            sin_filtrar = np.flatnonzero(grupo['similitudes_sin_filtrar'] >= umbral_similitud)
+            primera = grupo['indices_sin_filtrar'][sin_filtrar[0]] if len(sin_filtrar) else None
+        if len(posiciones):
+            # Orden de la respuesta: primera obra relevante de cada institución en la
+            # matriz, antes de los filtros (una obra filtrada también fija el orden)
+            seleccion.append((primera, grupo, posiciones))
+    seleccion.sort(key=lambda s: s[0])
+    
+    instituciones = []
+    for _, grupo, posiciones in seleccion:
+        datos_institucion = grupo['datos']
+        geo = datos_institucion.get('geo', {})
+        tiene_geo_valido = _geo_valido(geo)
+        instituciones.append({
+            'id': grupo['id'],
+            'nombre': datos_institucion.get('name', 'Sin nombre'),
+            'geo': geo if tiene_geo_valido else {},
+            'total_trabajos': len(posiciones),
+            'trabajos_ejemplo': [grupo['ids'][p] for p in posiciones[:3]],
+            'metadata': {
+                'type': datos_institucion.get('type'),
+                'ror': datos_institucion.get('ror'),
+                'image_url': datos_institucion.get('image_url')
+            },
+            'metricas_relevancia': {
+                'max_similitud': grupo['max_similitud'],
+                'obras_relevantes': len(posiciones)
+            },
+            'tiene_geo': tiene_geo_valido  # Para que el frontend sepa
+        })
+    
+    return instituciones
 
 def buscar_instituciones_con_matrices(pais, consulta, umbral_similitud=0.3, 
-                                    peso_titulo=0.5, peso_conceptos=0.5, filtros=None):
+                                    peso_titulo=0.5, peso_conceptos=0.5, filtros=None,
+                                    similitudes=None):
     """
     Buscar instituciones usando matrices precalculadas - INCLUYE INSTITUCIONES SIN GEO
+    
+    similitudes: función que devuelve los puntajes de todas las obras de la matriz (la
+    búsqueda en todos los países los calcula una sola vez y los reparte entre países)
+    
+    Los resultados se guardan en cache_busquedas; una búsqueda igual con umbral mayor
+    o igual se responde filtrando la entrada guardada, sin puntuar ni consultar MongoDB.
     """
-    if matrices_cargadas.get('obras') is None:
-        print("⚠️  Usando búsqueda tradicional (matrices no disponibles)")
+    if datos_activos().matriz_obras is None:
+        log.warning("Usando búsqueda tradicional (matrices no disponibles)")
         return buscar_instituciones_tradicional(pais, consulta, filtros)
     
     try:
-        print(f"🔍 Buscando instituciones con matrices para: '{consulta}'")
-        
-        # 1. Vectorizar consulta y aplicar PCA
-        embedding_consulta = model.encode([consulta])[0]
-        consulta_titulo = pca_models['titulo'].transform([embedding_consulta])[0]
-        consulta_conceptos = pca_models['conceptos'].transform([embedding_consulta])[0]
-        
-        # Normalizar vectores de consulta
-        consulta_titulo_norm = consulta_titulo / np.linalg.norm(consulta_titulo)
-        consulta_conceptos_norm = consulta_conceptos / np.linalg.norm(consulta_conceptos)
+        clave = clave_busqueda(pais, consulta, peso_titulo, peso_conceptos, filtros)
+        guardada = cache_busquedas.obtener(clave)
+        if guardada is not None and guardada['umbral'] <= umbral_similitud:
+            log.debug("Búsqueda '%s' en %s servida desde cache (umbral %s -> %s)", consulta, pais.upper(), guardada['umbral'], umbral_similitud)
+            return instituciones_desde_grupos(guardada['grupos'], umbral_similitud)
         
-        # 2. Obtener datos de la matriz
-        matriz = matrices_cargadas['obras']
-        titulo_vectores = matriz['titulo_vectores'][:]
-        conceptos_vectores = matriz['conceptos_vectores'][:]
+        log.debug("Buscando instituciones con matrices para: '%s'", consulta)
         
-        metadata = matriz['metadata']
-        ids_obras = [id.decode('utf-8') if isinstance(id, bytes) else id for id in metadata['ids'][:]]
-        paises_obras = [pais.decode('utf-8') if isinstance(pais, bytes) else pais for pais in metadata['paises'][:]]
-        instituciones_json = [inst.decode('utf-8') if isinstance(inst, bytes) else inst for inst in metadata['instituciones_json'][:]]
-        
-        # 3. Filtrar por país
-        mascara_pais = np.array([p.upper() == pais.upper() for p in paises_obras])
-        indices_pais = np.where(mascara_pais)[0]
+        # 1. Obras del país
+        indices_pais = indices_obras_pais(pais)
         
         if len(indices_pais) == 0:
             return []
         
-        # 4. Calcular similitudes para obras del país
-        titulo_vectores_pais = titulo_vectores[indices_pais]
-        conceptos_vectores_pais = conceptos_vectores[indices_pais]
-        
-        # Normalizar vectores
-        normas_titulo = np.linalg.norm(titulo_vectores_pais, axis=1, keepdims=True)
-        titulo_normalizado = titulo_vectores_pais / normas_titulo
-        
-        normas_conceptos = np.linalg.norm(conceptos_vectores_pais, axis=1, keepdims=True)
-        conceptos_normalizado = conceptos_vectores_pais / normas_conceptos
-        
-        # Calcular similitudes
-        similitudes_titulo = np.dot(titulo_normalizado, consulta_titulo_norm)
-        similitudes_conceptos = np.dot(conceptos_normalizado, consulta_conceptos_norm)
-        
-        # Combinar con ponderación
-        similitudes_totales = (peso_titulo * similitudes_titulo + 
-                              peso_conceptos * similitudes_conceptos)
+        # 2. Similitudes de las obras del país
+        if similitudes is None:
+            consulta_vectores = codificar_consulta(consulta)
+            with etapa('puntuar'):
+                similitudes_pais = puntuar_obras(consulta_vectores, peso_titulo, peso_conceptos, indices_pais)
+        else:
+            similitudes_todas = similitudes()
+            with etapa('puntuar'):
+                similitudes_pais = similitudes_todas[indices_pais]
         
-        # 5. Aplicar umbral y obtener obras relevantes
-        mascara_relevantes = similitudes_totales >= umbral_similitud
-        indices_relevantes = indices_pais[mascara_relevantes]
-        similitudes_relevantes = similitudes_totales[mascara_relevantes]
+        # 3. Aplicar umbral y obtener obras relevantes
+        with etapa('umbral'):
+            mascara_relevantes = similitudes_pais >= umbral_similitud
+            indices_relevantes = indices_pais[mascara_relevantes]
+            similitudes_relevantes = similitudes_pais[mascara_relevantes]
         
-        print(f"📊 Encontradas {len(indices_relevantes)} obras relevantes")
+        log.debug("Encontradas %s obras relevantes", len(indices_relevantes))
         
-        # 6. Agrupar por institución y obtener datos GEO de MongoDB
-        instituciones_dict = {}
-        instituciones_geo_cache = {}
+        # 4. Agrupar por institución, completar con MongoDB y filtrar
+        grupos = agrupar_obras_por_institucion(pais, indices_relevantes, similitudes_relevantes, filtros)
+        cache_busquedas.guardar(clave, {'umbral': umbral_similitud, 'grupos': grupos})
+        instituciones_filtradas = instituciones_desde_grupos(grupos)
         
-        for idx, similitud in zip(indices_relevantes, similitudes_relevantes):
-            obra_id = ids_obras[idx]
-            instituciones_obra = []
-            
-            try:
-                instituciones_obra = json.loads(instituciones_json[idx])
-            except:
-                continue
-            
-            for institucion in instituciones_obra:
-                institucion_id = institucion.get('id')
-                if not institucion_id:
-                    continue
-                
-                # Obtener datos completos de la institución desde MongoDB
-                if institucion_id not in instituciones_geo_cache:
-                    institucion_completa = obtener_institucion_por_id(institucion_id, pais)
-                    instituciones_geo_cache[institucion_id] = institucion_completa
-                
-                institucion_data = instituciones_geo_cache[institucion_id]
-                
-                if not institucion_data:
-                    continue
-                
-                if institucion_id not in instituciones_dict:
-                    # INCLUIR INSTITUCIONES CON Y SIN GEO
-                    geo = institucion_data.get('geo', {})
-                    tiene_geo_valido = (
-                        geo and 
-                        geo.get('latitude') is not None and 
-                        geo.get('longitude') is not None and
-                        not np.isnan(geo.get('latitude', np.nan)) and
-                        not np.isnan(geo.get('longitude', np.nan))
-                    )
-                    
-                    instituciones_dict[institucion_id] = {
-                        'id': institucion_id,
-                        'nombre': institucion_data.get('name', 'Sin nombre'),
-                        'geo': geo if tiene_geo_valido else {},
-                        'metadata': {
-                            'type': institucion_data.get('type'),
-                            'ror': institucion_data.get('ror'),
-                            'image_url': institucion_data.get('image_url')
-                        },
-                        'obras_relevantes': [],
-                        'max_similitud': 0,
-                        'total_obras': 0,
-                        'tiene_geo': tiene_geo_valido
-                    }
-                
-                institucion_dict = instituciones_dict[institucion_id]
-                institucion_dict['obras_relevantes'].append({
-                    'id': obra_id,
-                    'similitud': float(similitud)
-                })
-                institucion_dict['max_similitud'] = max(institucion_dict['max_similitud'], float(similitud))
-                institucion_dict['total_obras'] += 1
-        
-        # 7. Aplicar filtros adicionales a las instituciones
-        instituciones_filtradas = []
-        for inst_id, inst_data in instituciones_dict.items():
-            obras_filtradas = aplicar_filtros_a_obras(pais, inst_data['obras_relevantes'], filtros)
-            
-            if len(obras_filtradas) > 0:
-                instituciones_filtradas.append({
-                    'id': inst_id,
-                    'nombre': inst_data['nombre'],
-                    'geo': inst_data['geo'],
-                    'total_trabajos': len(obras_filtradas),
-                    'trabajos_ejemplo': [obra['id'] for obra in obras_filtradas[:3]],
-                    'metadata': inst_data['metadata'],
-                    'metricas_relevancia': {
-                        'max_similitud': inst_data['max_similitud'],
-                        'obras_relevantes': len(obras_filtradas)
-                    },
-                    'tiene_geo': inst_data['tiene_geo']  # Para que el frontend sepa
-                })
-        
-        print(f"🏛️  Encontradas {len(instituciones_filtradas)} instituciones relevantes")
-        for inst_id, inst_data in instituciones_dict.items():
-            obras_filtradas = aplicar_filtros_a_obras(pais, inst_data['obras_relevantes'], filtros)
-            print(f"   - {inst_data['nombre']}: {len(inst_data['obras_relevantes'])} obras relevantes, {len(obras_filtradas)} después de filtros")
+        log.debug("Encontradas %s instituciones relevantes", len(instituciones_filtradas))
         
         return instituciones_filtradas
         
     except Exception as e:
-        print(f"❌ Error en búsqueda con matrices: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en búsqueda con matrices: %s", e)
         return buscar_instituciones_tradicional(pais, consulta, filtros)
 
+def obtener_instituciones_por_ids(institution_ids, pais):
+    """
+    Datos completos de varias instituciones: primero en el país, y las que falten en
+    los demás países de Latinoamérica (en ese orden). Devuelve {institution_id: doc}.
+    """
+    encontradas = {
+        institucion['_id']: institucion
+        for institucion in repositorio.buscar('institutions', pais, {'_id': {'$in': institution_ids}})
+    }
+    
+    faltantes = [i for i in institution_ids if i not in encontradas]
+    if faltantes:
+        otros_paises = [p for p in PAISES_LATAM if p != pais.lower()]
+        for pais_encontrado, institucion in repositorio.buscar_en_paises('institutions', otros_paises, {'_id': {'$in': faltantes}}):
+            if institucion['_id'] not in encontradas:
+                log.debug("Institución %s encontrada en %s", institucion['_id'], pais_encontrado.upper())
+                encontradas[institucion['_id']] = institucion
+        
+        for institution_id in faltantes:
+            if institution_id not in encontradas:
+                log.debug("Institución %s no encontrada en ninguna colección", institution_id)
+    
+    return encontradas
+
 def obtener_institucion_por_id(institution_id, pais):
     """
     Obtener datos completos de una institución desde MongoDB
     Busca en todas las colecciones de instituciones del país
     """
-    # Primero intenta en el país específico
-    coleccion = f'institutions_{pais.lower()}'
-    if coleccion in db.list_collection_names():
-        institucion = db[coleccion].find_one({'_id': institution_id})
-        if institucion:
-            return institucion
-    
-    # Si no encuentra, busca en otros países de Latinoamérica
-    paises_latam = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt', 
-                   'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
-    
-    for p in paises_latam:
-        if p == pais.lower():
-            continue  # Ya buscamos en este
-            
-        coleccion = f'institutions_{p}'
-        if coleccion in db.list_collection_names():
-            institucion = db[coleccion].find_one({'_id': institution_id})
-            if institucion:
-                print(f"📌 Institución {institution_id} encontrada en {p.upper()}")
-                return institucion
-    
-    print(f"❌ Institución {institution_id} no encontrada en ninguna colección")
-    return None
+    return obtener_instituciones_por_ids([institution_id], pais).get(institution_id)
 
 def buscar_instituciones_tradicional(pais, consulta, filtros):
     """
     Búsqueda tradicional como fallback cuando no hay matrices
     """
-    coleccion_instituciones = db[f'institutions_{pais.lower()}']
-    coleccion_relaciones = db[f'institution_works_{pais.lower()}']
-    
-    instituciones = list(coleccion_instituciones.find({}))
+    instituciones = list(repositorio.buscar('institutions', pais, {}))
     
     resultado = []
     for institucion in instituciones:
         # Obtener work_ids de la institución
-        relaciones = list(coleccion_relaciones.find(
+        relaciones = list(repositorio.buscar(
+            'institution_works', pais,
             {'institution_id': institucion['_id']},
-            {'work_id': 1}
+            {'_id': 0, 'work_id': 1}
         ))
         work_ids = [r['work_id'] for r in relaciones]
         
@@ -681,22 +2414,36 @@ def buscar_instituciones_tradicional(pais, consulta, filtros):
     
     return resultado
 
-def aplicar_filtros_a_obras(pais, obras_relevantes, filtros):
-    """Aplicar filtros a la lista de obras relevantes"""
-    if not filtros or not obras_relevantes:
-        return obras_relevantes
-    
-    obras_filtradas = []
-    work_ids = [obra['id'] for obra in obras_relevantes]
-    
-    # Construir query de filtros
+def construir_query_filtros(pais, work_ids, filtros):
+    """
+    Construye la query de MongoDB sobre works_<pais> para los filtros del usuario.
+    El filtro por autor usa el índice de nombres (ver resolver_filtro_autor) para los
+    autores indexados, y además el $regex sobre authorships.author.display_name para
+    los coautores que no están en el índice.
+    """
     query = {'_id': {'$in': work_ids}}
     
+    # Filtro por autor
     if filtros.get('autor'):
-        query['authorships.author.display_name'] = {
-            '$regex': filtros['autor'], '$options': 'i'
-        }
+        por_nombre = {'authorships.author.display_name': {
+            '$regex': re.escape(filtros['autor']), '$options': 'i'
+        }}
+        author_ids = resolver_filtro_autor(filtros['autor'])
+        if author_ids:
+            author_ids = variantes_id_openalex(author_ids)
+            trabajos_autor = obtener_trabajos_de_autores(pais, author_ids)
+            if trabajos_autor is not None:
+                # Posting list disponible: intersectar en memoria
+                por_ids = {'_id': {'$in': [w for w in work_ids if w in trabajos_autor]}}
+            else:
+                por_ids = {'authorships.author.id': {'$in': author_ids}}
+            # El índice solo tiene autores de Latinoamérica: un coautor de otro país con
+            # ese nombre solo coincide por display_name, como antes del índice
+            query['$or'] = [por_ids, por_nombre]
+        else:
+            query.update(por_nombre)
     
+    # Filtro por año de publicación
     if filtros.get('anio_desde') or filtros.get('anio_hasta'):
         query['publication_year'] = {}
         if filtros.get('anio_desde'):
@@ -704,31 +2451,37 @@ def aplicar_filtros_a_obras(pais, obras_relevantes, filtros):
         if filtros.get('anio_hasta'):
             query['publication_year']['$lte'] = filtros['anio_hasta']
     
+    # Filtro por acceso abierto
     if filtros.get('acceso_abierto') is not None:
         query['open_access.is_oa'] = filtros['acceso_abierto']
     
+    # Filtro por número mínimo de citas
     if filtros.get('citas_minimas'):
         query['cited_by_count'] = {'$gte': filtros['citas_minimas']}
     
+    return query
+
+def aplicar_filtros_a_obras(pais, obras_relevantes, filtros):
+    """Aplicar filtros a la lista de obras relevantes"""
+    if not filtros or not obras_relevantes:
+        return obras_relevantes
+    
+    work_ids = [obra['id'] for obra in obras_relevantes]
+    query = construir_query_filtros(pais, work_ids, filtros)
+    if not query['_id']['$in']:
+        return []
+    
     # Obtener trabajos que cumplen con los filtros
-    trabajos_filtrados = list(db[f'works_{pais.lower()}'].find(
-        query, 
-        {'_id': 1}
-    ))
+    trabajos_filtrados = list(repositorio.buscar('works', pais, query, {'_id': 1}))
     
     trabajos_filtrados_ids = {str(t['_id']) for t in trabajos_filtrados}
     
     # Filtrar obras relevantes
-    for obra in obras_relevantes:
-        if obra['id'] in trabajos_filtrados_ids:
-            obras_filtradas.append(obra)
-    
-    return obras_filtradas
+    return [obra for obra in obras_relevantes if obra['id'] in trabajos_filtrados_ids]
 
 def aplicar_filtros_trabajos(pais, work_ids, filtros):
     """
     Aplica filtros a los trabajos y devuelve los work_ids que cumplen con los criterios
-    Esta es la función ORIGINAL que usabas
     
     Args:
         pais (str): Código del país
@@ -741,42 +2494,183 @@ def aplicar_filtros_trabajos(pais, work_ids, filtros):
     if not work_ids:
         return []
     
-    # Construir query de filtros
-    query = {'_id': {'$in': work_ids}}
+    query = construir_query_filtros(pais, work_ids, filtros)
+    if not query['_id']['$in']:
+        return []
     
-    # Filtro por autor
-    if filtros.get('autor'):
-        query['authorships.author.display_name'] = {
-            '$regex': filtros['autor'], '$options': 'i'
-        }
+    # Obtener trabajos que cumplen con los filtros
+    trabajos_filtrados = list(repositorio.buscar('works', pais, query, {'_id': 1}))
     
-    # Filtro por año de publicación
-    if filtros.get('anio_desde') or filtros.get('anio_hasta'):
-        query['publication_year'] = {}
-        if filtros.get('anio_desde'):
-            query['publication_year']['$gte'] = filtros['anio_desde']
-        if filtros.get('anio_hasta'):
-            query['publication_year']['$lte'] = filtros['anio_hasta']
+    return [t['_id'] for t in trabajos_filtrados]
+
+# ========== RESPUESTAS JSON ==========
+
+# Formato por defecto de las listas de documentos: 'compat' (texto JSON dentro de la
+# respuesta, como json_util.dumps) o 'nativo' (arrays JSON). Se puede pedir por
+# petición con ?formato_json=
+FORMATO_JSON = os.environ.get('AUTHORCOLAB_FORMATO_JSON', 'compat')
+
+def formato_json_pedido():
+    formato = request.args.get('formato_json', FORMATO_JSON).lower()
+    return formato if formato in FORMATOS_JSON else FORMATO_JSON
+
+def respuesta_json(cuerpo, campos_documentos=(), status=200):
+    """Respuesta JSON codificada con orjson (ver serializacion.py)"""
+    with etapa('serializar'):
+        datos = cuerpo_respuesta(cuerpo, campos_documentos, formato_json_pedido())
+    return Response(datos, status=status, mimetype='application/json')
+
+# ========== COMPRESIÓN Y CACHE DE RESPUESTAS ==========
+
+# Respuestas ya codificadas (y comprimidas), por (ETag, codificación)
+cache_respuestas = CacheResultados(
+    'respuestas',
+    max_bytes=int(os.environ.get('AUTHORCOLAB_CACHE_RESPUESTAS_MB', 128)) * 1024 * 1024,
+    ttl=int(os.environ.get('AUTHORCOLAB_CACHE_RESPUESTAS_TTL', 3600))
+)
+
+MIN_BYTES_COMPRESION = 1024
+TIPOS_COMPRIMIBLES = ('application/json', 'application/x-ndjson', 'text/')
+
+def _normalizar_parametro(valor):
+    """'0.30' y '0.3', 'True' y 'true' o espacios repetidos dan la misma clave"""
+    valor = ' '.join(valor.split())
+    if valor.lower() in ('true', 'false'):
+        return valor.lower()
+    try:
+        return repr(float(valor))
+    except ValueError:
+        return valor
+
+def etag_peticion():
+    """ETag de la petición actual: versión de los datos + ruta + parámetros normalizados"""
+    parametros = sorted(
+        (clave, _normalizar_parametro(valor))
+        for clave, valor in request.args.items(multi=True) if valor.strip()
+    )
+    contenido = json.dumps([version_resultados(), request.path, parametros], ensure_ascii=False)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+def codificacion_aceptada():
+    """Mejor codificación que acepta el cliente: 'br', 'gzip' o None"""
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas['br']:
+        return 'br'
+    if aceptadas['gzip']:
+        return 'gzip'
+    return None
+
+def comprimir_respuesta(response, codificacion):
+    """Comprime el cuerpo de una respuesta completa (no en streaming) si vale la pena"""
+    if (codificacion is None or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(TIPOS_COMPRIMIBLES)):
+        return response
     
-    # Filtro por acceso abierto
-    if filtros.get('acceso_abierto') is not None:
-        query['open_access.is_oa'] = filtros['acceso_abierto']
+    datos = response.get_data()
+    if len(datos) < MIN_BYTES_COMPRESION:
+        return response
     
-    # Filtro por número mínimo de citas
-    if filtros.get('citas_minimas'):
-        query['cited_by_count'] = {'$gte': filtros['citas_minimas']}
+    if codificacion == 'br':
+        response.set_data(brotli.compress(datos, quality=5))
+    else:
+        response.set_data(gzip.compress(datos, compresslevel=6))
+    response.headers['Content-Encoding'] = codificacion
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def comprimir_respuestas(response):
+    with etapa('comprimir'):
+        return comprimir_respuesta(response, codificacion_aceptada())
+
+# Las páginas con cursor dependen de un ranking en cache_rankings, que vence antes que
+# cache_respuestas: una página 1 guardada entregaría un cursor ya inválido (410)
+PARAMETROS_NO_CACHEABLES = ('cursor', 'limit')
+
+def respuesta_cacheable(vista):
+    """
+    Decorador para endpoints de solo lectura cuyos resultados cambian solo al
+    recargar los datos: responde 304 si el If-None-Match coincide con el ETag, y
+    guarda las respuestas 200 ya comprimidas en cache_respuestas. No se cachean las
+    respuestas en streaming (formato=ndjson), las paginadas (PARAMETROS_NO_CACHEABLES)
+    ni las marcadas con Cache-Control: no-store. El ETag depende de la codificación:
+    los cuerpos gzip, brotli y sin comprimir son distintos byte a byte.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        if any(request.args.get(parametro) for parametro in PARAMETROS_NO_CACHEABLES):
+            return vista(*args, **kwargs)
+        
+        codificacion = codificacion_aceptada()
+        etag = etag_peticion()
+        if codificacion:
+            etag = f'{etag}-{codificacion}'
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        clave = (etag, codificacion)
+        guardada = cache_respuestas.obtener(clave)
+        if guardada is not None:
+            datos, mimetype = guardada
+            response = Response(datos, mimetype=mimetype)
+            if codificacion:
+                response.headers['Content-Encoding'] = codificacion
+            response.headers['X-Cache'] = 'HIT'
+        else:
+            response = app.make_response(vista(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed or response.cache_control.no_store:
+                return response
+            comprimir_respuesta(response, codificacion)
+            cache_respuestas.guardar(clave, (response.get_data(), response.mimetype))
+            response.headers['X-Cache'] = 'MISS'
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'  # Revalidar siempre con el ETag
+        response.vary.add('Accept-Encoding')
+        return response
+    return envoltura
+
+# ========== RESPUESTAS EN STREAMING ==========
+
+def quiere_ndjson():
+    """Indica si el cliente pidió la respuesta en streaming (?formato=ndjson)"""
+    return request.args.get('formato', '').lower() == 'ndjson'
+
+def respuesta_ndjson(lineas):
+    """
+    Respuesta NDJSON: un objeto JSON por línea, enviado a medida que el generador
+    lo produce. Cada línea lleva un campo 'tipo' ('institucion', 'trabajo', 'pais',
+    'resumen', 'error').
+    """
+    formato = formato_json_pedido()
     
-    # Obtener trabajos que cumplen con los filtros
-    trabajos_filtrados = list(db[f'works_{pais.lower()}'].find(
-        query, 
-        {'_id': 1}
-    ))
+    def generar():
+        try:
+            for linea in lineas:
+                yield serializar(linea, formato) + b'\n'
+        except Exception as e:
+            log.error("Error durante el streaming: %s", e)
+            yield serializar({'tipo': 'error', 'error': str(e)}) + b'\n'
     
-    return [t['_id'] for t in trabajos_filtrados]
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+def lineas_trabajos(trabajos, resumen):
+    """Líneas NDJSON de trabajos seguidas de un resumen con el total"""
+    total = 0
+    for trabajo in trabajos:
+        total += 1
+        yield {'tipo': 'trabajo', 'datos': trabajo}
+    yield dict(resumen, tipo='resumen', total=total)
 
 # ========== ENDPOINTS MEJORADOS ==========
 
 @app.route('/api/instituciones/<pais>', methods=['GET'])
+@respuesta_cacheable
+@requiere_componentes('modelo_embeddings', 'matrices_obras')
 def obtener_instituciones_completas(pais):
     """
     Endpoint MEJORADO para obtener instituciones con búsqueda semántica
@@ -800,9 +2694,9 @@ def obtener_instituciones_completas(pais):
         # Remover filtros None
         filtros = {k: v for k, v in filtros.items() if v is not None}
         
-        print(f"🎯 Búsqueda semántica - País: {pais}, Consulta: '{consulta}'")
-        print(f"📊 Parámetros - Peso título: {peso_titulo}, Peso conceptos: {peso_conceptos}, Umbral: {umbral_similitud}")
-        print(f"🔧 Filtros: {filtros}")
+        log.debug("Búsqueda semántica - País: %s, Consulta: '%s'", pais, consulta)
+        log.debug("Parámetros - Peso título: %s, Peso conceptos: %s, Umbral: %s", peso_titulo, peso_conceptos, umbral_similitud)
+        log.debug("Filtros: %s", filtros)
         
         # Usar búsqueda con matrices si hay consulta, sino búsqueda tradicional
         if consulta.strip():
@@ -818,33 +2712,31 @@ def obtener_instituciones_completas(pais):
             # Búsqueda tradicional sin consulta semántica
             instituciones = buscar_instituciones_tradicional_sin_consulta(pais, filtros)
         
-        print(f"✅ Se encontraron {len(instituciones)} instituciones para {pais}")
+        log.debug("Se encontraron %s instituciones para %s", len(instituciones), pais)
         
-        return jsonify({
-            'instituciones': json_util.dumps(instituciones),
+        return respuesta_json({
+            'instituciones': instituciones,
             'total': len(instituciones),
             'filtros_aplicados': filtros,
             'consulta': consulta,
             'metodo': 'semantico' if consulta.strip() else 'tradicional'
-        })
+        }, campos_documentos=('instituciones',))
     
     except Exception as e:
-        print(f"❌ Error en obtener_instituciones_completas: {str(e)}")
+        log.exception("Error en obtener_instituciones_completas: %s", e)
         return jsonify({'error': str(e)}), 500
 
 def buscar_instituciones_tradicional_sin_consulta(pais, filtros):
     """Búsqueda tradicional cuando no hay consulta semántica - INCLUYE SIN GEO"""
-    coleccion_instituciones = db[f'institutions_{pais.lower()}']
-    coleccion_relaciones = db[f'institution_works_{pais.lower()}']
-    
-    instituciones = list(coleccion_instituciones.find({}))
+    instituciones = list(repositorio.buscar('institutions', pais, {}))
     
     resultado = []
     for institucion in instituciones:
         # Obtener work_ids de la institución
-        relaciones = list(coleccion_relaciones.find(
+        relaciones = list(repositorio.buscar(
+            'institution_works', pais,
             {'institution_id': institucion['_id']},
-            {'work_id': 1}
+            {'_id': 0, 'work_id': 1}
         ))
         work_ids = [r['work_id'] for r in relaciones]
         
@@ -895,51 +2787,47 @@ def obtener_trabajos_por_institucion_ordenados(pais, institution_id, consulta=No
     if abs((peso_titulo + peso_conceptos) - 1.0) > 0.01:
         raise ValueError("La suma de pesos debe ser 1.0")
     
-    print(f"🔍 Buscando trabajos para institución {institution_id} en {pais}")
+    log.debug("Buscando trabajos para institución %s en %s", institution_id, pais)
     
     # 1. Obtener todos los work_ids de la institución
-    coleccion_relaciones = f'institution_works_{pais.lower()}'
-    relaciones = list(db[coleccion_relaciones].find(
+    relaciones = list(repositorio.buscar(
+        'institution_works', pais,
         {'institution_id': institution_id},
-        {'work_id': 1}
+        {'_id': 0, 'work_id': 1}
     ))
     work_ids = [r['work_id'] for r in relaciones]
     
     if not work_ids:
-        print(f"⚠️  No se encontraron trabajos para la institución {institution_id}")
+        log.debug("No se encontraron trabajos para la institución %s", institution_id)
         return []
     
-    print(f"📚 Encontrados {len(work_ids)} trabajos iniciales")
+    log.debug("Encontrados %s trabajos iniciales", len(work_ids))
     
     # 2. Aplicar filtros si existen - USAR aplicar_filtros_trabajos (la función correcta)
     if filtros:
         work_ids_filtrados = aplicar_filtros_trabajos(pais.lower(), work_ids, filtros)
         if not work_ids_filtrados:
-            print("⚠️  No hay trabajos después de aplicar filtros")
+            log.debug("No hay trabajos después de aplicar filtros")
             return []
         work_ids = work_ids_filtrados
     
-    print(f"✅ {len(work_ids)} trabajos después de filtros")
+    log.debug("%s trabajos después de filtros", len(work_ids))
     
     # 3. Obtener los trabajos completos
-    coleccion_works = f'works_{pais.lower()}'
-    trabajos = list(db[coleccion_works].find(
-        {'_id': {'$in': work_ids}}
-    ))
+    trabajos = list(repositorio.buscar('works', pais, {'_id': {'$in': work_ids}}))
     
     # Si no hay consulta, devolver todos los trabajos sin ordenar
     if not consulta:
         resultado = trabajos[:top_n] if top_n else trabajos
-        print(f"📦 Devolviendo {len(resultado)} trabajos sin ordenar (sin consulta)")
+        log.debug("Devolviendo %s trabajos sin ordenar (sin consulta)", len(resultado))
         return resultado
     
-    print(f"🎯 Ordenando {len(trabajos)} trabajos por similitud con: '{consulta}'")
+    log.debug("Ordenando %s trabajos por similitud con: '%s'", len(trabajos), consulta)
     
     # 4. Obtener los vectores de los trabajos
-    coleccion_vectores = f'vector_works_{pais.lower()}'
     vectores = {}
     
-    for doc in db[coleccion_vectores].find({'_id': {'$in': work_ids}}):
+    for doc in repositorio.buscar('vector_works', pais, {'_id': {'$in': work_ids}}):
         try:
             titulo_vector = pickle.loads(doc['titulo_vector']) if 'titulo_vector' in doc else None
             conceptos_vector = pickle.loads(doc['conceptos_vector']) if doc.get('conceptos_vector') else None
@@ -950,10 +2838,10 @@ def obtener_trabajos_por_institucion_ordenados(pais, institution_id, consulta=No
                     'conceptos_vector': conceptos_vector
                 }
         except Exception as e:
-            print(f"⚠️  Error cargando vectores para {doc['_id']}: {str(e)}")
+            log.warning("Error cargando vectores para %s: %s", doc['_id'], e)
             continue
     
-    print(f"📊 Vectores cargados para {len(vectores)} trabajos")
+    log.debug("Vectores cargados para %s trabajos", len(vectores))
     
     # 5. Vectorizar la consulta
     consulta_vector = model.encode([consulta], convert_to_tensor=True)
@@ -961,7 +2849,7 @@ def obtener_trabajos_por_institucion_ordenados(pais, institution_id, consulta=No
     # 6. Calcular similitudes para cada trabajo
     trabajos_con_similitud = []
     
-    for trabajo in tqdm(trabajos, desc="Calculando similitudes"):
+    for trabajo in trabajos:
         trabajo_id = trabajo['_id']
         if trabajo_id not in vectores:
             # Si no tiene vectores, asignar similitud 0
@@ -1003,70 +2891,68 @@ def obtener_trabajos_por_institucion_ordenados(pais, institution_id, consulta=No
     # 8. Aplicar límite si se especificó
     resultado = trabajos_ordenados[:top_n] if top_n else trabajos_ordenados
     
-    print(f"✅ Devolviendo {len(resultado)} trabajos ordenados por similitud")
+    log.debug("Devolviendo %s trabajos ordenados por similitud", len(resultado))
     
     # Mostrar estadísticas de similitud
-    if resultado:
+    if resultado and log.isEnabledFor(logging.DEBUG):
         similitudes = [t['similitud'] for t in resultado]
-        print(f"📈 Estadísticas similitud - Max: {max(similitudes):.3f}, Min: {min(similitudes):.3f}, Avg: {np.mean(similitudes):.3f}")
+        log.debug("Estadísticas similitud - Max: %.3f, Min: %.3f, Avg: %.3f", max(similitudes), min(similitudes), np.mean(similitudes))
     
     return resultado
 
-def obtener_trabajos_por_institucion_con_umbral(pais, institution_id, consulta=None, 
-                                              top_n=None, peso_titulo=0.3, peso_conceptos=0.7,
-                                              umbral_similitud=0.3, filtros=None):
+def rankear_trabajos_por_institucion_con_umbral(pais, institution_id, consulta=None,
+                                                peso_titulo=0.3, peso_conceptos=0.7,
+                                                umbral_similitud=0.3, filtros=None):
     """
-    Obtiene trabajos de una institución APLICANDO UMBRAL DE SIMILITUD
+    Ranking de los trabajos de una institución APLICANDO UMBRAL DE SIMILITUD con los
+    vectores de vector_works (método tradicional, sin matrices). Solo lee IDs y
+    vectores: los documentos se traen después por lotes (iterar_trabajos_rankeados).
+    
+    Returns:
+        tuple: (pares (work_id, similitud) de mayor a menor similitud,
+        {work_id: (similitud_titulo, similitud_conceptos)}). Sin consulta la similitud
+        es None y se conserva el orden de institution_works.
     """
     # Validar pesos
     if abs((peso_titulo + peso_conceptos) - 1.0) > 0.01:
         raise ValueError("La suma de pesos debe ser 1.0")
     
-    print(f"🔍 Buscando trabajos para institución {institution_id} en {pais} con umbral {umbral_similitud}")
+    log.debug("Buscando trabajos para institución %s en %s con umbral %s", institution_id, pais, umbral_similitud)
     
     # 1. Obtener todos los work_ids de la institución
-    coleccion_relaciones = f'institution_works_{pais.lower()}'
-    relaciones = list(db[coleccion_relaciones].find(
+    relaciones = list(repositorio.buscar(
+        'institution_works', pais,
         {'institution_id': institution_id},
-        {'work_id': 1}
+        {'_id': 0, 'work_id': 1}
     ))
     work_ids = [r['work_id'] for r in relaciones]
     
     if not work_ids:
-        print(f"⚠️  No se encontraron trabajos para la institución {institution_id}")
-        return []
+        log.debug("No se encontraron trabajos para la institución %s", institution_id)
+        return [], {}
     
-    print(f"📚 Encontrados {len(work_ids)} trabajos iniciales")
+    log.debug("Encontrados %s trabajos iniciales", len(work_ids))
     
     # 2. Aplicar filtros si existen
     if filtros:
         work_ids_filtrados = aplicar_filtros_trabajos(pais.lower(), work_ids, filtros)
         if not work_ids_filtrados:
-            print("⚠️  No hay trabajos después de aplicar filtros")
-            return []
+            log.debug("No hay trabajos después de aplicar filtros")
+            return [], {}
         work_ids = work_ids_filtrados
     
-    print(f"✅ {len(work_ids)} trabajos después de filtros")
-    
-    # 3. Obtener los trabajos completos
-    coleccion_works = f'works_{pais.lower()}'
-    trabajos = list(db[coleccion_works].find(
-        {'_id': {'$in': work_ids}}
-    ))
+    log.debug("%s trabajos después de filtros", len(work_ids))
     
-    # Si no hay consulta, devolver todos los trabajos sin ordenar (sin umbral)
+    # Si no hay consulta, todos los trabajos sin ordenar (sin umbral)
     if not consulta:
-        resultado = trabajos[:top_n] if top_n else trabajos
-        print(f"📦 Devolviendo {len(resultado)} trabajos sin ordenar (sin consulta)")
-        return resultado
+        return [(work_id, None) for work_id in work_ids], {}
     
-    print(f"🎯 Ordenando {len(trabajos)} trabajos por similitud con: '{consulta}'")
+    log.debug("Ordenando %s trabajos por similitud con: '%s'", len(work_ids), consulta)
     
-    # 4. Obtener los vectores de los trabajos
-    coleccion_vectores = f'vector_works_{pais.lower()}'
+    # 3. Obtener los vectores de los trabajos
     vectores = {}
     
-    for doc in db[coleccion_vectores].find({'_id': {'$in': work_ids}}):
+    for doc in repositorio.buscar('vector_works', pais, {'_id': {'$in': work_ids}}):
         try:
             titulo_vector = pickle.loads(doc['titulo_vector']) if 'titulo_vector' in doc else None
             conceptos_vector = pickle.loads(doc['conceptos_vector']) if doc.get('conceptos_vector') else None
@@ -1077,19 +2963,19 @@ def obtener_trabajos_por_institucion_con_umbral(pais, institution_id, consulta=N
                     'conceptos_vector': conceptos_vector
                 }
         except Exception as e:
-            print(f"⚠️  Error cargando vectores para {doc['_id']}: {str(e)}")
+            log.warning("Error cargando vectores para %s: %s", doc['_id'], e)
             continue
     
-    print(f"📊 Vectores cargados para {len(vectores)} trabajos")
+    log.debug("Vectores cargados para %s trabajos", len(vectores))
     
-    # 5. Vectorizar la consulta
+    # 4. Vectorizar la consulta
     consulta_vector = model.encode([consulta], convert_to_tensor=True)
     
-    # 6. Calcular similitudes para cada trabajo y APLICAR UMBRAL
-    trabajos_con_similitud = []
+    # 5. Calcular similitudes para cada trabajo y APLICAR UMBRAL
+    ranking = []
+    detalles = {}
     
-    for trabajo in tqdm(trabajos, desc="Calculando similitudes"):
-        trabajo_id = trabajo['_id']
+    for trabajo_id in dict.fromkeys(work_ids):
         if trabajo_id not in vectores:
             # Si no tiene vectores, asignar similitud 0
             similitud_total = 0.0
@@ -1117,192 +3003,328 @@ def obtener_trabajos_por_institucion_con_umbral(pais, institution_id, consulta=N
         
         # SOLO INCLUIR TRABAJOS QUE SUPEREN EL UMBRAL
         if similitud_total >= umbral_similitud:
-            trabajo['similitud'] = float(similitud_total)
-            trabajo['similitud_titulo'] = float(similitud_titulo)
-            trabajo['similitud_conceptos'] = float(similitud_conceptos)
-            trabajos_con_similitud.append(trabajo)
+            ranking.append((trabajo_id, float(similitud_total)))
+            detalles[trabajo_id] = (float(similitud_titulo), float(similitud_conceptos))
     
-    print(f"📊 {len(trabajos_con_similitud)} trabajos superan el umbral de {umbral_similitud}")
+    log.debug("%s trabajos superan el umbral de %s", len(ranking), umbral_similitud)
     
-    # 7. Ordenar por similitud (mayor a menor)
-    trabajos_ordenados = sorted(trabajos_con_similitud, key=lambda x: x['similitud'], reverse=True)
+    # 6. Ordenar por similitud (mayor a menor)
+    ranking.sort(key=lambda par: par[1], reverse=True)
     
-    # 8. Aplicar límite si se especificó
-    resultado = trabajos_ordenados[:top_n] if top_n else trabajos_ordenados
+    # Mostrar estadísticas de similitud
+    if ranking and log.isEnabledFor(logging.DEBUG):
+        similitudes = [similitud for _, similitud in ranking]
+        log.debug("Estadísticas similitud - Max: %.3f, Min: %.3f, Avg: %.3f", max(similitudes), min(similitudes), np.mean(similitudes))
     
-    print(f"✅ Devolviendo {len(resultado)} trabajos ordenados por similitud (con umbral)")
+    return ranking, detalles
+
+def obtener_trabajos_por_institucion_con_umbral(pais, institution_id, consulta=None, 
+                                              top_n=None, peso_titulo=0.3, peso_conceptos=0.7,
+                                              umbral_similitud=0.3, filtros=None):
+    """
+    Obtiene trabajos de una institución APLICANDO UMBRAL DE SIMILITUD
+    """
+    ranking, detalles = rankear_trabajos_por_institucion_con_umbral(
+        pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros
+    )
     
-    # Mostrar estadísticas de similitud
-    if resultado:
-        similitudes = [t['similitud'] for t in resultado]
-        print(f"📈 Estadísticas similitud - Max: {max(similitudes):.3f}, Min: {min(similitudes):.3f}, Avg: {np.mean(similitudes):.3f}")
+    # Aplicar límite antes de traer los documentos
+    if top_n:
+        ranking = ranking[:top_n]
     
+    resultado = list(iterar_trabajos_rankeados(pais, ranking, detalles=detalles))
+    log.debug("Devolviendo %s trabajos (método tradicional)", len(resultado))
     return resultado
 
-def obtener_trabajos_por_institucion_con_matrices(pais, institution_id, consulta=None, 
-                                                top_n=None, peso_titulo=0.3, peso_conceptos=0.7,
-                                                umbral_similitud=0.3, filtros=None):
+# Documentos por consulta al traer trabajos rankeados desde MongoDB
+TAMANO_LOTE_TRABAJOS = int(os.environ.get('AUTHORCOLAB_LOTE_TRABAJOS', 500))
+
+def rankear_trabajos_institucion_con_matrices(pais, institution_id, consulta=None, 
+                                              peso_titulo=0.3, peso_conceptos=0.7,
+                                              umbral_similitud=0.3, filtros=None, pesos_ranking=None):
     """
-    Obtiene trabajos de una institución USANDO LAS MISMAS MATRICES que para la búsqueda de instituciones
+    Ranking de los trabajos de una institución USANDO LAS MISMAS MATRICES que para la
+    búsqueda de instituciones, sin traer los documentos de MongoDB. Con pesos_ranking
+    (ver pesos_ranking_trabajos) el orden es el del ranking híbrido, calculado en la
+    misma pasada que las similitudes; el umbral se aplica siempre a la similitud.
+    
+    Returns:
+        list: Pares (work_id, similitud) de mayor a menor similitud (o puntaje híbrido).
+        Sin consulta la similitud es None y se conserva el orden de la matriz.
     """
-    if matrices_cargadas.get('obras') is None:
-        print("⚠️  Matrices no disponibles, usando método tradicional")
-        return obtener_trabajos_por_institucion_con_umbral(
-            pais, institution_id, consulta, top_n, peso_titulo, peso_conceptos, umbral_similitud, filtros
-        )
+    log.debug("Buscando trabajos con MATRICES para institución %s en %s", institution_id, pais)
     
-    try:
-        print(f"🔍 Buscando trabajos con MATRICES para institución {institution_id} en {pais}")
-        
-        # 1. Obtener work_ids de la institución
-        coleccion_relaciones = f'institution_works_{pais.lower()}'
-        relaciones = list(db[coleccion_relaciones].find(
+    # 1. Obtener work_ids de la institución
+    with etapa('mongo_relaciones'):
+        relaciones = list(repositorio.buscar(
+            'institution_works', pais,
             {'institution_id': institution_id},
-            {'work_id': 1}
+            {'_id': 0, 'work_id': 1}
         ))
         work_ids_institucion = [r['work_id'] for r in relaciones]
-        
-        if not work_ids_institucion:
-            print(f"⚠️  No se encontraron trabajos para la institución {institution_id}")
-            return []
-        
-        print(f"📚 Institución tiene {len(work_ids_institucion)} trabajos")
-        
-        # 2. Aplicar filtros si existen
-        if filtros:
+    
+    if not work_ids_institucion:
+        log.debug("No se encontraron trabajos para la institución %s", institution_id)
+        return []
+    
+    log.debug("Institución tiene %s trabajos", len(work_ids_institucion))
+    
+    # 2. Aplicar filtros si existen
+    if filtros:
+        with etapa('filtros'):
             work_ids_filtrados = aplicar_filtros_trabajos(pais.lower(), work_ids_institucion, filtros)
-            if not work_ids_filtrados:
-                print("⚠️  No hay trabajos después de aplicar filtros")
-                return []
-            work_ids_institucion = work_ids_filtrados
-        
-        print(f"✅ {len(work_ids_institucion)} trabajos después de filtros")
-        
-        # 3. Obtener datos de la matriz
-        matriz = matrices_cargadas['obras']
-        metadata = matriz['metadata']
-        
-        # Convertir a listas de Python
-        ids_obras = [id.decode('utf-8') if isinstance(id, bytes) else id for id in metadata['ids'][:]]
-        paises_obras = [pais.decode('utf-8') if isinstance(pais, bytes) else pais for pais in metadata['paises'][:]]
-        instituciones_json = [inst.decode('utf-8') if isinstance(inst, bytes) else inst for inst in metadata['instituciones_json'][:]]
-        
-        # 4. Encontrar índices de los trabajos de esta institución en la matriz
-        indices_trabajos_institucion = []
-        work_ids_encontrados = []
-        
-        for idx, work_id in enumerate(ids_obras):
-            # Verificar si es del país correcto y de la institución
-            if (paises_obras[idx].upper() == pais.upper() and 
-                work_id in work_ids_institucion):
-                
-                # Verificar que la obra pertenezca a esta institución en los datos de la matriz
-                try:
-                    instituciones_obra = json.loads(instituciones_json[idx])
-                    instituciones_ids = [inst.get('id') for inst in instituciones_obra if inst.get('id')]
-                    if institution_id in instituciones_ids:
-                        indices_trabajos_institucion.append(idx)
-                        work_ids_encontrados.append(work_id)
-                except:
-                    continue
-        
-        print(f"📊 Encontrados {len(indices_trabajos_institucion)} trabajos en la matriz")
-        
-        if not indices_trabajos_institucion:
-            print("⚠️  No se encontraron trabajos de la institución en la matriz")
-            return []
-        
-        # 5. Si no hay consulta, obtener trabajos sin cálculo de similitud
-        if not consulta:
-            trabajos = list(db[f'works_{pais.lower()}'].find(
-                {'_id': {'$in': work_ids_encontrados}}
-            ))
-            resultado = trabajos[:top_n] if top_n else trabajos
-            print(f"📦 Devolviendo {len(resultado)} trabajos sin ordenar")
-            return resultado
-        
-        # 6. Calcular similitudes usando las MISMAS matrices
-        print(f"🎯 Calculando similitudes para {len(indices_trabajos_institucion)} trabajos")
-        
-        # Vectorizar consulta y aplicar PCA (MISMO MÉTODO que para instituciones)
-        embedding_consulta = model.encode([consulta])[0]
-        consulta_titulo = pca_models['titulo'].transform([embedding_consulta])[0]
-        consulta_conceptos = pca_models['conceptos'].transform([embedding_consulta])[0]
-        
-        # Normalizar vectores de consulta
-        consulta_titulo_norm = consulta_titulo / np.linalg.norm(consulta_titulo)
-        consulta_conceptos_norm = consulta_conceptos / np.linalg.norm(consulta_conceptos)
-        
-        # Obtener vectores de la matriz
-        titulo_vectores = matriz['titulo_vectores'][indices_trabajos_institucion]
-        conceptos_vectores = matriz['conceptos_vectores'][indices_trabajos_institucion]
-        
-        # Normalizar vectores
-        normas_titulo = np.linalg.norm(titulo_vectores, axis=1, keepdims=True)
-        titulo_normalizado = titulo_vectores / normas_titulo
-        
-        normas_conceptos = np.linalg.norm(conceptos_vectores, axis=1, keepdims=True)
-        conceptos_normalizado = conceptos_vectores / normas_conceptos
-        
-        # Calcular similitudes
-        similitudes_titulo = np.dot(titulo_normalizado, consulta_titulo_norm)
-        similitudes_conceptos = np.dot(conceptos_normalizado, consulta_conceptos_norm)
-        
-        # Combinar con ponderación
-        similitudes_totales = (peso_titulo * similitudes_titulo + 
-                              peso_conceptos * similitudes_conceptos)
-        
-        # 7. Aplicar umbral y obtener trabajos relevantes
-        mascara_relevantes = similitudes_totales >= umbral_similitud
-        indices_relevantes = np.array(indices_trabajos_institucion)[mascara_relevantes]
-        similitudes_relevantes = similitudes_totales[mascara_relevantes]
-        work_ids_relevantes = [work_ids_encontrados[i] for i in range(len(work_ids_encontrados)) if mascara_relevantes[i]]
-        
-        print(f"📈 {len(work_ids_relevantes)} trabajos superan el umbral de {umbral_similitud}")
-        
-        if not work_ids_relevantes:
+        if not work_ids_filtrados:
+            log.debug("No hay trabajos después de aplicar filtros")
             return []
+        work_ids_institucion = work_ids_filtrados
+    
+    log.debug("%s trabajos después de filtros", len(work_ids_institucion))
+    
+    # 3. Obtener datos de la matriz
+    datos = obtener_datos_matriz_obras()
+    ids_obras = datos['ids']
+    instituciones = datos['instituciones']
+    
+    # 4. Encontrar índices de los trabajos de esta institución en la matriz
+    indices_trabajos_institucion = []
+    work_ids_encontrados = []
+    work_ids_institucion = set(work_ids_institucion)
+    
+    with etapa('instituciones_obras'):
+        for idx in indices_obras_pais(pais):
+            work_id = ids_obras[idx]
+            # Verificar si es de la institución y que la obra pertenezca a esta
+            # institución en los datos de la matriz
+            if work_id in work_ids_institucion and institution_id in instituciones.de_obra(idx):
+                indices_trabajos_institucion.append(idx)
+                work_ids_encontrados.append(work_id)
+    
+    log.debug("Encontrados %s trabajos en la matriz", len(indices_trabajos_institucion))
+    
+    if not indices_trabajos_institucion:
+        log.debug("No se encontraron trabajos de la institución en la matriz")
+        return []
+    
+    # 5. Si no hay consulta, no hay similitud que calcular
+    if not consulta:
+        return [(work_id, None) for work_id in work_ids_encontrados]
+    
+    # 6. Calcular similitudes usando las MISMAS matrices
+    log.debug("Calculando similitudes para %s trabajos", len(indices_trabajos_institucion))
+    
+    # Vectorizar consulta y aplicar PCA (MISMO MÉTODO que para instituciones)
+    consulta_vectores = codificar_consulta(consulta)
+    ajustes = ajustes_ranking_trabajos(pesos_ranking)
+    with etapa('puntuar'):
+        similitudes_totales, puntajes = buscador_exacto.puntuar_con_ajustes(
+            terminos_obras(consulta_vectores, peso_titulo, peso_conceptos), ajustes, indices_trabajos_institucion
+        )
+    
+    # 7. Aplicar umbral y ordenar por puntaje (sin pesos, la similitud)
+    with etapa('ordenar'):
+        superan = np.flatnonzero(similitudes_totales >= umbral_similitud)
+        orden = superan[np.argsort(-puntajes[superan], kind='stable')]
+        ranking = [(work_ids_encontrados[i], float(similitudes_totales[i])) for i in orden]
+    
+    log.debug("%s trabajos superan el umbral de %s", len(ranking), umbral_similitud)
+    
+    return ranking
+
+def iterar_trabajos_rankeados(pais, ranking, tamano_lote=TAMANO_LOTE_TRABAJOS, detalles=None):
+    """
+    Trae de MongoDB los documentos de un ranking (work_id, similitud) en lotes,
+    entregándolos en el orden del ranking y con la similitud agregada. Solo un lote
+    de documentos está en memoria a la vez. detalles: {work_id: (similitud_titulo,
+    similitud_conceptos)} del método tradicional.
+    """
+    detalles = detalles or {}
+    vistos = set()
+    for inicio in range(0, len(ranking), tamano_lote):
+        lote = [(w, sim) for w, sim in ranking[inicio:inicio + tamano_lote] if w not in vistos]
+        vistos.update(w for w, _ in lote)
         
-        # 8. Obtener trabajos completos y agregar similitudes
-        trabajos_completos = list(db[f'works_{pais.lower()}'].find(
-            {'_id': {'$in': work_ids_relevantes}}
-        ))
-        
-        # Crear mapping de work_id a similitud
-        similitud_map = {work_id: similitud for work_id, similitud in zip(work_ids_relevantes, similitudes_relevantes)}
-        
-        # Agregar similitudes a los trabajos
-        for trabajo in trabajos_completos:
-            trabajo_id = trabajo['_id']
-            if trabajo_id in similitud_map:
-                trabajo['similitud'] = float(similitud_map[trabajo_id])
-                # Para compatibilidad con el frontend
-                trabajo['similitud_titulo'] = 0.0  # No tenemos estos datos separados en matrices
-                trabajo['similitud_conceptos'] = 0.0
+        with etapa('mongo_trabajos'):
+            documentos = {
+                trabajo['_id']: trabajo
+                for trabajo in repositorio.buscar('works', pais, {'_id': {'$in': [w for w, _ in lote]}})
+            }
+        for work_id, similitud in lote:
+            trabajo = documentos.get(work_id)
+            if trabajo is None:
+                continue
+            if similitud is not None:
+                trabajo['similitud'] = similitud
+                # Para compatibilidad con el frontend (en matrices no están separadas: 0.0)
+                trabajo['similitud_titulo'], trabajo['similitud_conceptos'] = detalles.get(work_id, (0.0, 0.0))
+            yield trabajo
+
+def obtener_trabajos_por_institucion_con_matrices(pais, institution_id, consulta=None, 
+                                                top_n=None, peso_titulo=0.3, peso_conceptos=0.7,
+                                                umbral_similitud=0.3, filtros=None, pesos_ranking=None):
+    """
+    Obtiene trabajos de una institución USANDO LAS MISMAS MATRICES que para la búsqueda
+    de instituciones. Devuelve (trabajos, método): 'tradicional' si tuvo que usarlo.
+    """
+    if datos_activos().matriz_obras is None:
+        log.warning("Matrices no disponibles, usando método tradicional")
+        return obtener_trabajos_por_institucion_con_umbral(
+            pais, institution_id, consulta, top_n, peso_titulo, peso_conceptos, umbral_similitud, filtros
+        ), 'tradicional'
+    
+    try:
+        ranking = rankear_trabajos_institucion_con_matrices(
+            pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+        )
         
-        # 9. Ordenar por similitud
-        trabajos_ordenados = sorted(trabajos_completos, key=lambda x: x.get('similitud', 0), reverse=True)
+        # Aplicar límite antes de traer los documentos
+        if top_n:
+            ranking = ranking[:top_n]
         
-        # 10. Aplicar límite
-        resultado = trabajos_ordenados[:top_n] if top_n else trabajos_ordenados
+        resultado = list(iterar_trabajos_rankeados(pais, ranking))
         
-        print(f"✅ Devolviendo {len(resultado)} trabajos ordenados por similitud")
+        log.debug("Devolviendo %s trabajos ordenados por similitud", len(resultado))
         
-        return resultado
+        return resultado, 'matrices'
         
     except Exception as e:
-        print(f"❌ Error en obtener_trabajos_por_institucion_con_matrices: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en obtener_trabajos_por_institucion_con_matrices: %s", e)
         # Fallback al método tradicional
         return obtener_trabajos_por_institucion_con_umbral(
             pais, institution_id, consulta, top_n, peso_titulo, peso_conceptos, umbral_similitud, filtros
-        )
+        ), 'tradicional'
+
+
+def iterar_trabajos_institucion(pais, institution_id, consulta=None, top_n=None,
+                                peso_titulo=0.3, peso_conceptos=0.7, umbral_similitud=0.3, filtros=None,
+                                pesos_ranking=None):
+    """
+    Versión en streaming de los trabajos de una institución: calcula el ranking y
+    devuelve (iterador de trabajos, método). El ranking (IDs y similitudes) se calcula
+    completo antes de entregar el primer trabajo, porque el orden depende de todos;
+    los documentos se traen de MongoDB por lotes a medida que se consumen, con
+    matrices y con el método tradicional.
+    """
+    if consulta and datos_activos().matriz_obras is not None:
+        try:
+            ranking = rankear_trabajos_institucion_con_matrices(
+                pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            if top_n:
+                ranking = ranking[:top_n]
+            return iterar_trabajos_rankeados(pais, ranking), 'matrices'
+        except Exception as e:
+            log.error("Error en iterar_trabajos_institucion: %s", e)
+    
+    ranking, detalles = rankear_trabajos_por_institucion_con_umbral(
+        pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros
+    )
+    if top_n:
+        ranking = ranking[:top_n]
+    return iterar_trabajos_rankeados(pais, ranking, detalles=detalles), 'tradicional'
+
+
+# ========== PAGINACIÓN CON CURSOR ==========
+
+# Rankings de trabajos guardados entre páginas: (pares work_id-similitud, método,
+# (país, institución) para la que se calculó)
+cache_rankings = CacheResultados(
+    'rankings_trabajos',
+    max_bytes=int(os.environ.get('AUTHORCOLAB_CACHE_RANKINGS_MB', 64)) * 1024 * 1024,
+    ttl=int(os.environ.get('AUTHORCOLAB_CACHE_RANKINGS_TTL', 600))
+)
+
+MAX_LIMITE_PAGINA = 1000
+
+class CursorInvalido(Exception):
+    """Cursor de paginación malformado (400) o cuyo ranking ya expiró (410)"""
+    def __init__(self, mensaje, codigo=400):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+def _codificar_cursor(clave, desplazamiento, limite):
+    datos = json.dumps({'r': clave, 'o': desplazamiento, 'l': limite}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decodificar_cursor(cursor):
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        clave, desplazamiento, limite = datos['r'], int(datos['o']), int(datos['l'])
+    except Exception:
+        raise CursorInvalido('Cursor inválido')
+    if not isinstance(clave, str) or desplazamiento < 0:
+        raise CursorInvalido('Cursor inválido')
+    return clave, desplazamiento, limite
+
+def rankear_trabajos_institucion(pais, institution_id, consulta=None, peso_titulo=0.3, peso_conceptos=0.7,
+                                 umbral_similitud=0.3, filtros=None, pesos_ranking=None):
+    """
+    Ranking (work_id, similitud) de los trabajos de una institución con el mismo método
+    que el endpoint sin paginar. Devuelve (ranking, método).
+    """
+    if consulta and datos_activos().matriz_obras is not None:
+        try:
+            ranking = rankear_trabajos_institucion_con_matrices(
+                pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            return ranking, 'matrices'
+        except Exception as e:
+            log.error("Error en rankear_trabajos_institucion: %s", e)
+    
+    # Solo IDs y similitudes: los documentos se traen página a página
+    ranking, _ = rankear_trabajos_por_institucion_con_umbral(
+        pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros
+    )
+    return ranking, 'tradicional'
 
+def pagina_trabajos_institucion(pais, institution_id, cursor=None, limite=None, consulta=None,
+                                peso_titulo=0.3, peso_conceptos=0.7, umbral_similitud=0.3, filtros=None,
+                                pesos_ranking=None):
+    """
+    Página de trabajos de una institución. La primera página (sin cursor) calcula el
+    ranking completo y lo guarda en cache_rankings; las siguientes solo traen de
+    MongoDB los 'limite' documentos de su tramo del ranking.
+    """
+    if cursor:
+        clave, desplazamiento, limite_cursor = _decodificar_cursor(cursor)
+        limite = limite or limite_cursor
+        guardado = cache_rankings.obtener(clave)
+        if guardado is None:
+            raise CursorInvalido('El cursor expiró, vuelva a pedir la primera página', codigo=410)
+        if guardado[2] != (pais.lower(), institution_id):
+            raise CursorInvalido('El cursor corresponde a otra institución')
+    else:
+        desplazamiento = 0
+        parametros = [datos_activos().version, pais.lower(), institution_id, consulta or '', peso_titulo, peso_conceptos,
+                      umbral_similitud, sorted((filtros or {}).items()), sorted((pesos_ranking or {}).items())]
+        clave = hashlib.sha1(json.dumps(parametros, default=str).encode('utf-8')).hexdigest()
+        guardado = cache_rankings.obtener(clave)
+        if guardado is None:
+            ranking, metodo = rankear_trabajos_institucion(
+                pais, institution_id, consulta, peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            guardado = (ranking, metodo, (pais.lower(), institution_id))
+            cache_rankings.guardar(clave, guardado, tamano=len(guardado[0]) * 160)
+    
+    ranking, metodo, _ = guardado
+    limite = max(1, min(limite or 50, MAX_LIMITE_PAGINA))
+    tramo = ranking[desplazamiento:desplazamiento + limite]
+    trabajos = list(iterar_trabajos_rankeados(pais, tramo))
+    
+    siguiente = desplazamiento + limite
+    return {
+        'trabajos': trabajos,
+        'total': len(ranking),
+        'desplazamiento': desplazamiento,
+        'limite': limite,
+        'siguiente_cursor': _codificar_cursor(clave, siguiente, limite) if siguiente < len(ranking) else None,
+        'metodo': metodo
+    }
 
 # ========== ENDPOINTS EXISTENTES (modificados ligeramente) ==========
 
 @app.route('/api/institucion/<pais>/<institution_id>/trabajos', methods=['GET'])
+@respuesta_cacheable
+@requiere_componentes('modelo_embeddings', 'matrices_obras')
 def obtener_trabajos_institucion(pais, institution_id):
     """
     Endpoint MEJORADO para trabajos de institución - USA MÉTODO CONSISTENTE
@@ -1324,13 +3346,40 @@ def obtener_trabajos_institucion(pais, institution_id):
         }
         
         filtros = {k: v for k, v in filtros.items() if v is not None}
+        pesos_ranking = pesos_ranking_trabajos(request.args)
+        
+        log.debug("Solicitando trabajos para institución %s en %s", institution_id, pais)
+        log.debug("Parámetros - Consulta: '%s', Umbral: %s", consulta, umbral_similitud)
+        
+        cursor = request.args.get('cursor')
+        limite = request.args.get('limit', type=int)
+        if cursor or limite:
+            pagina = pagina_trabajos_institucion(
+                pais.lower(), institution_id, cursor, limite, consulta,
+                peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            return respuesta_json(dict(
+                pagina,
+                filtros_aplicados=filtros,
+                umbral_similitud=umbral_similitud,
+                pesos_ranking=pesos_ranking_usados(pesos_ranking, pagina['metodo'], consulta)
+            ), campos_documentos=('trabajos',))
         
-        print(f"🎯 Solicitando trabajos para institución {institution_id} en {pais}")
-        print(f"📊 Parámetros - Consulta: '{consulta}', Umbral: {umbral_similitud}")
+        if quiere_ndjson():
+            trabajos, metodo = iterar_trabajos_institucion(
+                pais.lower(), institution_id, consulta, top_n,
+                peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            return respuesta_ndjson(lineas_trabajos(trabajos, {
+                'filtros_aplicados': filtros,
+                'umbral_similitud': umbral_similitud,
+                'pesos_ranking': pesos_ranking_usados(pesos_ranking, metodo, consulta),
+                'metodo': metodo
+            }))
         
         # USAR MÉTODO CONSISTENTE CON MATRICES
-        if consulta and matrices_cargadas.get('obras'):
-            trabajos = obtener_trabajos_por_institucion_con_matrices(
+        if consulta and datos_activos().matriz_obras is not None:
+            trabajos, metodo = obtener_trabajos_por_institucion_con_matrices(
                 pais=pais.lower(),
                 institution_id=institution_id,
                 consulta=consulta,
@@ -1338,9 +3387,9 @@ def obtener_trabajos_institucion(pais, institution_id):
                 peso_titulo=peso_titulo,
                 peso_conceptos=peso_conceptos,
                 umbral_similitud=umbral_similitud,
-                filtros=filtros
+                filtros=filtros,
+                pesos_ranking=pesos_ranking
             )
-            metodo = 'matrices'
         else:
             # Fallback al método tradicional
             trabajos = obtener_trabajos_por_institucion_con_umbral(
@@ -1355,23 +3404,166 @@ def obtener_trabajos_institucion(pais, institution_id):
             )
             metodo = 'tradicional'
         
-        print(f"✅ Encontrados {len(trabajos)} trabajos para {institution_id} (método: {metodo})")
+        log.debug("Encontrados %s trabajos para %s (método: %s)", len(trabajos), institution_id, metodo)
         
-        return jsonify({
-            'trabajos': json_util.dumps(trabajos),
+        return respuesta_json({
+            'trabajos': trabajos,
             'total': len(trabajos),
             'filtros_aplicados': filtros,
             'umbral_similitud': umbral_similitud,
+            'pesos_ranking': pesos_ranking_usados(pesos_ranking, metodo, consulta),
             'metodo': metodo
-        })
+        }, campos_documentos=('trabajos',))
     
+    except CursorInvalido as e:
+        return jsonify({'error': str(e)}), e.codigo
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Error en obtener_trabajos_institucion: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en obtener_trabajos_institucion: %s", e)
         return jsonify({'error': str(e)}), 500
 
+# ========== BÚSQUEDA EN TODOS LOS PAÍSES ==========
+
+# Hilos para completar los países en paralelo (cada uno hace sus consultas a MongoDB)
+HILOS_FANOUT_PAISES = int(os.environ.get('AUTHORCOLAB_FANOUT_HILOS', 8))
+# Plazo por defecto (segundos) para cada país; los que no terminan se reportan como incompletos
+PLAZO_PAIS_SEGUNDOS = float(os.environ.get('AUTHORCOLAB_PLAZO_PAIS', 20))
+# Plazo de toda la búsqueda, también para los países que siguen en la cola del pool
+# (compartido con las otras peticiones): acota la latencia con peticiones concurrentes
+PLAZO_TODOS_SEGUNDOS = float(os.environ.get('AUTHORCOLAB_PLAZO_TODOS', 30))
+
+ejecutor_paises = ThreadPoolExecutor(max_workers=HILOS_FANOUT_PAISES, thread_name_prefix='fanout-pais')
+
+def buscar_instituciones_todos_paises(consulta, umbral_similitud, peso_titulo, peso_conceptos,
+                                     filtros, plazo=PLAZO_PAIS_SEGUNDOS, paises=PAISES_LATAM,
+                                     plazo_total=PLAZO_TODOS_SEGUNDOS):
+    """
+    Busca instituciones en todos los países en paralelo.
+    
+    Con consulta, la codifica una sola vez y puntúa todas las obras de la matriz en
+    una pasada (solo si algún país no está en cache_busquedas); luego cada país solo
+    recorta sus puntajes y consulta MongoDB, en el pool de hilos.
+    
+    Es un generador que entrega (pais, instituciones, error) a medida que terminan
+    los países. Cada país tiene 'plazo' segundos desde que empieza a ejecutarse, y
+    toda la búsqueda 'plazo_total' segundos desde la llamada, cola del pool incluida.
+    Al vencer, el país se entrega con error 'timeout': si no empezó ya no se ejecuta,
+    y si está en curso sus consultas pendientes a MongoDB se abandonan (ver
+    plazo_consultas), de modo que su hilo vuelve pronto al pool.
+    
+    También con almacenamiento consolidado cada país hace sus propias consultas, en
+    lugar de una sola con country $in: así conserva su plazo y se entrega en cuanto
+    termina, sin esperar al país más lento.
+    """
+    paises = [p.upper() for p in paises]
+    fin_total = time.monotonic() + plazo_total
+    
+    if consulta.strip() and datos_activos().matriz_obras is not None:
+        lock_similitudes = threading.Lock()
+        calculadas = []
+        def similitudes():
+            with lock_similitudes:
+                if not calculadas:
+                    calculadas.append(puntuar_obras(codificar_consulta(consulta), peso_titulo, peso_conceptos))
+            return calculadas[0]
+        
+        def buscar_pais(pais):
+            return buscar_instituciones_con_matrices(
+                pais=pais,
+                consulta=consulta,
+                umbral_similitud=umbral_similitud,
+                peso_titulo=peso_titulo,
+                peso_conceptos=peso_conceptos,
+                filtros=filtros,
+                similitudes=similitudes
+            )
+    else:
+        # Búsqueda tradicional sin consulta semántica
+        def buscar_pais(pais):
+            return buscar_instituciones_tradicional_sin_consulta(pais, filtros)
+    
+    inicios = {}
+    def vencimiento(pais):
+        return min(inicios[pais] + plazo, fin_total) if pais in inicios else fin_total
+    
+    def buscar_pais_con_plazo(pais):
+        inicios[pais] = time.monotonic()
+        plazo_consultas.set(vencimiento(pais))
+        return buscar_pais(pais)
+    
+    # Cada tarea en una copia del contexto: usa el mismo conjunto de datos que la petición
+    pendientes = {
+        ejecutor_paises.submit(contextvars.copy_context().run, buscar_pais_con_plazo, pais): pais
+        for pais in paises
+    }
+    try:
+        while pendientes:
+            # Despertar a más tardar cuando vence el primer país (los que empiecen
+            # mientras tanto vencen después)
+            espera = max(0.0, min(vencimiento(pais) for pais in pendientes.values()) - time.monotonic())
+            terminados, _ = wait(pendientes, timeout=espera, return_when=FIRST_COMPLETED)
+            
+            for futuro in terminados:
+                pais = pendientes.pop(futuro)
+                try:
+                    instituciones_pais = futuro.result()
+                except (PlazoVencido, ExecutionTimeout):
+                    yield pais, [], 'timeout'
+                    continue
+                except Exception as e:
+                    yield pais, [], str(e)
+                    continue
+                
+                # Agregar información del país a cada institución
+                for institucion in instituciones_pais:
+                    institucion['pais'] = pais
+                yield pais, instituciones_pais, None
+            
+            ahora = time.monotonic()
+            for futuro, pais in list(pendientes.items()):
+                if ahora >= vencimiento(pais):
+                    del pendientes[futuro]
+                    futuro.cancel()
+                    yield pais, [], 'timeout'
+    finally:
+        # Si el consumidor deja de iterar, los países que aún no empezaron no se ejecutan
+        for futuro in pendientes:
+            futuro.cancel()
+
+def lineas_instituciones_todos_paises(consulta, umbral_similitud, peso_titulo, peso_conceptos,
+                                      filtros, plazo):
+    """
+    Líneas NDJSON de la búsqueda en todos los países: las instituciones de cada país
+    en cuanto ese país termina, una línea 'pais' por país y un resumen final
+    """
+    total = 0
+    paises_count = {}
+    paises_incompletos = []
+    for pais, instituciones_pais, error in buscar_instituciones_todos_paises(
+            consulta, umbral_similitud, peso_titulo, peso_conceptos, filtros, plazo=plazo):
+        for institucion in instituciones_pais:
+            yield {'tipo': 'institucion', 'datos': institucion}
+        total += len(instituciones_pais)
+        if instituciones_pais:
+            paises_count[pais] = len(instituciones_pais)
+        if error:
+            paises_incompletos.append(pais)
+        yield {'tipo': 'pais', 'pais': pais, 'total': len(instituciones_pais), 'error': error}
+    
+    yield {
+        'tipo': 'resumen',
+        'total': total,
+        'filtros_aplicados': filtros,
+        'consulta': consulta,
+        'distribucion_paises': paises_count,
+        'paises_incompletos': sorted(paises_incompletos),
+        'metodo': 'multi-pais'
+    }
+
 @app.route('/api/instituciones/todos', methods=['GET'])
+@respuesta_cacheable
+@requiere_componentes('modelo_embeddings', 'matrices_obras')
 def obtener_instituciones_todos_paises():
     """
     Endpoint para buscar instituciones en TODOS los países de Latinoamérica
@@ -1382,6 +3574,11 @@ def obtener_instituciones_todos_paises():
         peso_titulo = request.args.get('peso_titulo', 0.5, type=float)
         peso_conceptos = request.args.get('peso_conceptos', 0.5, type=float)
         umbral_similitud = request.args.get('umbral_similitud', 0.3, type=float)
+        plazo_pais = request.args.get('plazo_pais', PLAZO_PAIS_SEGUNDOS, type=float)
+        if not plazo_pais > 0:
+            raise ParametroInvalido('plazo_pais debe ser mayor que 0')
+        # El cliente puede acortar el plazo por país, no alargarlo
+        plazo_pais = min(plazo_pais, PLAZO_PAIS_SEGUNDOS)
         
         # Obtener filtros
         filtros = {
@@ -1395,46 +3592,33 @@ def obtener_instituciones_todos_paises():
         # Remover filtros None
         filtros = {k: v for k, v in filtros.items() if v is not None}
         
-        print(f"🌎 Búsqueda en TODOS los países - Consulta: '{consulta}'")
-        print(f"📊 Parámetros - Peso título: {peso_titulo}, Peso conceptos: {peso_conceptos}, Umbral: {umbral_similitud}")
-        print(f"🔧 Filtros: {filtros}")
-        
-        # Lista de países de Latinoamérica
-        paises_latam = ['AR', 'BO', 'BR', 'CL', 'CO', 'CR', 'CU', 'EC', 'SV', 'GT', 
-                       'HT', 'HN', 'MX', 'NI', 'PA', 'PY', 'PE', 'DO', 'UY', 'VE']
+        log.debug("Búsqueda en TODOS los países - Consulta: '%s'", consulta)
+        log.debug("Parámetros - Peso título: %s, Peso conceptos: %s, Umbral: %s", peso_titulo, peso_conceptos, umbral_similitud)
+        log.debug("Filtros: %s", filtros)
         
-        todas_instituciones = []
+        if quiere_ndjson():
+            return respuesta_ndjson(lineas_instituciones_todos_paises(
+                consulta, umbral_similitud, peso_titulo, peso_conceptos, filtros, plazo_pais
+            ))
         
-        # Buscar en cada país
-        for pais in paises_latam:
-            print(f"🔍 Buscando en {pais}...")
-            
-            try:
-                if consulta.strip() and matrices_cargadas.get('obras'):
-                    instituciones_pais = buscar_instituciones_con_matrices(
-                        pais=pais,
-                        consulta=consulta,
-                        umbral_similitud=umbral_similitud,
-                        peso_titulo=peso_titulo,
-                        peso_conceptos=peso_conceptos,
-                        filtros=filtros
-                    )
-                else:
-                    # Búsqueda tradicional sin consulta semántica
-                    instituciones_pais = buscar_instituciones_tradicional_sin_consulta(pais, filtros)
-                
-                # Agregar información del país a cada institución
-                for institucion in instituciones_pais:
-                    institucion['pais'] = pais  # Agregar campo país
-                
-                todas_instituciones.extend(instituciones_pais)
-                print(f"   ✅ {pais}: {len(instituciones_pais)} instituciones")
-                
-            except Exception as e:
-                print(f"   ❌ Error en {pais}: {str(e)}")
+        # Buscar en todos los países de Latinoamérica en paralelo
+        resultados_por_pais = {}
+        paises_incompletos = []
+        for pais, instituciones_pais, error in buscar_instituciones_todos_paises(
+                consulta, umbral_similitud, peso_titulo, peso_conceptos, filtros, plazo=plazo_pais):
+            if error:
+                log.warning("Error en %s: %s", pais, error)
+                paises_incompletos.append(pais)
                 continue
+            resultados_por_pais[pais] = instituciones_pais
+            log.debug("%s: %s instituciones", pais, len(instituciones_pais))
         
-        print(f"🌎 Búsqueda completada: {len(todas_instituciones)} instituciones en total")
+        # Mantener el orden por país de la respuesta
+        todas_instituciones = []
+        for pais in PAISES_LATAM:
+            todas_instituciones.extend(resultados_por_pais.get(pais.upper(), []))
+        
+        log.debug("Búsqueda completada: %s instituciones en total", len(todas_instituciones))
         
         # Estadísticas por país
         paises_count = {}
@@ -1442,24 +3626,31 @@ def obtener_instituciones_todos_paises():
             pais = inst.get('pais', 'Desconocido')
             paises_count[pais] = paises_count.get(pais, 0) + 1
         
-        print(f"📊 Distribución por países: {paises_count}")
+        log.debug("Distribución por países: %s", paises_count)
         
-        return jsonify({
-            'instituciones': json_util.dumps(todas_instituciones),
+        response = respuesta_json({
+            'instituciones': todas_instituciones,
             'total': len(todas_instituciones),
             'filtros_aplicados': filtros,
             'consulta': consulta,
             'distribucion_paises': paises_count,
+            'paises_incompletos': sorted(paises_incompletos),
             'metodo': 'multi-pais'
-        })
+        }, campos_documentos=('instituciones',))
+        if paises_incompletos:
+            # Resultado parcial (plazo vencido o error en algún país): no guardarlo en cache
+            response.cache_control.no_store = True
+        return response
     
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Error en obtener_instituciones_todos_paises: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en obtener_instituciones_todos_paises: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/institucion/<institution_id>/trabajos', methods=['GET'])
+@respuesta_cacheable
+@requiere_componentes('modelo_embeddings', 'matrices_obras')
 def obtener_trabajos_institucion_multi_pais(institution_id):
     """
     Endpoint para obtener trabajos de una institución en CUALQUIER país
@@ -1481,30 +3672,51 @@ def obtener_trabajos_institucion_multi_pais(institution_id):
         }
         
         filtros = {k: v for k, v in filtros.items() if v is not None}
+        pesos_ranking = pesos_ranking_trabajos(request.args)
         
-        print(f"🌎 Solicitando trabajos para institución {institution_id} en TODOS los países")
-        print(f"📊 Parámetros - Consulta: '{consulta}', Umbral: {umbral_similitud}")
+        log.debug("Solicitando trabajos para institución %s en TODOS los países", institution_id)
+        log.debug("Parámetros - Consulta: '%s', Umbral: %s", consulta, umbral_similitud)
         
         # Buscar la institución en todos los países
-        pais_encontrado = None
-        paises_latam = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt', 
-                       'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
-        
-        for pais in paises_latam:
-            coleccion = f'institutions_{pais}'
-            if coleccion in db.list_collection_names():
-                institucion = db[coleccion].find_one({'_id': institution_id})
-                if institucion:
-                    pais_encontrado = pais.upper()
-                    print(f"📍 Institución encontrada en: {pais_encontrado}")
-                    break
+        pais_encontrado, _ = repositorio.buscar_uno_en_paises('institutions', PAISES_LATAM, {'_id': institution_id}, {'_id': 1})
         
         if not pais_encontrado:
             return jsonify({'error': f'Institución {institution_id} no encontrada en ningún país'}), 404
         
+        pais_encontrado = pais_encontrado.upper()
+        log.debug("Institución encontrada en: %s", pais_encontrado)
+        
+        cursor = request.args.get('cursor')
+        limite = request.args.get('limit', type=int)
+        if cursor or limite:
+            pagina = pagina_trabajos_institucion(
+                pais_encontrado.lower(), institution_id, cursor, limite, consulta,
+                peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            return respuesta_json(dict(
+                pagina,
+                pais=pais_encontrado,
+                filtros_aplicados=filtros,
+                umbral_similitud=umbral_similitud,
+                pesos_ranking=pesos_ranking_usados(pesos_ranking, pagina['metodo'], consulta)
+            ), campos_documentos=('trabajos',))
+        
+        if quiere_ndjson():
+            trabajos, metodo = iterar_trabajos_institucion(
+                pais_encontrado.lower(), institution_id, consulta, top_n,
+                peso_titulo, peso_conceptos, umbral_similitud, filtros, pesos_ranking
+            )
+            return respuesta_ndjson(lineas_trabajos(trabajos, {
+                'pais': pais_encontrado,
+                'filtros_aplicados': filtros,
+                'umbral_similitud': umbral_similitud,
+                'pesos_ranking': pesos_ranking_usados(pesos_ranking, metodo, consulta),
+                'metodo': metodo
+            }))
+        
         # Obtener trabajos usando el método del país encontrado
-        if consulta and matrices_cargadas.get('obras'):
-            trabajos = obtener_trabajos_por_institucion_con_matrices(
+        if consulta and datos_activos().matriz_obras is not None:
+            trabajos, metodo = obtener_trabajos_por_institucion_con_matrices(
                 pais=pais_encontrado.lower(),
                 institution_id=institution_id,
                 consulta=consulta,
@@ -1512,9 +3724,9 @@ def obtener_trabajos_institucion_multi_pais(institution_id):
                 peso_titulo=peso_titulo,
                 peso_conceptos=peso_conceptos,
                 umbral_similitud=umbral_similitud,
-                filtros=filtros
+                filtros=filtros,
+                pesos_ranking=pesos_ranking
             )
-            metodo = 'matrices'
         else:
             trabajos = obtener_trabajos_por_institucion_con_umbral(
                 pais=pais_encontrado.lower(),
@@ -1528,29 +3740,34 @@ def obtener_trabajos_institucion_multi_pais(institution_id):
             )
             metodo = 'tradicional'
         
-        print(f"✅ Encontrados {len(trabajos)} trabajos para {institution_id} en {pais_encontrado}")
+        log.debug("Encontrados %s trabajos para %s en %s", len(trabajos), institution_id, pais_encontrado)
         
-        return jsonify({
-            'trabajos': json_util.dumps(trabajos),
+        return respuesta_json({
+            'trabajos': trabajos,
             'total': len(trabajos),
             'pais': pais_encontrado,
             'filtros_aplicados': filtros,
             'umbral_similitud': umbral_similitud,
+            'pesos_ranking': pesos_ranking_usados(pesos_ranking, metodo, consulta),
             'metodo': metodo
-        })
+        }, campos_documentos=('trabajos',))
     
+    except CursorInvalido as e:
+        return jsonify({'error': str(e)}), e.codigo
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Error en obtener_trabajos_institucion_multi_pais: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en obtener_trabajos_institucion_multi_pais: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ========== ENDPOINTS PARA AUTORES SIMILARES ==========
 
 @app.route('/api/find_similar_authors', methods=['POST'])
+@requiere_componentes('autores')
 def handle_find_similar_authors():
     try:
         # Verificar si los datos de autores están disponibles
+        authors_df = datos_activos().authors_df
         if authors_df is None:
             return jsonify({'error': 'La funcionalidad de autores similares no está disponible. Faltan archivos de datos.'}), 503
         
@@ -1568,6 +3785,10 @@ def handle_find_similar_authors():
         institution = data.get('institution')
         collaboration_min = data.get('collaborationMin')
         collaboration_max = data.get('collaborationMax')
+        try:
+            collaboration_weight = peso_colaboraciones_peticion(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Parámetro inválido: {e}'}), 400
         
         # Convertir colaboraciones a enteros si existen
         if collaboration_min is not None:
@@ -1575,6 +3796,11 @@ def handle_find_similar_authors():
         if collaboration_max is not None:
             collaboration_max = int(collaboration_max)
         
+        try:
+            figuras, incluir_datos_graficos = figuras_pedidas(data.get('figures', request.args.get('figures')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Llamar a la función principal (ahora retorna también el target_author_id)
         result_df, target_author_id = find_similar_authors(
             author_name=author_name,
@@ -1583,19 +3809,22 @@ def handle_find_similar_authors():
             country=country,
             institution=institution,
             collaboration_min=collaboration_min,
-            collaboration_max=collaboration_max
+            collaboration_max=collaboration_max,
+            collaboration_weight=collaboration_weight
         )
 
-        print(f"🔍 Autor objetivo ID: {target_author_id}")  # DEBUG
+        log.debug("Autor objetivo ID: %s", target_author_id)
         
         if result_df.empty:
             return jsonify({'error': 'No se encontraron autores similares con los criterios dados'}), 404
         
         # Obtener conceptos comunes
-        conceptos_top = obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10)
+        with etapa('conceptos'):
+            conceptos_top = obtener_conceptos_autores_similares(result_df, target_author_id, top_n=10)
         
-        # Crear visualizaciones (ahora incluye el gráfico de conceptos)
-        figures = create_visualizations(author_name, result_df, target_author_id)
+        # Crear visualizaciones (ahora incluye el gráfico de conceptos, con los mismos conceptos)
+        with etapa('graficos'):
+            figures = create_visualizations(author_name, result_df, target_author_id, conceptos_top, figuras)
         
         # Preparar datos de respuesta
         similar_authors_data = []
@@ -1617,9 +3846,8 @@ def handle_find_similar_authors():
             'target_author_id': target_author_id,  # Asegúrate de incluir esto
             'similar_authors': similar_authors_data,
             'top_concepts': conceptos_top,
-            'figures': {
-                k: v.to_json() for k, v in figures.items()
-            },
+            'figures': figuras_json(figures),
+            **({'chart_data': datos_graficos(result_df)} if incluir_datos_graficos else {}),
             'metadata': {
                 'total_authors_found': len(similar_authors_data),
                 'filters_applied': {
@@ -1627,21 +3855,126 @@ def handle_find_similar_authors():
                     'institution': institution,
                     'collaboration_min': collaboration_min,
                     'collaboration_max': collaboration_max
-                }
+                },
+                'collaboration_weight': collaboration_weight
             }
         }
-        print(f"📤 Enviando respuesta: {response_data['author_name']}, ID: {response_data['target_author_id']}")  # DEBUG
-        print(json.dumps(response_data, indent=2, default=str))
+        log.debug("Enviando respuesta: %s, ID: %s", response_data['author_name'], response_data['target_author_id'])
         
-        return jsonify(response_data)
+        with etapa('serializar'):
+            return jsonify(response_data)
     
     except Exception as e:
-        print(f"Error al procesar la solicitud: {str(e)}")
+        log.exception("Error al procesar la solicitud: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def filtros_autores(data):
+    """Filtros de autores del cuerpo de la petición, con los nombres de mascara_autores"""
+    collaboration_min = data.get('collaborationMin')
+    collaboration_max = data.get('collaborationMax')
+    return {
+        'country': data.get('country'),
+        'institution': data.get('institution'),
+        'collaboration_min': int(collaboration_min) if collaboration_min is not None else None,
+        'collaboration_max': int(collaboration_max) if collaboration_max is not None else None
+    }
+
+@app.route('/api/find_similar_authors/batch', methods=['POST'])
+@requiere_componentes('autores')
+def handle_find_similar_authors_batch():
+    """
+    Autores similares de una lista de autores (authorIds) con filtros compartidos.
+    Con ?formato=ndjson envía una línea 'autor' por autor a medida que se calcula.
+    """
+    datos = datos_activos()
+    if datos.authors_df is None:
+        return jsonify({'error': 'La funcionalidad de autores similares no está disponible. Faltan archivos de datos.'}), 503
+    
+    data = request.get_json(silent=True) or {}
+    author_ids = data.get('authorIds')
+    if not isinstance(author_ids, list) or not author_ids:
+        return jsonify({'error': 'Falta el campo requerido: authorIds (lista de IDs de autor)'}), 400
+    if len(author_ids) > MAX_LOTE_AUTORES:
+        return jsonify({'error': f'Máximo {MAX_LOTE_AUTORES} autores por petición'}), 400
+    
+    try:
+        top_n = int(data.get('similarAuthorsCount', 10))
+        if top_n < 1:
+            raise ParametroInvalido('similarAuthorsCount debe ser mayor que 0')
+        # La respuesta crece con autores x similares: se acota como MAX_LIMITE_PAGINA
+        top_n = min(top_n, MAX_SIMILARES_LOTE)
+        filtros = filtros_autores(data)
+        peso_colaboraciones = peso_colaboraciones_peticion(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Parámetro inválido: {e}'}), 400
+    
+    # Los filtros se evalúan una sola vez para todo el lote
+    mascara = mascara_autores(datos.authors_df, **filtros)
+    total_candidatos = int(np.count_nonzero(mascara))
+    if total_candidatos == len(mascara):
+        mascara = None
+    filas = datos.indice_ids_autores.get_indexer([str(a) for a in author_ids])
+    no_encontrados = [a for a, fila in zip(author_ids, filas) if fila < 0]
+    filas = filas[filas >= 0]
+    metadata = {
+        'total_targets': len(filas),
+        'not_found': no_encontrados,
+        'total_candidates': total_candidatos,
+        'similar_authors_count': top_n,
+        'filters_applied': filtros,
+        'collaboration_weight': peso_colaboraciones
+    }
+    
+    resultados = resultados_lote_autores(datos, filas, top_n, mascara, peso_colaboraciones)
+    if quiere_ndjson():
+        return respuesta_ndjson(lineas_lote_autores(resultados, metadata))
+    return respuesta_json({'results': list(resultados), 'metadata': metadata})
+
+@app.route('/api/search_authors', methods=['POST'])
+@requiere_componentes('modelo_embeddings', 'pca_autores', 'autores')
+def handle_search_authors():
+    """Autores más cercanos a un tema en texto libre (query), con los filtros de autores similares"""
+    datos = datos_activos()
+    if datos.authors_df is None or datos.pca_model is None:
+        return jsonify({'error': 'La búsqueda de autores por tema no está disponible. Faltan archivos de datos.'}), 503
+    
+    data = request.get_json(silent=True) or {}
+    consulta = (data.get('query') or '').strip()
+    if not consulta:
+        return jsonify({'error': 'Falta el campo requerido: query'}), 400
+    
+    try:
+        top_n = int(data.get('authorsCount', 20))
+        if top_n < 1:
+            raise ParametroInvalido('authorsCount debe ser mayor que 0')
+        filtros = filtros_autores(data)
+        peso_colaboraciones = peso_colaboraciones_peticion(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Parámetro inválido: {e}'}), 400
+    mascara = mascara_autores(datos.authors_df, **filtros)
+    total_candidatos = int(np.count_nonzero(mascara))
+    if total_candidatos == len(mascara):
+        mascara = None
+    
+    filas, similitudes = buscar_autores_por_tema(consulta, top_n, mascara, peso_colaboraciones)
+    log.debug("Búsqueda de autores por tema '%s': %s autores", consulta, len(filas))
+    
+    return respuesta_json({
+        'query': consulta,
+        'authors': autores_json(datos.authors_df, filas, similitudes),
+        'metadata': {
+            'total_authors_found': len(filas),
+            'total_candidates': total_candidatos,
+            'filters_applied': filtros,
+            'collaboration_weight': peso_colaboraciones
+        }
+    })
+
 @app.route('/api/author_suggestions', methods=['GET'])
+@requiere_componentes('autores')
 def get_author_suggestions():
     """Endpoint para obtener sugerencias de autores basado en búsqueda parcial"""
+    authors_df = datos_activos().authors_df
     if authors_df is None:
         return jsonify([])
     
@@ -1674,8 +4007,11 @@ def get_author_suggestions():
     return jsonify(suggestions)
 
 @app.route('/api/countries', methods=['GET'])
+@respuesta_cacheable
+@requiere_componentes('autores')
 def get_countries():
     """Endpoint para obtener lista de países disponibles"""
+    authors_df = datos_activos().authors_df
     if authors_df is None:
         return jsonify([])
     
@@ -1683,9 +4019,11 @@ def get_countries():
     return jsonify(countries)
 
 @app.route('/api/institution_suggestions', methods=['GET'])
+@requiere_componentes('autores')
 def get_institution_suggestions():
     """Endpoint para obtener sugerencias de instituciones"""
-    if authors_df is None:
+    datos = datos_activos()
+    if datos.authors_df is None:
         return jsonify([])
     
     query = request.args.get('q', '').lower()
@@ -1693,41 +4031,31 @@ def get_institution_suggestions():
     if not query:
         return jsonify([])
     
-    # Extraer todas las instituciones únicas
-    all_institutions = set()
-    for institutions_list in authors_df['Institution Names']:
-        all_institutions.update(institutions_list)
+    # Filtrar por query la lista ordenada de instituciones únicas (calculada al cargar los autores)
+    matching_institutions = [inst for inst in datos.nombres_instituciones_autores if query in inst.lower()]
     
-    # Filtrar por query
-    matching_institutions = [inst for inst in all_institutions if query in inst.lower()]
-    
-    return jsonify(sorted(matching_institutions)[:10])  # Limitar a 10 sugerencias
+    return jsonify(matching_institutions[:10])  # Limitar a 10 sugerencias
 
 
 
 @app.route('/api/author/<author_id>', methods=['GET'])
+@respuesta_cacheable
 def get_author_details(author_id):
     """Endpoint para obtener detalles completos de un autor por su ID"""
     try:
-        print(f"🔍 Buscando detalles del autor: {author_id}")
+        log.debug("Buscando detalles del autor: %s", author_id)
         
         # Buscar en todas las colecciones de autores por país
-        colecciones_autores = [col for col in db.list_collection_names() if col.startswith('authors_')]
-        
-        autor_encontrado = None
-        pais_encontrado = None
-        
-        for coleccion in colecciones_autores:
-            autor = db[coleccion].find_one({'_id': author_id})
-            if autor:
-                autor_encontrado = autor
-                pais_encontrado = coleccion.replace('authors_', '').upper()
-                print(f"✅ Autor encontrado en colección: {coleccion}")
-                break
+        pais_encontrado, autor_encontrado = repositorio.buscar_uno_en_paises(
+            'authors', repositorio.paises_con_entidad('authors'), {'_id': author_id}
+        )
         
         if not autor_encontrado:
             return jsonify({'error': f'Autor con ID {author_id} no encontrado'}), 404
         
+        pais_encontrado = pais_encontrado.upper()
+        log.debug("Autor encontrado en: %s", pais_encontrado)
+        
         # Formatear la respuesta
         response_data = {
             'id': autor_encontrado['_id'],
@@ -1755,12 +4083,113 @@ def get_author_details(author_id):
         return jsonify(response_data)
     
     except Exception as e:
-        print(f"❌ Error al obtener detalles del autor: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error al obtener detalles del autor: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+# ========== SALUD Y PRECARGA ==========
+
+def precargar():
+    """
+    Carga todos los componentes y espera a que terminen. Con gunicorn y
+    preload_app se llama en el master antes del fork (ver wsgi.py), de modo que
+    los workers comparten esa memoria por copy-on-write.
+    """
+    inicio = time.perf_counter()
+    componentes.asegurar_todos()
+    log.info("Precarga completada (%.1fs)", time.perf_counter() - inicio)
+
+def estado_componentes():
+    """
+    Estado de cada componente: 'pendiente' (se carga en la primera petición que lo
+    usa), 'cargando', 'listo', 'error' o 'no_disponible' (faltan sus archivos)
+    """
+    estados = componentes.estado()
+    disponibles = registro_datos.activo.disponibles()
+    for nombre in PARTES_DATOS:
+        if estados[nombre]['estado'] == 'listo' and nombre not in disponibles:
+            estados[nombre]['estado'] = 'no_disponible'
+    return estados
+
+def reporte_salud():
+    componentes_estado = estado_componentes()
+    error_mongo = repositorio.ping()
+    listo = error_mongo is None and all(
+        c['estado'] in ('listo', 'no_disponible') for c in componentes_estado.values()
+    )
+    return {
+        'listo': listo,
+        'componentes': componentes_estado,
+        'datos': registro_datos.estado(),
+        'mongo': 'listo' if error_mongo is None else error_mongo,
+        'pid': os.getpid()
+    }
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Estado de carga de cada componente y de MongoDB"""
+    return jsonify(reporte_salud())
+
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness: el proceso responde"""
+    return jsonify({'estado': 'vivo', 'pid': os.getpid()})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """
+    Readiness: 200 cuando todos los componentes están cargados (los que faltan por
+    archivos ausentes no bloquean) y MongoDB responde; 503 en otro caso (p. ej.
+    mientras se cargan en segundo plano)
+    """
+    reporte = reporte_salud()
+    return jsonify(reporte), 200 if reporte['listo'] else 503
+
+
+@app.route('/api/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """Endpoint con el tamaño, aciertos y fallos de las caches de resultados"""
+    return jsonify({nombre: cache.estadisticas() for nombre, cache in caches_resultados.items()})
+
+
+@app.route('/api/stats/mongo', methods=['GET'])
+def get_mongo_stats():
+    """Endpoint con la configuración del pool y los histogramas de latencia por colección"""
+    return jsonify(repositorio.estadisticas())
+
+
+def estadisticas_caches():
+    return {nombre: cache.estadisticas() for nombre, cache in caches_resultados.items()}
+
+# Con AUTHORCOLAB_METRICAS_DIR cada worker publica también sus caches (ver tiempos.py)
+metricas.fuente_caches = estadisticas_caches
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Histogramas de peticiones, etapas y consultas a MongoDB, y uso de las caches, en formato Prometheus"""
+    return Response(metricas.exponer(estadisticas_caches()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/perfilado', methods=['GET', 'POST'])
+def admin_perfilado():
+    """
+    Estado del perfilado y últimos perfiles escritos; con POST {"peticiones": N, "ruta": prefijo}
+    perfila las próximas N peticiones de este proceso (0 desarma). Requiere X-Perfilado-Token.
+    """
+    if not perfilador.habilitado:
+        return jsonify({'error': 'Perfilado deshabilitado (falta AUTHORCOLAB_PERFILADO_TOKEN)'}), 404
+    if not perfilador.autorizado(request.headers.get('X-Perfilado-Token')):
+        return jsonify({'error': 'Token de perfilado inválido'}), 403
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            peticiones = int(data.get('peticiones', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'peticiones debe ser un entero'}), 400
+        perfilador.armar(peticiones, data.get('ruta'))
+    return jsonify(perfilador.estado())
+
+
 def obtener_trabajos_mejorado(pais, institution_id, consulta, top_n, 
                             peso_titulo, peso_conceptos, filtros):
     """
@@ -1790,4 +4219,9 @@ def obtener_trabajos_mejorado(pais, institution_id, consulta, top_n,
 # - etc.
 
 if __name__ == '__main__':
+    # Con debug=True el reloader ejecuta el módulo en un proceso hijo: cargar solo ahí
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        limitar_hilos_blas()
+        componentes.iniciar_en_segundo_plano()
+        iniciar_vigilancia_datos()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,570 @@
+"""
+Benchmark de los endpoints del backend con datos sintéticos.
+
+Genera matrices y metadatos de autores y obras con la misma disposición que los
+archivos de archivos_para_el_backend (autores_reducidos_completo_ponderado.h5,
+matriz_obras_separadas.h5, columnas_obras.h5 y los PCA), siembra las colecciones
+por país de MongoDB (mongomock en memoria o una base desechable de un mongod
+real) y mide latencia (p50/p90/p99) y peticiones por segundo de cada endpoint a
+la escala pedida, con el cliente de pruebas de Flask.
+
+Las obras y autores se agrupan en temas: sus vectores son el centro de uno o
+varios temas más ruido, y las consultas nombran temas, de modo que los umbrales
+de similitud dejan pasar una fracción realista de las obras. Con --codificador
+sintetico las consultas se vectorizan sin el modelo de embeddings (el centro de
+los temas que nombran), para medir el resto del camino sin descargar el modelo.
+
+Cada petición lleva una consulta distinta para no medir las caches de
+resultados; --con-cache repite unas pocas consultas para medir los aciertos.
+Cada endpoint se calienta con una petición que no se mide. Los resultados se
+guardan en JSON (--salida) y --comparar muestra la diferencia con otra corrida.
+
+Uso (desde la raíz del proyecto):
+
+    python Backend/benchmark_endpoints.py --codificador sintetico
+    python Backend/benchmark_endpoints.py --escala mediana --concurrencia 4 --salida bench.json
+    python Backend/benchmark_endpoints.py --escala mediana --salida nuevo.json --comparar bench.json
+    python Backend/benchmark_endpoints.py --mongo-uri mongodb://localhost:27017/ --db authorcolab_benchmark
+
+mongomock (pip install mongomock) solo hace falta sin --mongo-uri. Con un mongod
+real la base indicada en --db se borra y se vuelve a sembrar, con los índices de
+crear_indices_mongo.py.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import h5py
+import numpy as np
+from sklearn.decomposition import PCA
+
+PAISES_LATAM = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt',
+                'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
+
+# Escalas predefinidas (cada valor se puede cambiar con su opción)
+ESCALAS = {
+    'pequena': {'autores': 2000, 'obras': 20000, 'instituciones': 200, 'paises': 5},
+    'mediana': {'autores': 20000, 'obras': 200000, 'instituciones': 1000, 'paises': 10},
+    'grande': {'autores': 200000, 'obras': 1000000, 'instituciones': 5000, 'paises': 20},
+}
+
+DIM_EMBEDDING = 384  # all-MiniLM-L6-v2
+BASE_PRUEBAS = 'openalex_ia'  # la base del backend: nunca se siembra sobre ella
+
+TEMAS = [
+    'aprendizaje automático', 'redes neuronales', 'cambio climático', 'salud pública',
+    'enfermedades infecciosas', 'economía agrícola', 'energía solar', 'biodiversidad marina',
+    'educación superior', 'políticas públicas', 'minería de datos', 'robótica industrial',
+    'genética de plantas', 'química de materiales', 'física de partículas', 'astronomía',
+    'neurociencia cognitiva', 'nutrición infantil', 'recursos hídricos', 'sismología',
+    'urbanismo', 'lingüística computacional', 'historia colonial', 'microbiología',
+]
+PALABRAS = ['análisis', 'modelo', 'estudio', 'evaluación', 'impacto', 'método', 'datos',
+            'sistema', 'efecto', 'revisión', 'enfoque', 'caso']
+NOMBRES = ['José', 'María', 'Andrés', 'Ana', 'Juan', 'Lucía', 'Carlos', 'Sofía', 'Luis',
+           'Camila', 'Jorge', 'Valentina', 'Pedro', 'Fernanda', 'Diego', 'Isabel']
+APELLIDOS = ['García', 'Pérez', 'González', 'Rodríguez', 'López', 'Martínez', 'Núñez',
+             'Díaz', 'Fernández', 'Muñoz', 'Rojas', 'Silva', 'Torres', 'Ramírez', 'Castro']
+TIPOS_INSTITUCION = ['education', 'healthcare', 'government', 'facility', 'company']
+
+TAMANO_BLOQUE = 50000  # filas generadas (y documentos insertados) por bloque
+
+
+# ========== DATOS SINTÉTICOS ==========
+
+def centros_temas(semilla):
+    """Un vector unitario de DIM_EMBEDDING por tema"""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(len(TEMAS), DIM_EMBEDDING)).astype(np.float32)
+    return centros / np.linalg.norm(centros, axis=1, keepdims=True)
+
+
+def embeddings_de_temas(rng, centros, temas, ruido=0.6):
+    """Embedding de cada fila: la media de los centros de sus temas más ruido gaussiano"""
+    vectores = centros[temas].mean(axis=1)
+    vectores += rng.normal(scale=ruido / np.sqrt(DIM_EMBEDDING), size=vectores.shape).astype(np.float32)
+    return vectores
+
+
+def ajustar_pca(rng, centros, dimensiones):
+    muestra = embeddings_de_temas(rng, centros, rng.integers(0, len(TEMAS), size=(5000, 2)))
+    return PCA(dimensiones, random_state=0).fit(muestra)
+
+
+def proyectar_por_bloques(pca, rng, centros, temas, destino):
+    """Escribe en 'destino' (dataset HDF5) la proyección PCA de los embeddings, por bloques"""
+    for inicio in range(0, len(temas), TAMANO_BLOQUE):
+        fin = min(inicio + TAMANO_BLOQUE, len(temas))
+        destino[inicio:fin] = pca.transform(embeddings_de_temas(rng, centros, temas[inicio:fin])).astype(np.float32)
+
+
+class DatosSinteticos:
+    """
+    Catálogo sintético: instituciones, autores y obras con sus temas, países y
+    relaciones. escribir_archivos() crea los .h5/.pkl del backend y sembrar_mongo()
+    las colecciones por país.
+    """
+
+    def __init__(self, autores, obras, instituciones, paises, semilla=0):
+        rng = np.random.default_rng(semilla)
+        self.semilla = semilla
+        self.paises = PAISES_LATAM[:paises]
+        self.centros = centros_temas(semilla)
+
+        self.instituciones_pais = np.arange(instituciones) % len(self.paises)
+        self.instituciones_ids = [f'I{100000 + i}' for i in range(instituciones)]
+        self.instituciones_nombres = [
+            f'{"Universidad" if i % 3 else "Instituto"} {APELLIDOS[i % len(APELLIDOS)]} {i}'
+            for i in range(instituciones)
+        ]
+
+        self.autores_ids = [f'A{100000 + i}' for i in range(autores)]
+        self.autores_nombres = [
+            f'{NOMBRES[i % len(NOMBRES)]} {APELLIDOS[(i // len(NOMBRES)) % len(APELLIDOS)]} '
+            f'{APELLIDOS[(i * 7) % len(APELLIDOS)]} {i}'
+            for i in range(autores)
+        ]
+        self.autores_institucion = rng.integers(0, instituciones, size=autores)
+        self.autores_temas = rng.integers(0, len(TEMAS), size=(autores, 3))
+        self.autores_colaboraciones = rng.zipf(1.8, size=autores).clip(0, 500).astype(np.int64)
+
+        self.obras_ids = [f'W{1000000 + i}' for i in range(obras)]
+        self.obras_temas = rng.integers(0, len(TEMAS), size=(obras, 1))
+        # 1 a 4 autores por obra; las instituciones de la obra son las de sus autores
+        self.obras_autores = [rng.integers(0, autores, size=rng.integers(1, 5)) for _ in range(obras)]
+        self.obras_instituciones = [list(dict.fromkeys(self.autores_institucion[a].tolist())) for a in self.obras_autores]
+        self.obras_pais = np.array([self.instituciones_pais[i[0]] for i in self.obras_instituciones])
+        self.obras_citas = rng.zipf(1.6, size=obras).clip(0, 5000).astype(np.int32)
+        self.obras_anios = rng.integers(1990, 2025, size=obras).astype(np.int16)
+        self.obras_abiertas = rng.random(obras) < 0.45
+
+    def _instituciones_json(self, indices):
+        return json.dumps([{'id': self.instituciones_ids[i], 'display_name': self.instituciones_nombres[i]}
+                           for i in indices], ensure_ascii=False)
+
+    def titulo(self, i):
+        tema = TEMAS[self.obras_temas[i, 0]]
+        return f'{PALABRAS[i % len(PALABRAS)].capitalize()} de {tema} en {self.paises[self.obras_pais[i]].upper()}'
+
+    def escribir_archivos(self, directorio, dim_autores, dim_obras):
+        os.makedirs(directorio, exist_ok=True)
+        rng = np.random.default_rng(self.semilla + 1)
+        texto = h5py.string_dtype('utf-8')
+
+        pca_autores = ajustar_pca(rng, self.centros, dim_autores)
+        pca_titulo = ajustar_pca(rng, self.centros, dim_obras)
+        pca_conceptos = ajustar_pca(rng, self.centros, dim_obras)
+        for nombre, pca in (('pca_model_completo_ponderado.pkl', pca_autores),
+                            ('pca_titulo.pkl', pca_titulo), ('pca_conceptos.pkl', pca_conceptos)):
+            with open(os.path.join(directorio, nombre), 'wb') as f:
+                pickle.dump(pca, f)
+
+        with h5py.File(os.path.join(directorio, 'autores_reducidos_completo_ponderado.h5'), 'w') as f:
+            vectores = f.create_dataset('autores_reducidos', shape=(len(self.autores_ids), dim_autores), dtype=np.float32)
+            proyectar_por_bloques(pca_autores, rng, self.centros, self.autores_temas, vectores)
+            metadata = f.create_group('metadata')
+            metadata.create_dataset('ids', data=self.autores_ids, dtype=texto)
+            metadata.create_dataset('nombres', data=self.autores_nombres, dtype=texto)
+            metadata.create_dataset('paises', data=[self.paises[self.instituciones_pais[i]].upper()
+                                                    for i in self.autores_institucion], dtype=texto)
+            metadata.create_dataset('collaboration_counts', data=self.autores_colaboraciones)
+            metadata.create_dataset('institutions_json', data=[self._instituciones_json([i])
+                                                               for i in self.autores_institucion], dtype=texto)
+
+        with h5py.File(os.path.join(directorio, 'matriz_obras_separadas.h5'), 'w') as f:
+            forma = (len(self.obras_ids), dim_obras)
+            proyectar_por_bloques(pca_titulo, rng, self.centros, self.obras_temas,
+                                  f.create_dataset('titulo_vectores', shape=forma, dtype=np.float32))
+            proyectar_por_bloques(pca_conceptos, rng, self.centros, self.obras_temas,
+                                  f.create_dataset('conceptos_vectores', shape=forma, dtype=np.float32))
+            metadata = f.create_group('metadata')
+            metadata.create_dataset('ids', data=self.obras_ids, dtype=texto)
+            metadata.create_dataset('paises', data=[self.paises[p].upper() for p in self.obras_pais], dtype=texto)
+            metadata.create_dataset('instituciones_json', data=[self._instituciones_json(i)
+                                                                for i in self.obras_instituciones], dtype=texto)
+
+        with h5py.File(os.path.join(directorio, 'columnas_obras.h5'), 'w') as f:
+            f.create_dataset('obras_ids', data=self.obras_ids, dtype=texto)
+            f.create_dataset('cited_by_count', data=self.obras_citas)
+            f.create_dataset('publication_year', data=self.obras_anios)
+
+    def _documentos(self):
+        """(colección, documento) de todas las colecciones por país"""
+        for i, institucion_id in enumerate(self.instituciones_ids):
+            yield f'institutions_{self.paises[self.instituciones_pais[i]]}', {
+                '_id': institucion_id,
+                'name': self.instituciones_nombres[i],
+                'type': TIPOS_INSTITUCION[i % len(TIPOS_INSTITUCION)],
+                'geo': {'latitude': -35.0 + (i % 40), 'longitude': -70.0 + (i % 25), 'city': f'Ciudad {i % 50}'},
+            }
+        for i, autor_id in enumerate(self.autores_ids):
+            pais = self.paises[self.instituciones_pais[self.autores_institucion[i]]]
+            yield f'authors_{pais}', {
+                '_id': autor_id,
+                'display_name': self.autores_nombres[i],
+                'concepts_weighted_by_citations': [
+                    {'id': f'C{t}', 'display_name': TEMAS[t].capitalize(),
+                     'weighted_average_score': round(1.0 / (k + 1), 3)}
+                    for k, t in enumerate(self.autores_temas[i])
+                ],
+            }
+        for i, obra_id in enumerate(self.obras_ids):
+            pais = self.paises[self.obras_pais[i]]
+            yield f'works_{pais}', {
+                '_id': obra_id,
+                'title': self.titulo(i),
+                'publication_year': int(self.obras_anios[i]),
+                'cited_by_count': int(self.obras_citas[i]),
+                'open_access': {'is_oa': bool(self.obras_abiertas[i])},
+                'authorships': [
+                    {'author': {'id': self.autores_ids[a], 'display_name': self.autores_nombres[a]},
+                     'institutions': [{'id': self.instituciones_ids[self.autores_institucion[a]],
+                                       'display_name': self.instituciones_nombres[self.autores_institucion[a]]}]}
+                    for a in self.obras_autores[i]
+                ],
+            }
+            for institucion in self.obras_instituciones[i]:
+                yield f'institution_works_{pais}', {'institution_id': self.instituciones_ids[institucion], 'work_id': obra_id}
+
+    def sembrar_mongo(self, db):
+        pendientes = {}
+        for coleccion, documento in self._documentos():
+            lote = pendientes.setdefault(coleccion, [])
+            lote.append(documento)
+            if len(lote) >= TAMANO_BLOQUE:
+                db[coleccion].insert_many(lote, ordered=False)
+                lote.clear()
+        for coleccion, lote in pendientes.items():
+            if lote:
+                db[coleccion].insert_many(lote, ordered=False)
+
+
+class CodificadorSintetico:
+    """
+    Reemplazo del modelo de embeddings: el vector de un texto es la media de los
+    centros de los temas que nombra (o uno aleatorio fijo por texto si no nombra
+    ninguno) más un poco de ruido determinista
+    """
+
+    def __init__(self, centros):
+        self.centros = centros
+
+    def _vector(self, texto):
+        rng = np.random.default_rng(int(hashlib.sha1(texto.encode('utf-8')).hexdigest()[:8], 16))
+        temas = [j for j, tema in enumerate(TEMAS) if tema in texto.lower()]
+        base = self.centros[temas].mean(axis=0) if temas else rng.normal(size=DIM_EMBEDDING).astype(np.float32)
+        return base + rng.normal(scale=0.3 / np.sqrt(DIM_EMBEDDING), size=DIM_EMBEDDING).astype(np.float32)
+
+    def encode(self, textos, convert_to_tensor=False, **kwargs):
+        vectores = np.stack([self._vector(t) for t in textos]).astype(np.float32)
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(vectores)
+        return vectores
+
+
+# ========== PETICIONES ==========
+
+class GeneradorPeticiones:
+    """
+    Peticiones de cada endpoint: (método, URL, cuerpo JSON). Sin cache, cada una
+    lleva una consulta distinta (el número de petición al final del texto); con
+    cache se repiten 'distintas' consultas
+    """
+
+    def __init__(self, datos, semilla, con_cache=False, distintas=5):
+        self.datos = datos
+        self.rng = np.random.default_rng(semilla + 2)
+        self.con_cache = con_cache
+        self.distintas = distintas
+        self._lock = threading.Lock()
+        self._contador = 0
+
+    def _numero(self):
+        with self._lock:
+            self._contador += 1
+            return self._contador % self.distintas if self.con_cache else self._contador
+
+    def _azar(self, n):
+        numero = self._numero()
+        return numero, (numero * 7919 + 13) % n
+
+    def _consulta(self):
+        numero, i = self._azar(len(TEMAS))
+        return f'{TEMAS[i]} {PALABRAS[numero % len(PALABRAS)]} {numero}'
+
+    def instituciones_pais(self):
+        _, i = self._azar(len(self.datos.paises))
+        return 'GET', f'/api/instituciones/{self.datos.paises[i]}', {'consulta': self._consulta()}, None
+
+    def instituciones_todos(self):
+        return 'GET', '/api/instituciones/todos', {'consulta': self._consulta()}, None
+
+    def trabajos_institucion(self):
+        _, i = self._azar(len(self.datos.instituciones_ids))
+        pais = self.datos.paises[self.datos.instituciones_pais[i]]
+        return ('GET', f'/api/institucion/{pais}/{self.datos.instituciones_ids[i]}/trabajos',
+                {'consulta': self._consulta(), 'top_n': 50}, None)
+
+    def autores_similares(self):
+        _, i = self._azar(len(self.datos.autores_ids))
+        return 'POST', '/api/find_similar_authors', None, {
+            'authorName': self.datos.autores_nombres[i], 'similarAuthorsCount': 10
+        }
+
+    def sugerencias_autores(self):
+        _, i = self._azar(len(self.datos.autores_ids))
+        return 'GET', '/api/author_suggestions', {'q': self.datos.autores_nombres[i][:12]}, None
+
+    def buscar_autores(self):
+        return 'POST', '/api/search_authors', None, {'query': self._consulta(), 'authorsCount': 20}
+
+
+ENDPOINTS = ['instituciones_pais', 'instituciones_todos', 'trabajos_institucion',
+             'autores_similares', 'sugerencias_autores', 'buscar_autores']
+
+
+def duraciones_server_timing(valor):
+    """{etapa: ms} de una cabecera Server-Timing"""
+    etapas = {}
+    for entrada in (valor or '').split(','):
+        partes = [p.strip() for p in entrada.split(';')]
+        for parte in partes[1:]:
+            if parte.startswith('dur='):
+                etapas[partes[0]] = float(parte[4:])
+    return etapas
+
+
+def medir_endpoint(app, generar, repeticiones, concurrencia):
+    """Latencias, estados y tiempos por etapa de 'repeticiones' peticiones con 'concurrencia' hilos"""
+    clientes = threading.local()
+
+    def una(_):
+        if not hasattr(clientes, 'cliente'):
+            clientes.cliente = app.test_client()
+        metodo, url, parametros, cuerpo = generar()
+        inicio = time.perf_counter()
+        respuesta = clientes.cliente.open(url, method=metodo, query_string=parametros, json=cuerpo,
+                                          headers={'X-Server-Timing': '1'})
+        respuesta.get_data()  # consume también las respuestas en streaming
+        respuesta.close()
+        return time.perf_counter() - inicio, respuesta.status_code, respuesta.headers.get('Server-Timing')
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        resultados = list(ejecutor.map(una, range(repeticiones)))
+    segundos_totales = time.perf_counter() - inicio
+
+    latencias = np.array([r[0] for r in resultados]) * 1000
+    estados = {}
+    etapas = {}
+    for _, estado, server_timing in resultados:
+        estados[str(estado)] = estados.get(str(estado), 0) + 1
+        for nombre, ms in duraciones_server_timing(server_timing).items():
+            etapas.setdefault(nombre, []).append(ms)
+
+    return {
+        'peticiones': repeticiones,
+        'errores': sum(n for estado, n in estados.items() if not estado.startswith('2')),
+        'estados': estados,
+        'latencia_ms': {
+            'p50': round(float(np.percentile(latencias, 50)), 2),
+            'p90': round(float(np.percentile(latencias, 90)), 2),
+            'p99': round(float(np.percentile(latencias, 99)), 2),
+            'media': round(float(latencias.mean()), 2),
+            'min': round(float(latencias.min()), 2),
+            'max': round(float(latencias.max()), 2),
+        },
+        'peticiones_por_segundo': round(repeticiones / segundos_totales, 2),
+        'etapas_ms_media': {nombre: round(float(np.mean(valores)), 2) for nombre, valores in etapas.items()},
+    }
+
+
+# ========== ENTORNO Y COMPARACIÓN ==========
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def info_entorno():
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'commit': commit_actual(),
+    }
+
+
+def comparar(actual, anterior):
+    print(f"\n📈 Comparación con la corrida anterior ({anterior.get('fecha')}, commit {anterior['entorno'].get('commit')})")
+    print(f"   {'endpoint':<22} {'p50 ms':>18} {'p99 ms':>18} {'pet/s':>18}")
+    for nombre, medicion in actual['endpoints'].items():
+        previa = anterior['endpoints'].get(nombre)
+        if previa is None:
+            continue
+        columnas = []
+        for valor, valor_previo in ((medicion['latencia_ms']['p50'], previa['latencia_ms']['p50']),
+                                    (medicion['latencia_ms']['p99'], previa['latencia_ms']['p99']),
+                                    (medicion['peticiones_por_segundo'], previa['peticiones_por_segundo'])):
+            cambio = (valor / valor_previo - 1) * 100 if valor_previo else 0.0
+            columnas.append(f'{valor:9.1f} ({cambio:+5.0f}%)')
+        print(f"   {nombre:<22} {' '.join(columnas)}")
+    if actual['datos']['escala'] != anterior['datos'].get('escala'):
+        print("   ⚠️  Las corridas no usan la misma escala de datos")
+
+
+# ========== MAIN ==========
+
+def preparar_mongo(args):
+    """Cliente de MongoDB sembrable: mongomock en memoria, o el mongod de --mongo-uri"""
+    if args.mongo_uri is None:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ Sin --mongo-uri hace falta mongomock: pip install mongomock")
+        return mongomock.MongoClient()
+
+    if args.db == BASE_PRUEBAS:
+        sys.exit(f"❌ --db {BASE_PRUEBAS} es la base del backend: usa una base desechable")
+    from pymongo import MongoClient
+    client = MongoClient(args.mongo_uri)
+    client.drop_database(args.db)
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los endpoints con datos sintéticos')
+    parser.add_argument('--escala', choices=ESCALAS, default='pequena')
+    parser.add_argument('--autores', type=int, help='Autores (por defecto, los de la escala)')
+    parser.add_argument('--obras', type=int, help='Obras (por defecto, las de la escala)')
+    parser.add_argument('--instituciones', type=int, help='Instituciones (por defecto, las de la escala)')
+    parser.add_argument('--paises', type=int, choices=range(1, len(PAISES_LATAM) + 1), metavar='N',
+                        help='Cantidad de países (por defecto, los de la escala)')
+    parser.add_argument('--dim-autores', type=int, default=64, help='Dimensiones del PCA de autores')
+    parser.add_argument('--dim-obras', type=int, default=64, help='Dimensiones de los PCA de título y conceptos')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--mongo-uri', help='mongod donde sembrar los datos (por defecto, mongomock en memoria)')
+    parser.add_argument('--db', default='authorcolab_benchmark', help='Base a sembrar con --mongo-uri (se borra)')
+    parser.add_argument('--codificador', choices=['modelo', 'sintetico'], default='modelo',
+                        help="'modelo' usa all-MiniLM-L6-v2; 'sintetico' evita cargarlo")
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones medidas por endpoint')
+    parser.add_argument('--concurrencia', type=int, default=1, help='Hilos que envían peticiones a la vez')
+    parser.add_argument('--con-cache', action='store_true', help='Repetir unas pocas consultas (mide las caches)')
+    parser.add_argument('--directorio', help='Dónde escribir los archivos sintéticos (por defecto, uno temporal)')
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior con el que comparar')
+    args = parser.parse_args()
+
+    escala = dict(ESCALAS[args.escala])
+    for clave in escala:
+        if getattr(args, clave) is not None:
+            escala[clave] = getattr(args, clave)
+
+    directorio = args.directorio or tempfile.mkdtemp(prefix='authorcolab_benchmark_')
+    print(f"🧪 Datos sintéticos en {directorio}: {escala['autores']} autores, {escala['obras']} obras, "
+          f"{escala['instituciones']} instituciones, {escala['paises']} países")
+    inicio = time.perf_counter()
+    datos = DatosSinteticos(semilla=args.semilla, **escala)
+    datos.escribir_archivos(directorio, args.dim_autores, args.dim_obras)
+    segundos_archivos = time.perf_counter() - inicio
+    print(f"   📁 Archivos: {segundos_archivos:.1f}s")
+
+    client = preparar_mongo(args)
+    inicio = time.perf_counter()
+    datos.sembrar_mongo(client[args.db])
+    if args.mongo_uri is not None:
+        from crear_indices_mongo import crear_indices
+        colecciones = set(client[args.db].list_collection_names())
+        for pais in datos.paises:
+            crear_indices(client[args.db], pais, colecciones)
+    segundos_mongo = time.perf_counter() - inicio
+    print(f"   🍃 MongoDB ({'mongomock' if args.mongo_uri is None else args.mongo_uri}): {segundos_mongo:.1f}s")
+
+    # El backend lee su configuración del entorno al importarse
+    os.environ['AUTHORCOLAB_DATA_DIR'] = directorio
+    os.environ['AUTHORCOLAB_MONGO_DB'] = args.db
+    os.environ['AUTHORCOLAB_ALMACENAMIENTO'] = 'por_pais'
+    os.environ['AUTHORCOLAB_VIGILAR_DATOS'] = '0'
+    os.environ.setdefault('AUTHORCOLAB_LOG_NIVEL', 'WARNING')
+    if args.mongo_uri is not None:
+        os.environ['AUTHORCOLAB_MONGO_URI'] = args.mongo_uri
+    import backend_final7
+
+    backend_final7.repositorio.usar_cliente(client)
+    if args.codificador == 'sintetico':
+        def cargar_codificador_sintetico():
+            backend_final7.model = CodificadorSintetico(datos.centros)
+        backend_final7.componentes.registrar('modelo_embeddings', cargar_codificador_sintetico)
+
+    inicio = time.perf_counter()
+    backend_final7.precargar()
+    segundos_carga = time.perf_counter() - inicio
+    print(f"   ⚙️  Carga del backend: {segundos_carga:.1f}s")
+
+    app = backend_final7.app
+    peticiones = GeneradorPeticiones(datos, args.semilla, args.con_cache)
+    resultados = {}
+    print(f"\n📊 {args.repeticiones} peticiones por endpoint, concurrencia {args.concurrencia}"
+          f"{', con cache' if args.con_cache else ''}")
+    for nombre in args.endpoints:
+        generar = getattr(peticiones, nombre)
+        medir_endpoint(app, generar, 1, 1)  # calentamiento
+        medicion = medir_endpoint(app, generar, args.repeticiones, args.concurrencia)
+        resultados[nombre] = medicion
+        latencia = medicion['latencia_ms']
+        print(f"   {nombre:<22} p50 {latencia['p50']:8.1f} ms  p90 {latencia['p90']:8.1f} ms  "
+              f"p99 {latencia['p99']:8.1f} ms  {medicion['peticiones_por_segundo']:7.1f} pet/s"
+              f"{'  ❌ ' + str(medicion['errores']) + ' errores' if medicion['errores'] else ''}")
+
+    corrida = {
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'entorno': info_entorno(),
+        'parametros': {
+            'codificador': args.codificador,
+            'mongo': 'mongomock' if args.mongo_uri is None else 'mongod',
+            'repeticiones': args.repeticiones,
+            'concurrencia': args.concurrencia,
+            'con_cache': args.con_cache,
+            'semilla': args.semilla,
+        },
+        'datos': {
+            'escala': dict(escala, dim_autores=args.dim_autores, dim_obras=args.dim_obras),
+            'segundos_archivos': round(segundos_archivos, 2),
+            'segundos_mongo': round(segundos_mongo, 2),
+            'segundos_carga_backend': round(segundos_carga, 2),
+        },
+        'endpoints': resultados,
+    }
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(corrida, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            comparar(corrida, json.load(f))
+
+    if args.directorio is None:
+        shutil.rmtree(directorio, ignore_errors=True)
+    if args.mongo_uri is not None:
+        client.drop_database(args.db)
+
+
+if __name__ == '__main__':
+    main()
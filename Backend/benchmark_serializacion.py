@@ -0,0 +1,123 @@
+"""
+Compara la serialización de una respuesta de trabajos de institución:
+
+    json_util  jsonify({'trabajos': json_util.dumps(trabajos), ...}) (método anterior)
+    compat     serializacion.cuerpo_respuesta(..., formato='compat') (mismo formato, con orjson)
+    nativo     serializacion.cuerpo_respuesta(..., formato='nativo') (trabajos como array)
+
+Los trabajos son sintéticos, con la forma de los documentos de works_<pais>
+(authorships, concepts, open_access, fechas, ObjectId), o se leen de MongoDB con
+--institucion.
+
+Uso (desde la raíz del proyecto):
+
+    python Backend/benchmark_serializacion.py
+    python Backend/benchmark_serializacion.py --trabajos 5000 --repeticiones 20
+    python Backend/benchmark_serializacion.py --institucion https://openalex.org/I123 --pais cl
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from flask import Flask, jsonify
+from pymongo import MongoClient
+
+from serializacion import cuerpo_respuesta
+
+
+def trabajo_sintetico(i, rnd):
+    """Documento con la forma de un trabajo de OpenAlex"""
+    return {
+        '_id': f'https://openalex.org/W{1000000 + i}',
+        'doc_oid': ObjectId(),
+        'title': ' '.join(rnd.choice(['deep', 'learning', 'neural', 'redes', 'modelo', 'análisis',
+                                      'datos', 'clasificación', 'imágenes', 'salud']) for _ in range(12)),
+        'publication_year': rnd.randint(2000, 2024),
+        'publication_date': (datetime(2000, 1, 1) + timedelta(days=rnd.randint(0, 9000))).strftime('%Y-%m-%d'),
+        'updated_date': datetime(2024, 1, 1) + timedelta(seconds=rnd.randint(0, 10 ** 7)),
+        'cited_by_count': rnd.randint(0, 500),
+        'open_access': {'is_oa': rnd.random() < 0.5, 'oa_status': rnd.choice(['gold', 'green', 'closed'])},
+        'authorships': [
+            {
+                'author': {'id': f'https://openalex.org/A{rnd.randint(1, 10 ** 6)}',
+                           'display_name': f'Autor {rnd.randint(1, 10 ** 6)}'},
+                'institutions': [{'id': f'https://openalex.org/I{rnd.randint(1, 5000)}',
+                                  'display_name': 'Universidad', 'country_code': 'CL'}]
+            }
+            for _ in range(rnd.randint(1, 8))
+        ],
+        'concepts': [
+            {'id': f'https://openalex.org/C{rnd.randint(1, 65000)}', 'display_name': 'Concepto',
+             'level': rnd.randint(0, 3), 'score': rnd.random()}
+            for _ in range(rnd.randint(3, 10))
+        ],
+        'similitud': rnd.random(),
+        'similitud_titulo': 0.0,
+        'similitud_conceptos': 0.0
+    }
+
+
+def trabajos_de_mongo(mongo_uri, db, pais, institution_id, limite):
+    db = MongoClient(mongo_uri)[db]
+    relaciones = db[f'institution_works_{pais}'].find({'institution_id': institution_id}, {'work_id': 1})
+    work_ids = [r['work_id'] for r in relaciones][:limite]
+    return list(db[f'works_{pais}'].find({'_id': {'$in': work_ids}}))
+
+
+def medir(nombre, funcion, repeticiones):
+    funcion()  # calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        datos = funcion()
+    segundos = (time.perf_counter() - inicio) / repeticiones
+    mb = len(datos) / 1024 / 1024
+    print(f"   {nombre:<10} {segundos * 1000:8.1f} ms/respuesta  {1 / segundos:7.1f} resp/s  "
+          f"{mb / segundos:7.1f} MB/s  ({mb:.1f} MB)")
+    return datos, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización de respuestas de trabajos')
+    parser.add_argument('--trabajos', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--institucion', help='Usar los trabajos reales de esta institución (MongoDB)')
+    parser.add_argument('--pais', default='cl')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--db', default='openalex_ia')
+    args = parser.parse_args()
+
+    if args.institucion:
+        trabajos = trabajos_de_mongo(args.mongo_uri, args.db, args.pais.lower(), args.institucion, args.trabajos)
+    else:
+        rnd = random.Random(0)
+        trabajos = [trabajo_sintetico(i, rnd) for i in range(args.trabajos)]
+
+    cuerpo = {
+        'trabajos': trabajos,
+        'total': len(trabajos),
+        'filtros_aplicados': {},
+        'umbral_similitud': 0.3,
+        'metodo': 'matrices'
+    }
+    app = Flask(__name__)
+
+    def con_json_util():
+        with app.app_context():
+            return jsonify(dict(cuerpo, trabajos=json_util.dumps(trabajos))).get_data()
+
+    print(f"📊 Respuesta con {len(trabajos)} trabajos, {args.repeticiones} repeticiones")
+    anterior, t_anterior = medir('json_util', con_json_util, args.repeticiones)
+    compat, t_compat = medir('compat', lambda: cuerpo_respuesta(cuerpo, ('trabajos',), 'compat'), args.repeticiones)
+    _, t_nativo = medir('nativo', lambda: cuerpo_respuesta(cuerpo, ('trabajos',), 'nativo'), args.repeticiones)
+
+    # El formato compat debe decodificar a lo mismo que el método anterior
+    iguales = (json.loads(json.loads(anterior)['trabajos']) == json.loads(json.loads(compat)['trabajos']))
+    print(f"{'✅' if iguales else '❌'} compat {'equivale' if iguales else 'NO equivale'} a json_util")
+    print(f"🚀 compat: x{t_anterior / t_compat:.1f}, nativo: x{t_anterior / t_nativo:.1f} respecto a json_util")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Logging del backend: niveles, un id por petición y muestreo.
+
+Cada línea lleva el id de la petición en curso (cabecera X-Request-ID), de modo
+que se pueden seguir las líneas de una petición aunque los hilos se intercalen.
+Los mensajes se formatean solo si se emiten: en los caminos calientes se pasan
+argumentos ('%s') en lugar de f-strings, y lo que cuesta calcular se protege con
+log.isEnabledFor(logging.DEBUG).
+
+Variables de entorno:
+    AUTHORCOLAB_LOG_NIVEL     DEBUG, INFO (por defecto), WARNING o ERROR
+    AUTHORCOLAB_LOG_FORMATO   'texto' (por defecto) o 'json' (un objeto JSON por línea)
+    AUTHORCOLAB_LOG_MUESTREO  fracción de las peticiones cuyos mensajes DEBUG e INFO
+                              se registran (por defecto 1); advertencias y errores siempre
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from uuid import uuid4
+
+NOMBRE_LOGGER = 'authorcolab'
+MUESTREO = float(os.environ.get('AUTHORCOLAB_LOG_MUESTREO', 1))
+
+_id_peticion = contextvars.ContextVar('id_peticion', default=None)
+_muestreada = contextvars.ContextVar('muestreada', default=True)
+
+
+def iniciar_peticion(id_peticion=None):
+    """
+    Fija el id de la petición en curso (el recibido si es válido, o uno nuevo) y
+    decide si sus mensajes DEBUG e INFO entran en la muestra. Devuelve el id.
+    """
+    if not id_peticion or not re.fullmatch(r'[\w.:-]{1,64}', id_peticion):
+        id_peticion = uuid4().hex[:16]
+    _id_peticion.set(id_peticion)
+    _muestreada.set(MUESTREO >= 1 or random.random() < MUESTREO)
+    return id_peticion
+
+
+def terminar_peticion():
+    _id_peticion.set(None)
+    _muestreada.set(True)
+
+
+def id_peticion_actual():
+    return _id_peticion.get()
+
+
+class FiltroPeticion(logging.Filter):
+    """Agrega el id de la petición a cada registro y descarta DEBUG/INFO de las peticiones fuera de la muestra"""
+
+    def filter(self, record):
+        record.id_peticion = _id_peticion.get() or '-'
+        return record.levelno >= logging.WARNING or _muestreada.get()
+
+
+class FormatoJSON(logging.Formatter):
+    """Un objeto JSON por registro, con los campos pasados en extra={...}"""
+
+    CAMPOS_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'id_peticion'}
+
+    def format(self, record):
+        evento = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'id_peticion': record.id_peticion,
+            'mensaje': record.getMessage()
+        }
+        evento.update({k: v for k, v in vars(record).items() if k not in self.CAMPOS_ESTANDAR})
+        if record.exc_info:
+            evento['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+def configurar_logging(nivel=None, formato=None):
+    """Configura el logger 'authorcolab' (una sola salida, a stderr) y lo devuelve"""
+    nivel = (nivel or os.environ.get('AUTHORCOLAB_LOG_NIVEL', 'INFO')).upper()
+    formato = formato or os.environ.get('AUTHORCOLAB_LOG_FORMATO', 'texto')
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(FiltroPeticion())
+    if formato == 'json':
+        handler.setFormatter(FormatoJSON())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s [%(id_peticion)s] %(message)s'))
+
+    logger = logging.getLogger(NOMBRE_LOGGER)
+    logger.handlers[:] = [handler]
+    logger.setLevel(nivel)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,184 @@
+"""
+Búsqueda exacta (fuerza bruta) en paralelo sobre matrices de vectores.
+
+La matriz de candidatos se parte en bloques de filas que se puntúan en un pool de
+hilos: numpy libera el GIL durante los productos (BLAS), así que los bloques
+avanzan a la vez en varios núcleos, y con matrices mapeadas en memoria también
+se reparten las lecturas de páginas. Para top k, cada bloque se queda con sus
+k mejores y al final se mezclan los de todos los bloques.
+
+Los ajustes (ranking híbrido) suman a la similitud de cada fila un peso por una
+columna numérica de esa fila (citas, recencia, colaboraciones...), en el mismo
+recorrido por bloques: no hace falta otra pasada ni traer documentos.
+
+Cada hilo del pool ya ocupa un núcleo, así que BLAS debería usar uno solo por
+llamada (limitar_hilos_blas); con gunicorn se limita en cada worker (post_fork).
+
+Variables de entorno:
+    AUTHORCOLAB_BUSQUEDA_HILOS   hilos del pool por proceso (por defecto min(4, CPUs))
+    AUTHORCOLAB_BUSQUEDA_BLOQUE  filas máximas por bloque (por defecto 32768)
+    AUTHORCOLAB_BLAS_HILOS       hilos de BLAS por llamada (por defecto 1)
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+HILOS_BUSQUEDA = int(os.environ.get('AUTHORCOLAB_BUSQUEDA_HILOS', min(4, os.cpu_count() or 1)))
+FILAS_BLOQUE = int(os.environ.get('AUTHORCOLAB_BUSQUEDA_BLOQUE', 32768))
+HILOS_BLAS = int(os.environ.get('AUTHORCOLAB_BLAS_HILOS', 1))
+
+# Por debajo de este tamaño un bloque no compensa el reparto entre hilos
+FILAS_MINIMAS_BLOQUE = 4096
+
+
+def _sumar_ajustes(ajustes, filas):
+    """Suma de peso * funcion(filas) de cada ajuste (float32)"""
+    total = np.zeros(len(filas), dtype=np.float32)
+    for funcion, peso in ajustes:
+        total += np.float32(peso) * np.asarray(funcion(filas), dtype=np.float32)
+    return total
+
+
+def _mejores_k(candidatos, puntajes, k):
+    """
+    Posiciones de los k mayores puntajes de cada fila de 'puntajes'. argpartition
+    elige al azar entre los empatados en el límite: ahí se toman los de candidato
+    menor, para que el resultado no dependa de los bloques. 'candidatos' es la fila
+    de cada columna, común a todas (1D) o propia de cada fila (2D).
+    """
+    mejores = np.argpartition(-puntajes, k - 1, axis=1)[:, :k]
+    if k == puntajes.shape[1]:
+        return mejores
+    elegidos = np.take_along_axis(puntajes, mejores, axis=1)
+    limite = elegidos.min(axis=1, keepdims=True)
+    # Filas con más empatados en el límite que lugares para ellos
+    sobran = (puntajes == limite).sum(axis=1) > (elegidos == limite).sum(axis=1)
+    for i in np.flatnonzero(sobran):
+        filas = candidatos if candidatos.ndim == 1 else candidatos[i]
+        mayores = np.flatnonzero(puntajes[i] > limite[i])
+        empatados = np.flatnonzero(puntajes[i] == limite[i])
+        empatados = empatados[np.argsort(filas[empatados], kind='stable')[:k - len(mayores)]]
+        mejores[i] = np.concatenate([mayores, empatados])
+    return mejores
+
+
+def limitar_hilos_blas(hilos=None):
+    """Limita los hilos de BLAS de todo el proceso (por defecto a AUTHORCOLAB_BLAS_HILOS)"""
+    return threadpool_limits(limits=hilos or HILOS_BLAS, user_api='blas')
+
+
+class BuscadorExacto:
+    """Puntajes y top k exactos sobre matrices de vectores, por bloques en un pool de hilos"""
+
+    def __init__(self, hilos=HILOS_BUSQUEDA, filas_bloque=FILAS_BLOQUE):
+        self.hilos = max(1, hilos)
+        self.filas_bloque = max(1, filas_bloque)
+        self._ejecutor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _bloques(self, total):
+        """Límites (inicio, fin) de los bloques: al menos uno por hilo si hay filas suficientes"""
+        tamano = min(self.filas_bloque, max(FILAS_MINIMAS_BLOQUE, -(-total // self.hilos)))
+        return [(inicio, min(inicio + tamano, total)) for inicio in range(0, total, tamano)]
+
+    def _mapear(self, funcion, bloques):
+        if self.hilos == 1 or len(bloques) <= 1:
+            return [funcion(bloque) for bloque in bloques]
+        with self._lock:
+            # Los hilos no sobreviven a un fork: cada worker crea su propio pool
+            if self._ejecutor is None or self._pid != os.getpid():
+                self._ejecutor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='busqueda')
+                self._pid = os.getpid()
+        return list(self._ejecutor.map(funcion, bloques))
+
+    def puntuar(self, terminos, filas=None):
+        """
+        Suma ponderada de productos matriz-vector, peso * (matriz @ consulta), por cada
+        (matriz, consulta, peso) de 'terminos'; sobre todas las filas de las matrices
+        o solo sobre 'filas'.
+        """
+        return self.puntuar_con_ajustes(terminos, (), filas)[0]
+
+    def puntuar_con_ajustes(self, terminos, ajustes, filas=None):
+        """
+        Como puntuar, y además el puntaje híbrido de cada fila: la similitud más
+        peso * funcion(filas del bloque) por cada (funcion, peso) de 'ajustes'
+        (funcion devuelve un valor por fila). Devuelve (similitudes, puntajes).
+        """
+        if filas is not None:
+            filas = np.asarray(filas, dtype=np.int64)
+        total = len(filas) if filas is not None else len(terminos[0][0])
+
+        def puntuar_bloque(limites):
+            inicio, fin = limites
+            similitudes = None
+            for matriz, consulta, peso in terminos:
+                vectores = matriz[inicio:fin] if filas is None else matriz[filas[inicio:fin]]
+                parcial = peso * np.dot(vectores, consulta)
+                similitudes = parcial if similitudes is None else similitudes + parcial
+            if not ajustes:
+                return similitudes, similitudes
+            return similitudes, similitudes + _sumar_ajustes(
+                ajustes, np.arange(inicio, fin) if filas is None else filas[inicio:fin]
+            )
+
+        # Sin filas se calcula igual un bloque vacío, para devolver el tipo correcto
+        partes = self._mapear(puntuar_bloque, self._bloques(total) or [(0, 0)])
+        similitudes = np.concatenate([s for s, _ in partes])
+        if not ajustes:
+            return similitudes, similitudes
+        return similitudes, np.concatenate([p for _, p in partes])
+
+    def top_k(self, matriz, consultas, k, filas=None, excluir=None, ajustes=()):
+        """
+        Las k filas de 'matriz' (o de 'filas') con mayor producto punto con cada
+        consulta (filas de 'consultas'). excluir[i] es una fila que no puede resultar
+        para la consulta i, p. ej. el propio autor (-1 = ninguna). Con 'ajustes'
+        (ver puntuar_con_ajustes) el orden y los puntajes son los híbridos.
+
+        Devuelve (filas, puntajes), cada uno de consultas x k, de mayor a menor puntaje
+        (a igual puntaje, la fila menor primero). Si hay menos de k candidatos
+        válidos, las posiciones sobrantes tienen puntaje -inf.
+        """
+        consultas = np.atleast_2d(consultas)
+        if filas is not None:
+            filas = np.asarray(filas, dtype=np.int64)
+        if excluir is not None:
+            excluir = np.asarray(excluir, dtype=np.int64)
+        total = len(filas) if filas is not None else len(matriz)
+        k = min(k, total)
+        if k <= 0:
+            return np.zeros((len(consultas), 0), dtype=np.int64), np.zeros((len(consultas), 0), dtype=np.float32)
+
+        def top_bloque(limites):
+            inicio, fin = limites
+            if filas is None:
+                candidatos = np.arange(inicio, fin)
+                vectores = matriz[inicio:fin]
+            else:
+                candidatos = filas[inicio:fin]
+                vectores = matriz[candidatos]
+            puntajes = consultas @ vectores.T
+            if ajustes:
+                puntajes += _sumar_ajustes(ajustes, candidatos)
+            if excluir is not None:
+                puntajes[candidatos[None, :] == excluir[:, None]] = -np.inf
+
+            mejores = _mejores_k(candidatos, puntajes, min(k, fin - inicio))
+            return candidatos[mejores], np.take_along_axis(puntajes, mejores, axis=1)
+
+        partes = self._mapear(top_bloque, self._bloques(total))
+
+        # Mezcla: los k mejores entre los k mejores de cada bloque
+        candidatos = np.concatenate([c for c, _ in partes], axis=1)
+        puntajes = np.concatenate([p for _, p in partes], axis=1)
+        if candidatos.shape[1] > k:
+            mejores = _mejores_k(candidatos, puntajes, k)
+            candidatos = np.take_along_axis(candidatos, mejores, axis=1)
+            puntajes = np.take_along_axis(puntajes, mejores, axis=1)
+        orden = np.lexsort((candidatos, -puntajes), axis=-1)
+        return np.take_along_axis(candidatos, orden, axis=1), np.take_along_axis(puntajes, orden, axis=1)
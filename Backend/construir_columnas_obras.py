@@ -0,0 +1,93 @@
+"""
+Extrae de MongoDB las columnas numéricas que usa el ranking híbrido de trabajos
+(cited_by_count y publication_year de works_<pais>) para las obras de la matriz
+(matriz_obras_separadas.h5), en archivos_para_el_backend/columnas_obras.h5.
+
+Con ellas el backend combina similitud, citas y recencia en la misma pasada que
+calcula las similitudes, sin traer los documentos de MongoDB (ver
+ajustes_ranking_trabajos en backend_final7.py). construir_snapshot.py las incluye
+en el snapshot si existen.
+
+Contenido:
+    obras_ids          ID de obra de cada fila
+    cited_by_count     int32: citas de cada obra
+    publication_year   int16: año de publicación (0 = desconocido)
+
+Usa la conexión configurada para el backend (AUTHORCOLAB_MONGO_URI,
+AUTHORCOLAB_MONGO_DB, AUTHORCOLAB_ALMACENAMIENTO).
+
+Uso (desde la raíz del proyecto, con mongod corriendo):
+
+    python Backend/construir_columnas_obras.py
+    python Backend/construir_columnas_obras.py --paises cl ar
+"""
+import argparse
+import os
+import time
+
+import h5py
+import numpy as np
+
+from backend_final7 import ARCHIVO_COLUMNAS_OBRAS, DATA_DIR, _decodificar, repositorio
+
+ARCHIVO_OBRAS = 'matriz_obras_separadas.h5'
+
+
+def leer_obras_matriz(ruta):
+    """IDs de obra (sin repetir, en el orden de la matriz) y países de la matriz"""
+    with h5py.File(ruta, 'r') as f:
+        metadata = f['metadata']
+        ids = _decodificar(metadata['ids'][:])
+        paises = sorted({p.lower() for p in _decodificar(metadata['paises'][:])})
+    return list(dict.fromkeys(ids)), paises
+
+
+def leer_columnas(paises, ids):
+    """Citas y año de cada obra de 'ids' (0 si no está en MongoDB) y cuántas se encontraron"""
+    posicion = {work_id: i for i, work_id in enumerate(ids)}
+    citas = np.zeros(len(ids), dtype=np.int32)
+    anios = np.zeros(len(ids), dtype=np.int16)
+    encontradas = 0
+
+    obras = repositorio.buscar_en_paises(
+        'works', paises, {}, {'_id': 1, 'cited_by_count': 1, 'publication_year': 1}
+    )
+    for _, obra in obras:
+        i = posicion.get(obra['_id'])
+        if i is None:
+            continue
+        encontradas += 1
+        citas[i] = int(obra.get('cited_by_count') or 0)
+        anios[i] = int(obra.get('publication_year') or 0)
+    return citas, anios, encontradas
+
+
+def escribir(ruta, ids, citas, anios):
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with h5py.File(temporal, 'w') as f:
+        f.create_dataset('obras_ids', data=ids, dtype=h5py.string_dtype('utf-8'))
+        f.create_dataset('cited_by_count', data=citas, compression='gzip')
+        f.create_dataset('publication_year', data=anios, compression='gzip')
+    os.replace(temporal, ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extrae las citas y años de las obras de la matriz para el ranking híbrido')
+    parser.add_argument('--matriz', default=os.path.join(DATA_DIR, ARCHIVO_OBRAS))
+    parser.add_argument('--paises', nargs='+',
+                        help='Códigos de país a procesar (por defecto, los de la matriz)')
+    parser.add_argument('--destino', default=os.path.join(DATA_DIR, ARCHIVO_COLUMNAS_OBRAS))
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ids, paises = leer_obras_matriz(args.matriz)
+    if args.paises:
+        paises = [p.lower() for p in args.paises]
+    citas, anios, encontradas = leer_columnas(paises, ids)
+    escribir(args.destino, ids, citas, anios)
+    print(f"✅ {args.destino}: {len(ids)} obras, {encontradas} encontradas en MongoDB "
+          f"({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Precalcula los conceptos de todos los autores (concepts_weighted_by_citations de
+authors_<pais>) como matriz dispersa autor x concepto, en
+archivos_para_el_backend/conceptos_autores.h5.
+
+Con ella el backend obtiene los conceptos más comunes de un grupo de autores
+(autores similares) sumando sus filas, sin consultar MongoDB en cada petición.
+construir_snapshot.py la incluye en el snapshot si existe.
+
+Contenido:
+    autores_ids               ID de autor de cada fila
+    conceptos                 nombre (display_name) de cada columna
+    indptr, indices, valores  matriz CSR: fila -> columnas y su weighted_average_score
+
+Usa la conexión configurada para el backend (AUTHORCOLAB_MONGO_URI,
+AUTHORCOLAB_MONGO_DB, AUTHORCOLAB_ALMACENAMIENTO).
+
+Uso (desde la raíz del proyecto, con mongod corriendo):
+
+    python Backend/construir_conceptos_autores.py
+    python Backend/construir_conceptos_autores.py --paises cl ar
+"""
+import argparse
+import os
+import time
+
+import h5py
+import numpy as np
+
+from backend_final7 import ARCHIVO_CONCEPTOS_AUTORES, DATA_DIR, repositorio
+
+
+def leer_conceptos(paises):
+    """Entradas (columna, puntaje) de cada autor y nombre de cada columna"""
+    filas = {}
+    columnas = {}
+    autores = repositorio.buscar_en_paises(
+        'authors', paises, {}, {'_id': 1, 'concepts_weighted_by_citations': 1}
+    )
+    for _, autor in autores:
+        # Un autor presente en varios países suma las entradas de todos, como en el backend
+        entradas = filas.setdefault(autor['_id'], [])
+        for concepto in autor.get('concepts_weighted_by_citations') or []:
+            nombre = concepto.get('display_name')
+            score = concepto.get('weighted_average_score', 0)
+            if nombre and score > 0:
+                entradas.append((columnas.setdefault(nombre, len(columnas)), score))
+    return filas, list(columnas)
+
+
+def escribir(ruta, filas, nombres):
+    ids = list(filas)
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(filas[i]) for i in ids])
+    total = int(indptr[-1])
+    indices = np.fromiter((c for i in ids for c, _ in filas[i]), dtype=np.int32, count=total)
+    valores = np.fromiter((v for i in ids for _, v in filas[i]), dtype=np.float32, count=total)
+
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with h5py.File(temporal, 'w') as f:
+        texto = h5py.string_dtype('utf-8')
+        f.create_dataset('autores_ids', data=ids, dtype=texto)
+        f.create_dataset('conceptos', data=nombres, dtype=texto)
+        f.create_dataset('indptr', data=indptr)
+        f.create_dataset('indices', data=indices, compression='gzip')
+        f.create_dataset('valores', data=valores, compression='gzip')
+    os.replace(temporal, ruta)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precalcula la matriz autor x concepto de los autores similares')
+    parser.add_argument('--paises', nargs='+',
+                        help='Códigos de país a procesar (por defecto, todos los que tienen authors)')
+    parser.add_argument('--destino', default=os.path.join(DATA_DIR, ARCHIVO_CONCEPTOS_AUTORES))
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    paises = [p.lower() for p in args.paises] if args.paises else repositorio.paises_con_entidad('authors')
+    filas, nombres = leer_conceptos(paises)
+    total = escribir(args.destino, filas, nombres)
+    print(f"✅ {args.destino}: {len(filas)} autores, {len(nombres)} conceptos, {total} entradas "
+          f"({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
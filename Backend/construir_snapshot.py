@@ -0,0 +1,236 @@
+"""
+Convierte los artefactos de Zenodo (archivos_para_el_backend/*.h5 y *.pkl) en un
+snapshot versionado de solo lectura (ver snapshot.py) que el backend abre
+mapeado en memoria: arranque casi instantáneo y una sola copia en RAM compartida
+por todos los workers a través de la cache de páginas del sistema.
+
+Contenido:
+    autores_vectores.npy                vectores reducidos de autores
+    autores_{ids,nombres,paises,...}    tablas de textos de la metadata
+    autores_instituciones (CSR)         autor -> nombres de institución
+    autores_vocabulario + postings      índice de nombres de autores (token -> autores)
+    autores_conceptos (CSR) + valores   autor -> conceptos (ver construir_conceptos_autores.py)
+    conceptos_nombres                   nombre de cada concepto
+    autores_vecinos.npy                 autor -> K autores más similares (ver construir_vecinos_autores.py)
+    obras_{titulo,conceptos}_normalizado.npy
+    obras_ids                           tabla de IDs de obra
+    obras_por_pais (CSR)                país -> obras (en el orden de manifest['paises_obras'])
+    obras_instituciones (CSR)           obra -> IDs de institución (obras_ids_instituciones)
+    obras_citas, obras_anios            citas y año de cada obra (ver construir_columnas_obras.py)
+    pca_*.pkl                           copias de los modelos PCA
+
+La versión es una huella de los archivos de origen. Al terminar se activa (archivo
+ACTUAL) de forma atómica; el backend la detecta y la carga sin reiniciarse (ver
+RegistroDatos en backend_final7.py).
+
+Uso (desde la raíz del proyecto):
+
+    python Backend/construir_snapshot.py
+    python Backend/construir_snapshot.py --destino /datos/snapshots --no-activar
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import h5py
+import numpy as np
+
+from backend_final7 import (
+    ARCHIVO_COLUMNAS_OBRAS, ARCHIVO_CONCEPTOS_AUTORES, ARCHIVO_VECINOS_AUTORES, DATA_DIR, DIR_SNAPSHOTS,
+    IndiceNombresAutores, _decodificar, _leer_autores_h5, huella_autores, instituciones_de_obras_json,
+    leer_columnas_obras_h5, leer_conceptos_autores_h5, leer_vecinos_autores_h5, normalizar_filas
+)
+from snapshot import FORMATO_SNAPSHOT, MatrizCSR, TablaTextos, activar_version
+
+ARCHIVO_AUTORES = 'autores_reducidos_completo_ponderado.h5'
+ARCHIVO_OBRAS = 'matriz_obras_separadas.h5'
+MODELOS_PCA = ['pca_model_completo_ponderado.pkl', 'pca_titulo.pkl', 'pca_conceptos.pkl']
+
+
+def huella_origen(origen):
+    """Tamaño y fecha de modificación de cada archivo de origen presente"""
+    huella = {}
+    for nombre in [ARCHIVO_AUTORES, ARCHIVO_OBRAS, ARCHIVO_CONCEPTOS_AUTORES, ARCHIVO_VECINOS_AUTORES,
+                   ARCHIVO_COLUMNAS_OBRAS] + MODELOS_PCA:
+        ruta = os.path.join(origen, nombre)
+        if os.path.exists(ruta):
+            info = os.stat(ruta)
+            huella[nombre] = {'tamano': info.st_size, 'modificado': info.st_mtime_ns}
+    return huella
+
+
+class EscritorSnapshot:
+    """Escribe los artefactos en un directorio y registra su descripción para el manifest"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.contenido = {}
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def array(self, nombre, valores):
+        valores = np.ascontiguousarray(valores)
+        np.save(self.ruta(f'{nombre}.npy'), valores)
+        self.contenido[nombre] = {'tipo': 'array', 'dtype': str(valores.dtype), 'forma': list(valores.shape)}
+
+    def textos(self, nombre, textos):
+        total = TablaTextos.escribir(self.ruta(nombre), textos)
+        self.contenido[nombre] = {'tipo': 'textos', 'total': total}
+
+    def csr(self, nombre, matriz):
+        matriz.escribir(self.ruta(nombre))
+        self.contenido[nombre] = {'tipo': 'csr', 'filas': len(matriz), 'valores': int(matriz.indptr[-1])}
+
+    def copia(self, nombre, ruta_origen):
+        shutil.copyfile(ruta_origen, self.ruta(nombre))
+        self.contenido[nombre] = {'tipo': 'archivo'}
+
+
+def escribir_autores(escritor, ruta):
+    df, vectores = _leer_autores_h5(ruta)
+    escritor.array('autores_vectores', vectores)
+    escritor.array('autores_collaboration_counts', df['Collaboration Count'].values)
+    escritor.textos('autores_ids', df['Author ID'])
+    escritor.textos('autores_nombres', df['Name'])
+    escritor.textos('autores_paises', df['Country'])
+    escritor.textos('autores_instituciones_json', df['Institutions JSON'])
+
+    instituciones = sorted({nombre for nombres in df['Institution Names'] for nombre in nombres})
+    posicion = {nombre: j for j, nombre in enumerate(instituciones)}
+    escritor.textos('autores_nombres_instituciones', instituciones)
+    escritor.csr('autores_instituciones', MatrizCSR.desde_listas(
+        [[posicion[nombre] for nombre in nombres] for nombres in df['Institution Names']]
+    ))
+
+    print("   🔤 Construyendo índice de nombres de autores...")
+    indice = IndiceNombresAutores(df['Author ID'].values, df['Name'].values)
+    escritor.textos('autores_vocabulario', indice.vocabulario)
+    escritor.csr('autores_postings', indice.postings)
+    print(f"   ✅ {len(df)} autores, {len(instituciones)} instituciones, {len(indice.vocabulario)} tokens")
+    # Los mismos vectores normalizados que usa el backend, para validar la tabla de vecinos
+    normalizados = np.nan_to_num(normalizar_filas(np.asarray(vectores, dtype=np.float32)))
+    return df['Author ID'], huella_autores(df['Author ID'], normalizados)
+
+
+def escribir_conceptos(escritor, ruta, ids_autores):
+    # Filas alineadas con las de autores_*
+    conceptos = leer_conceptos_autores_h5(ruta, ids_autores)
+    escritor.csr('autores_conceptos', conceptos.adyacencia)
+    escritor.array('autores_conceptos_valores', conceptos.valores)
+    escritor.textos('conceptos_nombres', conceptos.nombres)
+    print(f"   ✅ {len(conceptos.nombres)} conceptos, {len(conceptos.valores)} entradas")
+
+
+def escribir_vecinos(escritor, ruta, ids_autores, huella):
+    # Filas y vecinos alineados con las filas de autores_*
+    try:
+        vecinos = leer_vecinos_autores_h5(ruta, ids_autores, huella)
+    except ValueError as e:
+        print(f"   ⚠️  {e}: se omite")
+        return
+    escritor.array('autores_vecinos', vecinos.vecinos)
+    print(f"   ✅ {len(vecinos.vecinos)} autores x {vecinos.k} vecinos")
+
+
+def escribir_obras(escritor, ruta):
+    with h5py.File(ruta, 'r') as matriz:
+        metadata = matriz['metadata']
+        escritor.array('obras_titulo_normalizado', normalizar_filas(matriz['titulo_vectores'][:]))
+        escritor.array('obras_conceptos_normalizado', normalizar_filas(matriz['conceptos_vectores'][:]))
+        ids = _decodificar(metadata['ids'][:])
+        paises = np.array([p.upper() for p in _decodificar(metadata['paises'][:])])
+        instituciones_obras = instituciones_de_obras_json(_decodificar(metadata['instituciones_json'][:]))
+
+    escritor.textos('obras_ids', ids)
+
+    paises_obras = [str(p) for p in np.unique(paises)]
+    por_pais = [np.flatnonzero(paises == pais) for pais in paises_obras]
+    indptr = np.zeros(len(por_pais) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(indices) for indices in por_pais])
+    escritor.csr('obras_por_pais', MatrizCSR(indptr, np.concatenate(por_pais).astype(np.int64)))
+
+    ids_instituciones = sorted({i for instituciones in instituciones_obras for i in instituciones})
+    posicion = {institucion_id: j for j, institucion_id in enumerate(ids_instituciones)}
+    escritor.textos('obras_ids_instituciones', ids_instituciones)
+    escritor.csr('obras_instituciones', MatrizCSR.desde_listas(
+        [[posicion[i] for i in instituciones] for instituciones in instituciones_obras]
+    ))
+    print(f"   ✅ {len(ids)} obras, {len(paises_obras)} países, {len(ids_instituciones)} instituciones")
+    return paises_obras, ids
+
+
+def escribir_columnas_obras(escritor, ruta, ids_obras):
+    # Filas alineadas con las de obras_*
+    citas, anios = leer_columnas_obras_h5(ruta, ids_obras)
+    escritor.array('obras_citas', citas)
+    escritor.array('obras_anios', anios)
+    print(f"   ✅ {int(np.count_nonzero(anios))} de {len(anios)} obras con año")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construye el snapshot mapeable en memoria de los datos del backend')
+    parser.add_argument('--origen', default=DATA_DIR, help='Directorio con los .h5 y .pkl de Zenodo')
+    parser.add_argument('--destino', default=DIR_SNAPSHOTS, help='Directorio base de los snapshots')
+    parser.add_argument('--no-activar', action='store_true', help='Construir sin apuntar ACTUAL a la nueva versión')
+    parser.add_argument('--forzar', action='store_true', help='Reconstruir aunque la versión ya exista')
+    args = parser.parse_args()
+
+    huella = huella_origen(args.origen)
+    version = hashlib.sha1(json.dumps(huella, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    directorio = os.path.join(args.destino, version)
+
+    if os.path.exists(directorio) and not args.forzar:
+        print(f"✅ El snapshot {version} ya existe en {directorio}")
+    else:
+        inicio = time.perf_counter()
+        temporal = f'{directorio}.tmp-{os.getpid()}'
+        os.makedirs(temporal)
+        escritor = EscritorSnapshot(temporal)
+        paises_obras = []
+
+        if ARCHIVO_AUTORES in huella:
+            print(f"👤 {ARCHIVO_AUTORES}")
+            ids_autores, huella = escribir_autores(escritor, os.path.join(args.origen, ARCHIVO_AUTORES))
+            if ARCHIVO_CONCEPTOS_AUTORES in huella:
+                print(f"🏷️  {ARCHIVO_CONCEPTOS_AUTORES}")
+                escribir_conceptos(escritor, os.path.join(args.origen, ARCHIVO_CONCEPTOS_AUTORES), ids_autores)
+            if ARCHIVO_VECINOS_AUTORES in huella:
+                print(f"🧭 {ARCHIVO_VECINOS_AUTORES}")
+                escribir_vecinos(escritor, os.path.join(args.origen, ARCHIVO_VECINOS_AUTORES), ids_autores, huella)
+        if ARCHIVO_OBRAS in huella:
+            print(f"📄 {ARCHIVO_OBRAS}")
+            paises_obras, ids_obras = escribir_obras(escritor, os.path.join(args.origen, ARCHIVO_OBRAS))
+            if ARCHIVO_COLUMNAS_OBRAS in huella:
+                print(f"📊 {ARCHIVO_COLUMNAS_OBRAS}")
+                escribir_columnas_obras(escritor, os.path.join(args.origen, ARCHIVO_COLUMNAS_OBRAS), ids_obras)
+        for nombre in MODELOS_PCA:
+            if nombre in huella:
+                escritor.copia(nombre, os.path.join(args.origen, nombre))
+
+        with open(escritor.ruta('manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'formato': FORMATO_SNAPSHOT,
+                'version': version,
+                'creado': datetime.now(timezone.utc).isoformat(),
+                'origen': huella,
+                'paises_obras': paises_obras,
+                'contenido': escritor.contenido
+            }, f, indent=2, ensure_ascii=False)
+
+        if os.path.exists(directorio):
+            shutil.rmtree(directorio)
+        os.rename(temporal, directorio)
+        print(f"✅ Snapshot {version} construido en {directorio} ({time.perf_counter() - inicio:.1f}s)")
+
+    if not args.no_activar:
+        activar_version(args.destino, version)
+        print(f"✅ Versión activa: {version}. El backend la cargará en la próxima revisión")
+
+
+if __name__ == '__main__':
+    main()
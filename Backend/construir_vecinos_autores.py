@@ -0,0 +1,118 @@
+"""
+Precalcula los K autores más similares de cada autor (similitud coseno sobre los
+vectores de autores_reducidos_completo_ponderado.h5) y los guarda como tabla de
+vecinos en archivos_para_el_backend/vecinos_autores.h5.
+
+Con ella el backend responde /api/find_similar_authors sin filtros leyendo una
+fila de la tabla, y con filtros cuando al menos N de los K vecinos los cumplen
+(ver similares_desde_vecinos en backend_final7.py). construir_snapshot.py la
+incluye en el snapshot si existe.
+
+Contenido:
+    autores_ids   ID de autor de cada fila
+    vecinos       int32 (autores x K): fila de cada vecino, de más a menos similar (-1 = sin vecino)
+    similitudes   float16 (autores x K): similitud coseno de cada vecino
+    atributo huella_autores: huella de los IDs y vectores de origen (ver huella_autores);
+                  el backend no usa la tabla si el HDF5 de autores cambió
+
+El cálculo es un producto de matrices por bloques de filas, repartido entre
+varios hilos (numpy libera el GIL durante el producto); cada hilo usa BLAS con
+un solo hilo para no sobresuscribir la CPU.
+
+Uso (desde la raíz del proyecto):
+
+    python Backend/construir_vecinos_autores.py
+    python Backend/construir_vecinos_autores.py --k 200 --hilos 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+from backend_final7 import ARCHIVO_VECINOS_AUTORES, DATA_DIR, _leer_autores_h5, huella_autores, normalizar_filas
+
+ARCHIVO_AUTORES = 'autores_reducidos_completo_ponderado.h5'
+
+
+def leer_vectores(ruta):
+    """
+    IDs de autor y vectores normalizados (float32; las filas nulas quedan en 0), con
+    las mismas filas que carga el backend (sin Author ID repetidos)
+    """
+    df, vectores = _leer_autores_h5(ruta)
+    return df['Author ID'].tolist(), np.nan_to_num(normalizar_filas(vectores.astype(np.float32)))
+
+
+def vecinos_de_bloque(vectores, inicio, fin, k):
+    """Top k (filas y similitudes, ordenados) de las filas inicio:fin, sin contar a cada autor"""
+    similitudes = vectores[inicio:fin] @ vectores.T
+    filas = np.arange(fin - inicio)
+    similitudes[filas, filas + inicio] = -np.inf
+
+    mejores = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+    valores = np.take_along_axis(similitudes, mejores, axis=1)
+    orden = np.argsort(-valores, axis=1, kind='stable')
+    return np.take_along_axis(mejores, orden, axis=1), np.take_along_axis(valores, orden, axis=1)
+
+
+def calcular_vecinos(vectores, k, hilos, lote_mb):
+    total = len(vectores)
+    vecinos = np.full((total, k), -1, dtype=np.int32)
+    similitudes = np.zeros((total, k), dtype=np.float16)
+    k_real = min(k, total - 1)
+    if k_real <= 0:
+        return vecinos, similitudes
+
+    # Filas por bloque para que cada matriz de similitudes ocupe a lo sumo lote_mb
+    por_bloque = max(1, lote_mb * 1024 * 1024 // (total * 4))
+    bloques = [(inicio, min(inicio + por_bloque, total)) for inicio in range(0, total, por_bloque)]
+
+    def procesar(bloque):
+        inicio, fin = bloque
+        filas, valores = vecinos_de_bloque(vectores, inicio, fin, k_real)
+        vecinos[inicio:fin, :k_real] = filas
+        similitudes[inicio:fin, :k_real] = valores
+
+    with threadpool_limits(limits=1, user_api='blas'):
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='vecinos') as ejecutor:
+            for i, _ in enumerate(ejecutor.map(procesar, bloques), 1):
+                if i % 50 == 0 or i == len(bloques):
+                    print(f"   {i}/{len(bloques)} bloques")
+    return vecinos, similitudes
+
+
+def escribir(ruta, ids, vecinos, similitudes, huella):
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with h5py.File(temporal, 'w') as f:
+        f.attrs['huella_autores'] = huella
+        f.create_dataset('autores_ids', data=ids, dtype=h5py.string_dtype('utf-8'))
+        f.create_dataset('vecinos', data=vecinos, compression='gzip')
+        f.create_dataset('similitudes', data=similitudes, compression='gzip')
+    os.replace(temporal, ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precalcula la tabla de K vecinos más similares de cada autor')
+    parser.add_argument('--origen', default=os.path.join(DATA_DIR, ARCHIVO_AUTORES))
+    parser.add_argument('--destino', default=os.path.join(DATA_DIR, ARCHIVO_VECINOS_AUTORES))
+    parser.add_argument('--k', type=int, default=100, help='Vecinos por autor (por defecto 100)')
+    parser.add_argument('--hilos', type=int, default=os.cpu_count() or 1,
+                        help='Hilos que procesan bloques en paralelo (por defecto, uno por CPU)')
+    parser.add_argument('--lote-mb', type=int, default=256,
+                        help='Tamaño máximo de la matriz de similitudes de cada bloque (por defecto 256)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ids, vectores = leer_vectores(args.origen)
+    print(f"👤 {len(ids)} autores, {vectores.shape[1]} dimensiones")
+    vecinos, similitudes = calcular_vecinos(vectores, args.k, args.hilos, args.lote_mb)
+    escribir(args.destino, ids, vecinos, similitudes, huella_autores(ids, vectores))
+    print(f"✅ {args.destino}: {len(ids)} autores x {args.k} vecinos ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
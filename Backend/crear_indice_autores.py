@@ -0,0 +1,65 @@
+"""
+Crea las posting lists author_works_<pais> (author_id -> work_id) que usa el
+filtro por autor del backend.
+
+Cada colección se genera desde works_<pais> desenrollando authorships, igual que
+institution_works_<pais> relaciona instituciones con trabajos, y se indexa por
+(author_id, work_id) para que el filtro sea una búsqueda por índice.
+
+Uso (desde la raíz del proyecto, con mongod corriendo):
+
+    python Backend/crear_indice_autores.py
+    python Backend/crear_indice_autores.py --paises cl ar
+"""
+import argparse
+import time
+
+from pymongo import ASCENDING, MongoClient
+
+PAISES_LATAM = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt',
+                'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
+
+
+def crear_posting_list(db, pais):
+    """Regenera author_works_<pais> a partir de works_<pais> y devuelve el número de pares"""
+    coleccion_works = f'works_{pais}'
+    coleccion_destino = f'author_works_{pais}'
+
+    if coleccion_works not in db.list_collection_names():
+        print(f"⚠️  {coleccion_works} no existe, se omite")
+        return 0
+
+    db[coleccion_works].aggregate([
+        {'$project': {'authorships.author.id': 1}},
+        {'$unwind': '$authorships'},
+        {'$match': {'authorships.author.id': {'$ne': None}}},
+        {'$group': {'_id': {'author_id': '$authorships.author.id', 'work_id': '$_id'}}},
+        {'$project': {'_id': 0, 'author_id': '$_id.author_id', 'work_id': '$_id.work_id'}},
+        {'$out': coleccion_destino},
+    ], allowDiskUse=True)
+
+    db[coleccion_destino].create_index(
+        [('author_id', ASCENDING), ('work_id', ASCENDING)],
+        name='author_id_work_id'
+    )
+    return db[coleccion_destino].estimated_document_count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crea las posting lists author_works_<pais>')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--db', default='openalex_ia')
+    parser.add_argument('--paises', nargs='+', default=PAISES_LATAM,
+                        help='Códigos de país a procesar (por defecto, los 20 de Latinoamérica)')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+
+    for pais in args.paises:
+        inicio = time.perf_counter()
+        total = crear_posting_list(db, pais.lower())
+        print(f"✅ author_works_{pais.lower()}: {total} pares autor-trabajo ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
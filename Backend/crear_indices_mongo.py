@@ -0,0 +1,200 @@
+"""
+Crea los índices que necesitan las consultas del backend en las colecciones de
+los 20 países y verifica con explain() que cada consulta caliente use el índice
+esperado (y no COLLSCAN), y que las cubiertas no lean documentos (FETCH).
+
+Consultas verificadas (ver backend_final7.py):
+    institution_works_<pais>  {'institution_id': X} -> work_id (cubierta)
+    works_<pais>              {'_id': {'$in': [...]}} + publication_year / cited_by_count / open_access.is_oa
+    works_<pais>              {'authorships.author.id': {'$in': [...]}} (filtro por autor sin posting list)
+    author_works_<pais>       {'author_id': {'$in': [...]}} -> work_id
+    authors_<pais>            {'_id': {'$in': [...]}}
+    institutions_<pais>       {'_id': X}
+    vector_works_<pais>       {'_id': {'$in': [...]}}
+
+Uso (desde la raíz del proyecto, con mongod corriendo):
+
+    python Backend/crear_indices_mongo.py                 # crear índices y verificar
+    python Backend/crear_indices_mongo.py --solo-verificar
+
+Termina con código 1 si alguna consulta usa COLLSCAN, otro índice que el esperado
+o, siendo cubierta, FETCH.
+"""
+import argparse
+import sys
+
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+PAISES_LATAM = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt',
+                'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
+
+# Índices por prefijo de colección: (nombre, claves)
+INDICES = {
+    'institution_works': [
+        # Cubre {'institution_id': X} con proyección {'_id': 0, 'work_id': 1} sin leer documentos
+        ('institution_id_work_id', [('institution_id', ASCENDING), ('work_id', ASCENDING)]),
+    ],
+    'works': [
+        # Los filtros se resuelven como {'_id': {'$in': ...}, ...} proyectando solo _id:
+        # con este índice compuesto la consulta queda cubierta (sin FETCH)
+        ('id_filtros', [('_id', ASCENDING), ('publication_year', ASCENDING),
+                        ('cited_by_count', ASCENDING), ('open_access.is_oa', ASCENDING)]),
+        ('authorships_author_id', [('authorships.author.id', ASCENDING)]),
+    ],
+    'author_works': [
+        ('author_id_work_id', [('author_id', ASCENDING), ('work_id', ASCENDING)]),
+    ],
+}
+
+
+def crear_indices(db, pais, colecciones):
+    """Crea los índices de INDICES en las colecciones existentes del país"""
+    for prefijo, indices in INDICES.items():
+        coleccion = f'{prefijo}_{pais}'
+        if coleccion not in colecciones:
+            continue
+        for nombre, claves in indices:
+            db[coleccion].create_index(claves, name=nombre)
+            print(f"   🔧 {coleccion}.{nombre}")
+
+
+def consultas_representativas(db, pais, colecciones):
+    """
+    Genera (descripción, colección, query, proyección, índice esperado, cubierta, hint)
+    con valores reales tomados de cada colección, para que explain() planifique como
+    en producción. Las consultas por _id no prueban los índices de INDICES (el planner
+    elige _id_), así que cada índice se prueba con una consulta que no filtra por _id;
+    id_filtros empieza por _id y se prueba con hint, para ver que cubre los filtros.
+    """
+    def existe(prefijo):
+        return f'{prefijo}_{pais}' in colecciones
+
+    if existe('institution_works'):
+        relacion = db[f'institution_works_{pais}'].find_one({}, {'institution_id': 1, 'work_id': 1})
+        if relacion:
+            yield ('trabajos de institución', f'institution_works_{pais}',
+                   {'institution_id': relacion['institution_id']}, {'_id': 0, 'work_id': 1},
+                   'institution_id_work_id', True, False)
+            yield ('institución por id', f'institutions_{pais}',
+                   {'_id': relacion['institution_id']}, None, None, False, False)
+
+    if existe('works'):
+        work_ids = [w['_id'] for w in db[f'works_{pais}'].find({}, {'_id': 1}).limit(50)]
+        if work_ids:
+            yield ('filtros de trabajos', f'works_{pais}',
+                   {'_id': {'$in': work_ids}, 'publication_year': {'$gte': 2015},
+                    'cited_by_count': {'$gte': 5}, 'open_access.is_oa': True},
+                   {'_id': 1}, None, False, False)
+            yield ('filtros de trabajos (hint id_filtros)', f'works_{pais}',
+                   {'_id': {'$in': work_ids}, 'publication_year': {'$gte': 2015},
+                    'cited_by_count': {'$gte': 5}, 'open_access.is_oa': True},
+                   {'_id': 1}, 'id_filtros', True, True)
+            yield ('trabajos completos', f'works_{pais}', {'_id': {'$in': work_ids}}, None, None, False, False)
+            if existe('vector_works'):
+                yield ('vectores de trabajos', f'vector_works_{pais}', {'_id': {'$in': work_ids}}, None,
+                       None, False, False)
+
+        trabajo = db[f'works_{pais}'].find_one({'authorships.0': {'$exists': True}}, {'authorships.author.id': 1})
+        if trabajo:
+            author_ids = [a['author']['id'] for a in trabajo['authorships'] if a.get('author', {}).get('id')]
+            if author_ids:
+                yield ('filtro por autor', f'works_{pais}',
+                       {'authorships.author.id': {'$in': author_ids}}, {'_id': 1},
+                       'authorships_author_id', False, False)
+                if existe('author_works'):
+                    yield ('posting list de autores', f'author_works_{pais}',
+                           {'author_id': {'$in': author_ids}}, {'_id': 0, 'work_id': 1},
+                           'author_id_work_id', True, False)
+
+    if existe('authors'):
+        author_ids = [a['_id'] for a in db[f'authors_{pais}'].find({}, {'_id': 1}).limit(50)]
+        if author_ids:
+            yield ('conceptos de autores', f'authors_{pais}',
+                   {'_id': {'$in': author_ids}}, {'_id': 1, 'concepts_weighted_by_citations': 1},
+                   None, False, False)
+
+
+def etapas_del_plan(plan):
+    """Recorre un plan de explain() y devuelve todas sus etapas como (etapa, índice)"""
+    if isinstance(plan, dict):
+        etapas = [(plan['stage'], plan.get('indexName'))] if 'stage' in plan else []
+        for valor in plan.values():
+            etapas.extend(etapas_del_plan(valor))
+        return etapas
+    if isinstance(plan, list):
+        return [etapa for elemento in plan for etapa in etapas_del_plan(elemento)]
+    return []
+
+
+def problema_del_plan(etapas, indice_esperado, cubierta):
+    """Motivo por el que un plan no es el esperado, o None si lo es"""
+    nombres = [etapa for etapa, _ in etapas]
+    indices = {indice for _, indice in etapas if indice}
+    if 'COLLSCAN' in nombres:
+        return 'COLLSCAN'
+    if indice_esperado and indice_esperado not in indices:
+        return f"usa {', '.join(sorted(indices)) or 'ningún índice'} en vez de {indice_esperado}"
+    if cubierta and 'FETCH' in nombres:
+        return 'FETCH en una consulta cubierta'
+    return None
+
+
+def verificar_planes(db, pais, colecciones):
+    """
+    Ejecuta explain() sobre las consultas representativas y devuelve las que hacen
+    COLLSCAN, no usan el índice esperado o, siendo cubiertas, leen documentos
+    """
+    fallidas = []
+    for descripcion, coleccion, query, proyeccion, indice, cubierta, hint in consultas_representativas(
+            db, pais, colecciones):
+        cursor = db[coleccion].find(query, proyeccion)
+        if hint:
+            cursor = cursor.hint(indice)
+        try:
+            plan = cursor.explain()
+        except OperationFailure as error:
+            # hint de un índice que no existe
+            etapas, problema = [], f'índice {indice} no disponible ({error})'
+        else:
+            etapas = etapas_del_plan(plan.get('queryPlanner', {}).get('winningPlan', {}))
+            problema = problema_del_plan(etapas, indice, cubierta)
+        estado = f'❌ {problema}' if problema else '✅'
+        plan_texto = ' <- '.join(f'{etapa}({nombre})' if nombre else etapa for etapa, nombre in etapas)
+        print(f"   {estado} {descripcion} ({coleccion}): {plan_texto}")
+        if problema:
+            fallidas.append((coleccion, descripcion, problema))
+    return fallidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crea y verifica los índices de MongoDB del backend')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--db', default='openalex_ia')
+    parser.add_argument('--paises', nargs='+', default=PAISES_LATAM,
+                        help='Códigos de país a procesar (por defecto, los 20 de Latinoamérica)')
+    parser.add_argument('--solo-verificar', action='store_true',
+                        help='No crear índices, solo verificar los planes de consulta')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+    colecciones = set(db.list_collection_names())
+
+    fallidas = []
+    for pais in (p.lower() for p in args.paises):
+        print(f"🌎 {pais.upper()}")
+        if not args.solo_verificar:
+            crear_indices(db, pais, colecciones)
+        fallidas.extend(verificar_planes(db, pais, colecciones))
+
+    if fallidas:
+        print(f"❌ {len(fallidas)} consultas sin el plan esperado:")
+        for coleccion, descripcion, problema in fallidas:
+            print(f"   - {coleccion}: {descripcion} ({problema})")
+        sys.exit(1)
+
+    print("✅ Todas las consultas usan los índices esperados")
+
+
+if __name__ == '__main__':
+    main()
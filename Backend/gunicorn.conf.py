@@ -0,0 +1,92 @@
+"""
+Configuración de gunicorn para servir el backend en producción.
+
+El master importa wsgi:app (preload_app) y carga los modelos y matrices una sola
+vez; luego hace fork de los workers, que comparten esas páginas de solo lectura.
+Cada worker atiende varias peticiones a la vez con hilos (worker_class gthread).
+
+Uso (desde la raíz del proyecto, con mongod corriendo):
+
+    gunicorn -c Backend/gunicorn.conf.py
+    AUTHORCOLAB_WORKERS=4 AUTHORCOLAB_THREADS=8 gunicorn -c Backend/gunicorn.conf.py
+
+Variables de entorno:
+    AUTHORCOLAB_BIND         dirección de escucha (por defecto 0.0.0.0:5000)
+    AUTHORCOLAB_WORKERS      procesos worker (por defecto 2)
+    AUTHORCOLAB_THREADS      hilos por worker (por defecto 4)
+    AUTHORCOLAB_TIMEOUT      segundos antes de reiniciar un worker bloqueado (por defecto 120)
+    AUTHORCOLAB_TORCH_HILOS  hilos de torch por worker al codificar consultas (por defecto 1)
+    AUTHORCOLAB_BLAS_HILOS   hilos de BLAS por worker (por defecto 1; ver busqueda_exacta.py)
+    AUTHORCOLAB_METRICAS_DIR directorio donde los workers publican sus métricas para /metrics
+                             (por defecto <tmp>/authorcolab_metricas; se vacía al arrancar)
+    AUTHORCOLAB_VIGILAR_DATOS  segundos entre revisiones de una nueva versión de los datos (por defecto 0,
+                               sin recargas; cada worker la cargaría en memoria propia, ver post_fork)
+"""
+import gc
+import glob
+import os
+import tempfile
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'wsgi:app'
+
+bind = os.environ.get('AUTHORCOLAB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('AUTHORCOLAB_WORKERS', 2))
+threads = int(os.environ.get('AUTHORCOLAB_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('AUTHORCOLAB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Cargar la aplicación en el master antes del fork
+preload_app = True
+
+# Sin recargas en los workers salvo que se pidan: la versión nueva se carga con un
+# reinicio (USR2), y así los workers siguen compartiendo los datos del master
+os.environ.setdefault('AUTHORCOLAB_VIGILAR_DATOS', '0')
+
+# Cada worker publica sus métricas aquí y /metrics suma las de todos (ver tiempos.py);
+# se fija antes de que el master importe la aplicación
+DIR_METRICAS = os.environ.setdefault(
+    'AUTHORCOLAB_METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'authorcolab_metricas')
+)
+
+
+def on_starting(server):
+    # Los contadores empiezan de cero con cada arranque del servidor
+    os.makedirs(DIR_METRICAS, exist_ok=True)
+    for ruta in glob.glob(os.path.join(DIR_METRICAS, 'metricas_*.json')):
+        os.remove(ruta)
+
+
+def when_ready(server):
+    # Todo lo cargado hasta aquí vive mientras viva el proceso: sacarlo del
+    # recolector evita que los workers toquen (y copien) esas páginas
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import torch
+    import backend_final7
+
+    torch.set_num_threads(int(os.environ.get('AUTHORCOLAB_TORCH_HILOS', 1)))
+    # La búsqueda exacta ya reparte los bloques entre hilos: BLAS con más hilos por
+    # llamada (y por worker) sobresuscribiría la CPU
+    backend_final7.limitar_hilos_blas()
+    # Conexiones propias del worker: MongoClient no es seguro tras un fork
+    backend_final7.repositorio.reconectar()
+    # Con AUTHORCOLAB_VIGILAR_DATOS > 0, cada worker revisa y carga por su cuenta las
+    # nuevas versiones de los datos. Esa copia es privada del worker (no viene del
+    # master): tras una recarga la memoria ya no se comparte. Por eso el valor por
+    # defecto aquí es 0: publicar el snapshot y reiniciar gunicorn. Con preload_app,
+    # HUP no recarga la aplicación, pero USR2 levanta un master nuevo que la carga una
+    # vez (luego QUIT al anterior)
+    backend_final7.iniciar_vigilancia_datos()
+
+
+def worker_exit(server, worker):
+    # Lo registrado desde la última publicación, para que no se pierda al reiniciar el worker
+    import backend_final7
+
+    backend_final7.metricas.publicar()
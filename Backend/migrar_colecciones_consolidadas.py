@@ -0,0 +1,114 @@
+"""
+Migra las colecciones por país (works_ar ... works_ve, institutions_*, authors_*, ...)
+a colecciones consolidadas con un campo 'country', para usar el backend con
+AUTHORCOLAB_ALMACENAMIENTO=consolidado.
+
+Cada documento se copia con su _id original en 'doc_id' y el código de país en
+minúsculas en 'country'. Un trabajo que aparece en varios países queda como un
+documento por país, de modo que (country, doc_id) es único y sirve como shard key.
+
+La copia se hace en el servidor con $merge (MongoDB 4.2+), así que se puede
+relanzar: los documentos ya migrados se reemplazan.
+
+Uso (desde la raíz del proyecto, con mongod corriendo):
+
+    python Backend/migrar_colecciones_consolidadas.py
+    python Backend/migrar_colecciones_consolidadas.py --entidades works institutions authors
+    python Backend/migrar_colecciones_consolidadas.py --shard    # en un clúster con mongos
+"""
+import argparse
+import time
+
+from pymongo import ASCENDING, MongoClient
+
+PAISES_LATAM = ['ar', 'bo', 'br', 'cl', 'co', 'cr', 'cu', 'ec', 'sv', 'gt',
+                'ht', 'hn', 'mx', 'ni', 'pa', 'py', 'pe', 'do', 'uy', 've']
+
+ENTIDADES = ['works', 'institutions', 'authors', 'institution_works', 'author_works', 'vector_works']
+
+# Índices de las colecciones consolidadas (además del único (country, doc_id))
+INDICES = {
+    'works': [
+        ('doc_id_filtros', [('doc_id', ASCENDING), ('country', ASCENDING), ('publication_year', ASCENDING),
+                            ('cited_by_count', ASCENDING), ('open_access.is_oa', ASCENDING)]),
+        ('authorships_author_id_country', [('authorships.author.id', ASCENDING), ('country', ASCENDING)]),
+    ],
+    'institutions': [
+        ('doc_id_country', [('doc_id', ASCENDING), ('country', ASCENDING)]),
+    ],
+    'authors': [
+        ('doc_id_country', [('doc_id', ASCENDING), ('country', ASCENDING)]),
+    ],
+    'vector_works': [
+        ('doc_id_country', [('doc_id', ASCENDING), ('country', ASCENDING)]),
+    ],
+    'institution_works': [
+        ('institution_id_country_work_id', [('institution_id', ASCENDING), ('country', ASCENDING),
+                                            ('work_id', ASCENDING)]),
+    ],
+    'author_works': [
+        ('author_id_country_work_id', [('author_id', ASCENDING), ('country', ASCENDING),
+                                       ('work_id', ASCENDING)]),
+    ],
+}
+
+
+def crear_indices(db, entidad):
+    """Crea el índice único (country, doc_id), requerido por $merge, y los de INDICES"""
+    db[entidad].create_index([('country', ASCENDING), ('doc_id', ASCENDING)],
+                             name='country_doc_id', unique=True)
+    for nombre, claves in INDICES.get(entidad, []):
+        db[entidad].create_index(claves, name=nombre)
+
+
+def migrar_pais(db, entidad, pais):
+    """Copia <entidad>_<pais> en <entidad> y devuelve el número de documentos de origen"""
+    origen = f'{entidad}_{pais}'
+    db[origen].aggregate([
+        {'$addFields': {'doc_id': '$_id', 'country': pais}},
+        {'$project': {'_id': 0}},
+        {'$merge': {'into': entidad, 'on': ['country', 'doc_id'],
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}},
+    ], allowDiskUse=True)
+    return db[origen].estimated_document_count()
+
+
+def shardear(client, nombre_db, entidad):
+    """Distribuye la colección consolidada por país en un clúster"""
+    client.admin.command('enableSharding', nombre_db)
+    client.admin.command('shardCollection', f'{nombre_db}.{entidad}', key={'country': 1, 'doc_id': 1})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migra las colecciones por país a colecciones consolidadas')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--db', default='openalex_ia')
+    parser.add_argument('--entidades', nargs='+', default=ENTIDADES, choices=ENTIDADES)
+    parser.add_argument('--paises', nargs='+', default=PAISES_LATAM,
+                        help='Códigos de país a migrar (por defecto, los 20 de Latinoamérica)')
+    parser.add_argument('--shard', action='store_true',
+                        help='Shardear las colecciones consolidadas por (country, doc_id)')
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    db = client[args.db]
+    colecciones = set(db.list_collection_names())
+
+    for entidad in args.entidades:
+        print(f"📦 {entidad}")
+        crear_indices(db, entidad)
+        if args.shard:
+            shardear(client, args.db, entidad)
+
+        for pais in (p.lower() for p in args.paises):
+            if f'{entidad}_{pais}' not in colecciones:
+                continue
+            inicio = time.perf_counter()
+            total = migrar_pais(db, entidad, pais)
+            print(f"   ✅ {entidad}_{pais}: {total} documentos ({time.perf_counter() - inicio:.1f}s)")
+
+    print("✅ Migración completada. Arrancar el backend con AUTHORCOLAB_ALMACENAMIENTO=consolidado")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Perfiles de CPU y memoria de peticiones sueltas, a pedido.
+
+Una petición se perfila si trae la cabecera X-Perfilar con el token de
+AUTHORCOLAB_PERFILADO_TOKEN, o si está entre las próximas N que se armaron con
+POST /api/admin/perfilado. Mientras dura (hasta enviar el último byte, también
+en streaming) un hilo muestrea cada pocos milisegundos las pilas del hilo de la
+petición y de los hilos que trabajan para ella dentro de una etapa (el fan-out
+por países, p. ej.; ver tiempos.etapa), y tracemalloc registra las asignaciones.
+Al terminar se escriben en AUTHORCOLAB_PERFILADO_DIR:
+
+    <id>.folded           pilas en formato "folded" (una pila por línea con su número de
+                          muestras), para flamegraph.pl, speedscope o inferno
+    <id>.asignaciones.txt sitios con más memoria asignada en el pico de la petición
+                          (por línea y por traza) y la que sigue viva al terminar
+    <id>.json             resumen: ruta, estado, duración, muestras y memoria pico
+
+La respuesta lleva el <id> en la cabecera X-Perfil. Se perfila una petición a la
+vez por proceso (tracemalloc es global): si ya hay una en curso, la cabecera dice
+'ocupado'. tracemalloc ve también las asignaciones de las peticiones que corren
+al mismo tiempo en el proceso, y hace bastante más lenta la petición perfilada.
+
+Sin AUTHORCOLAB_PERFILADO_TOKEN el perfilado está deshabilitado.
+
+Variables de entorno:
+    AUTHORCOLAB_PERFILADO_TOKEN         token de X-Perfilar y de /api/admin/perfilado
+    AUTHORCOLAB_PERFILADO_DIR           directorio de salida (por defecto Backend/perfiles)
+    AUTHORCOLAB_PERFILADO_INTERVALO_MS  milisegundos entre muestras (por defecto 5)
+    AUTHORCOLAB_PERFILADO_MARCOS        marcos por traza de tracemalloc (por defecto 10)
+    AUTHORCOLAB_PERFILADO_TOP           sitios de asignación a listar (por defecto 30)
+    AUTHORCOLAB_PERFILADO_MAX           perfiles que se conservan en el directorio; al
+                                        escribir uno nuevo se borran los más antiguos (por defecto 50)
+"""
+import glob
+import hmac
+import json
+import linecache
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+TOKEN = os.environ.get('AUTHORCOLAB_PERFILADO_TOKEN', '')
+DIRECTORIO = os.environ.get('AUTHORCOLAB_PERFILADO_DIR',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perfiles'))
+INTERVALO_SEGUNDOS = float(os.environ.get('AUTHORCOLAB_PERFILADO_INTERVALO_MS', 5)) / 1000
+MARCOS_TRACEMALLOC = int(os.environ.get('AUTHORCOLAB_PERFILADO_MARCOS', 10))
+TOP_ASIGNACIONES = int(os.environ.get('AUTHORCOLAB_PERFILADO_TOP', 30))
+MAX_PERFILES = int(os.environ.get('AUTHORCOLAB_PERFILADO_MAX', 50))
+
+# Archivos de cada perfil (ver Perfil.terminar)
+SUFIJOS_ARCHIVOS = ('.folded', '.asignaciones.txt', '.json')
+
+# Rutas que nunca se perfilan por armado (sí con la cabecera)
+RUTAS_NO_ARMADAS = ('/api/admin/', '/metrics', '/api/health')
+
+# El muestreador toma un snapshot de tracemalloc cuando la memoria trazada crece al
+# menos esto desde el anterior: el último queda cerca del pico (lo que ya se liberó
+# al terminar, como los json.loads intermedios, no aparece en el snapshot final)
+CRECIMIENTO_SNAPSHOT = 1.1
+MIN_BYTES_SNAPSHOT = 1024 * 1024
+
+# Asignaciones que son del propio perfilado o de la importación de módulos
+FILTROS_ASIGNACIONES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def _nombre_marco(codigo):
+    """Nombre de un marco en las pilas folded: función (archivo:línea de su definición)"""
+    nombre = f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})'
+    return nombre.replace(';', ':')
+
+
+def _nombre_hilo(nombre):
+    """'fanout-pais_3' -> 'fanout-pais': los hilos de un mismo pool se agrupan"""
+    return re.sub(r'[_-]\d+$', '', nombre)
+
+
+class Muestreador(threading.Thread):
+    """
+    Cuenta las pilas de los hilos de una petición cada 'intervalo' segundos y guarda
+    un snapshot de tracemalloc cerca del pico de memoria
+    """
+
+    def __init__(self, hilos, intervalo):
+        super().__init__(name='perfilado', daemon=True)
+        self.hilos = hilos  # función sin argumentos -> idents de los hilos a muestrear
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self.snapshot_pico = None
+        self.bytes_snapshot_pico = 0
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            marcos = sys._current_frames()
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            self.muestras += 1
+            for ident in self.hilos():
+                marco = marcos.get(ident)
+                if marco is None:
+                    continue
+                pila = []
+                while marco is not None:
+                    pila.append(_nombre_marco(marco.f_code))
+                    marco = marco.f_back
+                pila.append(_nombre_hilo(nombres.get(ident, str(ident))))
+                self.pilas[';'.join(reversed(pila))] += 1
+
+            actual, _ = tracemalloc.get_traced_memory()
+            if (actual >= self.bytes_snapshot_pico * CRECIMIENTO_SNAPSHOT
+                    and actual - self.bytes_snapshot_pico >= MIN_BYTES_SNAPSHOT):
+                self.snapshot_pico = tracemalloc.take_snapshot()
+                self.bytes_snapshot_pico = actual
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+def _marco_asignacion(marco):
+    return f'{marco.filename}:{marco.lineno}  {linecache.getline(marco.filename, marco.lineno).strip()}'
+
+
+def _lineas_estadistica(estadistica, con_traza):
+    """Tamaño, bloques y sitio de una estadística de tracemalloc (y quién lo llamó, si con_traza)"""
+    marcos = list(reversed(estadistica.traceback))  # la llamada más reciente primero
+    lineas = [f'{estadistica.size / 1024:10.1f} KiB {estadistica.count:8d} bloques  {_marco_asignacion(marcos[0])}']
+    if con_traza:
+        lineas.extend(f'{"":30}{_marco_asignacion(marco)}' for marco in marcos[1:])
+        lineas.append('')
+    return lineas
+
+
+class Perfil:
+    """Perfil de CPU (muestreo de pilas) y de memoria (tracemalloc) de una petición"""
+
+    def __init__(self, id_perfil, metodo, url, medicion, directorio):
+        self.id = id_perfil
+        self.metodo = metodo
+        self.url = url
+        self.directorio = directorio
+        self.inicio = time.perf_counter()
+        ident = threading.get_ident()
+        self._detener_tracemalloc = not tracemalloc.is_tracing()
+        if self._detener_tracemalloc:
+            tracemalloc.start(MARCOS_TRACEMALLOC)
+        tracemalloc.reset_peak()
+        self.muestreador = Muestreador(
+            lambda: {ident, *(medicion.hilos_activos() if medicion is not None else ())},
+            INTERVALO_SEGUNDOS
+        )
+        self.muestreador.start()
+
+    def terminar(self, ruta, estado):
+        """Detiene el muestreo y tracemalloc y escribe los archivos; devuelve el resumen"""
+        segundos = time.perf_counter() - self.inicio
+        self.muestreador.detener()
+        _, pico = tracemalloc.get_traced_memory()
+        snapshot_final = tracemalloc.take_snapshot().filter_traces(FILTROS_ASIGNACIONES)
+        if self._detener_tracemalloc:
+            tracemalloc.stop()
+        secciones = [('Vivo al terminar', snapshot_final)]
+        if self.muestreador.snapshot_pico is not None:
+            snapshot_pico = self.muestreador.snapshot_pico.filter_traces(FILTROS_ASIGNACIONES)
+            mib = sum(traza.size for traza in snapshot_pico.traces) / 1024 / 1024
+            secciones.insert(0, (f'Cerca del pico ({mib:.1f} MiB trazados)', snapshot_pico))
+
+        os.makedirs(self.directorio, exist_ok=True)
+        base = os.path.join(self.directorio, self.id)
+        with open(f'{base}.folded', 'w', encoding='utf-8') as f:
+            for pila, muestras in self.muestreador.pilas.most_common():
+                f.write(f'{pila} {muestras}\n')
+
+        lineas = [f'# {self.metodo} {self.url} -> {estado} ({segundos * 1000:.1f} ms, pico {pico / 1024 / 1024:.1f} MiB)']
+        for titulo, snapshot in secciones:
+            lineas.extend(['', f'## {titulo}: top {TOP_ASIGNACIONES} por línea', ''])
+            for estadistica in snapshot.statistics('lineno')[:TOP_ASIGNACIONES]:
+                lineas.extend(_lineas_estadistica(estadistica, con_traza=False))
+            lineas.extend(['', f'## {titulo}: top {TOP_ASIGNACIONES} por traza (la llamada más reciente primero)', ''])
+            for estadistica in snapshot.statistics('traceback')[:TOP_ASIGNACIONES]:
+                lineas.extend(_lineas_estadistica(estadistica, con_traza=True))
+        with open(f'{base}.asignaciones.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lineas) + '\n')
+
+        resumen = {
+            'id': self.id,
+            'metodo': self.metodo,
+            'url': self.url,
+            'ruta': ruta,
+            'estado': estado,
+            'ms': round(segundos * 1000, 1),
+            'muestras': self.muestreador.muestras,
+            'intervalo_ms': INTERVALO_SEGUNDOS * 1000,
+            'memoria_pico_mib': round(pico / 1024 / 1024, 2),
+            'archivos': [f'{self.id}{sufijo}' for sufijo in SUFIJOS_ARCHIVOS],
+        }
+        with open(f'{base}.json', 'w', encoding='utf-8') as f:
+            json.dump(resumen, f, ensure_ascii=False, indent=2)
+        return resumen
+
+
+class Perfilador:
+    """Decide qué peticiones se perfilan (cabecera o armado) y lleva la cuenta de los perfiles"""
+
+    def __init__(self, token=TOKEN, directorio=DIRECTORIO, max_perfiles=MAX_PERFILES):
+        self.token = token
+        self.directorio = directorio
+        self.max_perfiles = max_perfiles
+        self.armadas = 0
+        self.prefijo_ruta = None
+        self.recientes = deque(maxlen=20)
+        self._en_curso = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def habilitado(self):
+        return bool(self.token)
+
+    def autorizado(self, token):
+        # compare_digest solo acepta str ASCII: un token con otros caracteres daría TypeError
+        return (self.habilitado and bool(token)
+                and hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8')))
+
+    def armar(self, peticiones, prefijo_ruta=None):
+        """Perfila las próximas 'peticiones' cuya ruta empiece por 'prefijo_ruta' (0 desarma)"""
+        with self._lock:
+            self.armadas = max(0, peticiones)
+            self.prefijo_ruta = prefijo_ruta or None
+
+    def _tomar_armada(self, ruta):
+        with self._lock:
+            if (self.armadas <= 0 or ruta.startswith(RUTAS_NO_ARMADAS)
+                    or (self.prefijo_ruta and not ruta.startswith(self.prefijo_ruta))):
+                return False
+            self.armadas -= 1
+            return True
+
+    def iniciar(self, token_cabecera, metodo, ruta, url, id_peticion, medicion):
+        """
+        Perfil de la petición si se pidió y no hay otro en curso; 'ocupado' si se
+        pidió pero hay otro; None si no se pidió
+        """
+        if not self.habilitado:
+            return None
+        pedido = self.autorizado(token_cabecera)
+        if not pedido and not self.armadas:
+            return None
+        if not self._en_curso.acquire(blocking=False):
+            return 'ocupado' if pedido else None
+        if not pedido and not self._tomar_armada(ruta):
+            self._en_curso.release()
+            return None
+        id_perfil = f"{time.strftime('%Y%m%d-%H%M%S')}_{id_peticion}"
+        try:
+            return Perfil(id_perfil, metodo, url, medicion, self.directorio)
+        except Exception:
+            self._en_curso.release()
+            raise
+
+    def terminar(self, perfil, ruta, estado):
+        try:
+            resumen = perfil.terminar(ruta, estado)
+            self.recientes.append(resumen)
+            self.podar()
+            return resumen
+        finally:
+            self._en_curso.release()
+
+    def podar(self):
+        """Borra los perfiles más antiguos del directorio hasta dejar max_perfiles"""
+        resumenes = []
+        for ruta in glob.glob(os.path.join(self.directorio, '*.json')):
+            try:
+                resumenes.append((os.path.getmtime(ruta), ruta))
+            except OSError:
+                continue  # Ya lo borró otro proceso
+        resumenes.sort(reverse=True)
+        for _, ruta in resumenes[max(self.max_perfiles, 1):]:
+            base = ruta[:-len('.json')]
+            for sufijo in SUFIJOS_ARCHIVOS:
+                try:
+                    os.remove(base + sufijo)
+                except OSError:
+                    pass
+
+    def estado(self):
+        with self._lock:
+            return {
+                'habilitado': self.habilitado,
+                'armadas': self.armadas,
+                'prefijo_ruta': self.prefijo_ruta,
+                'en_curso': self._en_curso.locked(),
+                'directorio': self.directorio,
+                'recientes': list(self.recientes),
+            }
+
+
+perfilador = Perfilador()
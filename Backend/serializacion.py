@@ -0,0 +1,75 @@
+"""
+Serialización JSON de las respuestas del backend con orjson.
+
+Los tipos BSON (ObjectId, datetime, Decimal128, ...) y los escalares de numpy se
+convierten una sola vez, en el hook 'default' de orjson, mientras se codifica el
+documento; el resto (dict, list, str, números) lo recorre orjson directamente.
+
+Dos formatos:
+    'compat'  los tipos BSON se escriben igual que bson.json_util.dumps
+              ({"$oid": ...}, {"$date": ...}), para el formato actual en el que
+              la lista de documentos viaja como texto dentro de la respuesta
+    'nativo'  ObjectId como texto y fechas ISO 8601, para enviar los documentos
+              como arrays JSON normales
+
+En los dos formatos orjson escribe NaN e Infinity como null, a diferencia de
+json_util ({"$numberDouble": "NaN"}, o NaN sin comillas en su modo legacy). Es
+intencional: el frontend espera un número o nada en esos campos y no lee $numberDouble.
+"""
+import orjson
+from bson import ObjectId, Decimal128, json_util
+
+import numpy as np
+
+FORMATOS_JSON = ('compat', 'nativo')
+
+_OPCIONES = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+_OPCIONES_COMPAT = _OPCIONES | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _convertir_nativo(valor):
+    """Tipos que orjson no conoce, en formato nativo"""
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    if isinstance(valor, Decimal128):
+        return float(valor.to_decimal())
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (set, frozenset, tuple)):
+        return list(valor)
+    raise TypeError(f'Tipo no serializable: {type(valor).__name__}')
+
+
+def _convertir_compat(valor):
+    """Tipos que orjson no conoce, escritos como bson.json_util"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    return json_util.default(valor)
+
+
+def serializar(valor, formato='nativo'):
+    """Codifica 'valor' como JSON (bytes)"""
+    if formato == 'compat':
+        return orjson.dumps(valor, default=_convertir_compat, option=_OPCIONES_COMPAT)
+    return orjson.dumps(valor, default=_convertir_nativo, option=_OPCIONES)
+
+
+def serializar_texto(valor, formato='compat'):
+    """Igual que serializar() pero devuelve str, para los campos que viajan como texto"""
+    return serializar(valor, formato).decode('utf-8')
+
+
+def cuerpo_respuesta(cuerpo, campos_documentos=(), formato='compat'):
+    """
+    Codifica el cuerpo de una respuesta. En formato 'compat' los campos de
+    'campos_documentos' (p. ej. 'trabajos', 'instituciones') se envían como texto
+    JSON, igual que json_util.dumps; en 'nativo' como arrays.
+    """
+    if formato == 'compat':
+        cuerpo = dict(cuerpo)
+        for campo in campos_documentos:
+            if campo in cuerpo:
+                cuerpo[campo] = serializar_texto(cuerpo[campo], 'compat')
+    return serializar(cuerpo, formato)
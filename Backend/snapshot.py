@@ -0,0 +1,159 @@
+"""
+Formato de snapshot de solo lectura para los artefactos precalculados del backend.
+
+Un snapshot es un directorio versionado con:
+
+    manifest.json        versión, origen (archivos .h5/.pkl) y contenido
+    <nombre>.npy         arrays numpy, que se abren con np.load(mmap_mode='r')
+    <nombre>.txt.bin     tablas de textos: los textos UTF-8 concatenados...
+    <nombre>.txt.npy     ...y sus offsets (int64, n + 1)
+    <nombre>.indptr.npy  adyacencias CSR: fila i -> indices[indptr[i]:indptr[i + 1]]
+    <nombre>.indices.npy
+    *.pkl                copias de los modelos PCA
+
+Todo se abre mapeado en memoria: abrir un snapshot no copia datos, y los
+workers que lo abren comparten las páginas a través de la cache del sistema.
+
+El directorio base contiene un subdirectorio por versión y el archivo ACTUAL con
+el nombre de la versión activa (ver construir_snapshot.py).
+"""
+import json
+import os
+
+import numpy as np
+
+FORMATO_SNAPSHOT = 1
+ARCHIVO_ACTUAL = 'ACTUAL'
+
+
+class TablaTextos:
+    """Secuencia de solo lectura de textos guardados como blob UTF-8 + offsets"""
+
+    def __init__(self, ruta_base):
+        self._offsets = np.load(f'{ruta_base}.txt.npy', mmap_mode='r')
+        if os.path.getsize(f'{ruta_base}.txt.bin'):
+            self._blob = np.memmap(f'{ruta_base}.txt.bin', dtype=np.uint8, mode='r')
+        else:
+            self._blob = np.empty(0, dtype=np.uint8)  # np.memmap no admite archivos vacíos
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        blob = self._blob
+        offsets = self._offsets
+        for i in range(len(self)):
+            yield blob[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    @staticmethod
+    def escribir(ruta_base, textos):
+        offsets = [0]
+        with open(f'{ruta_base}.txt.bin', 'wb') as f:
+            for texto in textos:
+                datos = texto.encode('utf-8')
+                f.write(datos)
+                offsets.append(offsets[-1] + len(datos))
+        np.save(f'{ruta_base}.txt.npy', np.array(offsets, dtype=np.int64))
+        return len(offsets) - 1
+
+
+class MatrizCSR:
+    """Adyacencia fila -> columnas en formato CSR (indptr, indices)"""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def fila(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def seleccionar(self, filas):
+        """
+        Submatriz con las filas dadas, en ese orden (-1 = fila vacía). Devuelve también
+        la posición de cada entrada en 'indices', para tomar sus valores asociados.
+        """
+        filas = np.asarray(filas, dtype=np.int64)
+        validas = filas >= 0
+        inicios = np.where(validas, self.indptr[filas], 0)
+        largos = np.where(validas, self.indptr[filas + 1] - inicios, 0)
+        indptr = np.zeros(len(filas) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(largos)
+        posiciones = np.repeat(inicios - indptr[:-1], largos) + np.arange(indptr[-1], dtype=np.int64)
+        return MatrizCSR(indptr, self.indices[posiciones]), posiciones
+
+    @classmethod
+    def desde_listas(cls, filas, dtype=np.int32):
+        indptr = np.zeros(len(filas) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(fila) for fila in filas])
+        indices = np.fromiter((c for fila in filas for c in fila), dtype=dtype, count=int(indptr[-1]))
+        return cls(indptr, indices)
+
+    def escribir(self, ruta_base):
+        np.save(f'{ruta_base}.indptr.npy', self.indptr)
+        np.save(f'{ruta_base}.indices.npy', self.indices)
+
+    @classmethod
+    def abrir(cls, ruta_base):
+        return cls(np.load(f'{ruta_base}.indptr.npy', mmap_mode='r'),
+                   np.load(f'{ruta_base}.indices.npy', mmap_mode='r'))
+
+
+class Snapshot:
+    """Acceso a los artefactos de un snapshot ya construido"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        with open(os.path.join(directorio, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('formato') != FORMATO_SNAPSHOT:
+            raise ValueError(f"Formato de snapshot no soportado: {self.manifest.get('formato')}")
+        self.version = self.manifest['version']
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def tiene(self, nombre):
+        return nombre in self.manifest['contenido']
+
+    def array(self, nombre):
+        return np.load(self.ruta(f'{nombre}.npy'), mmap_mode='r')
+
+    def textos(self, nombre):
+        return TablaTextos(self.ruta(nombre))
+
+    def csr(self, nombre):
+        return MatrizCSR.abrir(self.ruta(nombre))
+
+
+def version_actual(directorio_base):
+    """Nombre de la versión activa, o None si no hay snapshot"""
+    try:
+        with open(os.path.join(directorio_base, ARCHIVO_ACTUAL), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def abrir_snapshot_actual(directorio_base):
+    version = version_actual(directorio_base)
+    if version is None:
+        return None
+    return Snapshot(os.path.join(directorio_base, version))
+
+
+def activar_version(directorio_base, version):
+    """Apunta ACTUAL a la versión dada de forma atómica"""
+    temporal = os.path.join(directorio_base, f'{ARCHIVO_ACTUAL}.{os.getpid()}.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(temporal, os.path.join(directorio_base, ARCHIVO_ACTUAL))
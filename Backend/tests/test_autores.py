@@ -0,0 +1,38 @@
+"""
+Pruebas de la carga de autores desde el HDF5 (_leer_autores_h5).
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import h5py
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_final7 import _leer_autores_h5  # noqa: E402
+
+
+def escribir_autores(ruta, ids, vectores):
+    with h5py.File(ruta, 'w') as f:
+        f.create_dataset('autores_reducidos', data=vectores)
+        metadata = f.create_group('metadata')
+        metadata.create_dataset('ids', data=np.array(ids, dtype='S'))
+        metadata.create_dataset('nombres', data=np.array([f'Autor {i}' for i in ids], dtype='S'))
+        metadata.create_dataset('paises', data=np.array(['CL'] * len(ids), dtype='S'))
+        metadata.create_dataset('collaboration_counts', data=np.arange(len(ids)))
+        metadata.create_dataset('institutions_json', data=np.array(['[]'] * len(ids), dtype='S'))
+
+
+def test_author_id_repetido_conserva_la_primera_fila(tmp_path):
+    ruta = str(tmp_path / 'autores.h5')
+    vectores = np.arange(10, dtype=np.float32).reshape(5, 2)
+    escribir_autores(ruta, ['A1', 'A2', 'A1', 'A3', 'A2'], vectores)
+
+    df, leidos = _leer_autores_h5(ruta)
+    assert df['Author ID'].tolist() == ['A1', 'A2', 'A3']
+    assert df['Collaboration Count'].tolist() == [0, 1, 3]
+    assert leidos.tolist() == vectores[[0, 1, 3]].tolist()
@@ -0,0 +1,85 @@
+"""
+Pruebas de BuscadorExacto.top_k (busqueda_exacta.py) y MatrizCSR.seleccionar
+(snapshot.py) contra el cálculo directo con numpy.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import busqueda_exacta  # noqa: E402
+from busqueda_exacta import BuscadorExacto  # noqa: E402
+from snapshot import MatrizCSR  # noqa: E402
+
+
+def top_k_directo(matriz, consultas, k, filas=None, excluir=None, ajustes=()):
+    """Puntúa todas las filas y ordena por puntaje descendente y fila ascendente"""
+    candidatos = np.arange(len(matriz)) if filas is None else np.asarray(filas)
+    resultado_filas, resultado_puntajes = [], []
+    for i, consulta in enumerate(consultas):
+        puntajes = matriz[candidatos] @ consulta
+        for columna, peso in ajustes:
+            puntajes = puntajes + peso * columna(candidatos)
+        if excluir is not None:
+            puntajes = np.where(candidatos == excluir[i], -np.inf, puntajes)
+        orden = np.lexsort((candidatos, -puntajes))[:k]
+        resultado_filas.append(candidatos[orden])
+        resultado_puntajes.append(puntajes[orden])
+    return np.array(resultado_filas), np.array(resultado_puntajes)
+
+
+@pytest.mark.parametrize('filas_bloque', [7, 64, 1000])
+@pytest.mark.parametrize('con_filas', [False, True])
+def test_top_k_igual_al_calculo_directo(monkeypatch, filas_bloque, con_filas):
+    # Bloques chicos para que también se pruebe la mezcla entre bloques
+    monkeypatch.setattr(busqueda_exacta, 'FILAS_MINIMAS_BLOQUE', 1)
+    rng = np.random.default_rng(filas_bloque)
+    # Valores enteros pequeños: muchos empates, también en el límite del top k
+    matriz = rng.integers(-2, 3, size=(300, 4)).astype(np.float32)
+    consultas = rng.integers(-2, 3, size=(5, 4)).astype(np.float32)
+    filas = np.sort(rng.choice(300, size=120, replace=False)) if con_filas else None
+    excluir = (filas if con_filas else np.arange(300))[[0, 3, 10, 50, 100]]
+    buscador = BuscadorExacto(hilos=2, filas_bloque=filas_bloque)
+
+    for k in (1, 10, 150):
+        obtenidas, puntajes = buscador.top_k(matriz, consultas, k, filas=filas, excluir=excluir)
+        esperadas, esperados = top_k_directo(matriz, consultas, k, filas=filas, excluir=excluir)
+        np.testing.assert_array_equal(obtenidas, esperadas)
+        np.testing.assert_array_equal(puntajes, esperados)
+
+
+def test_top_k_con_ajustes(monkeypatch):
+    monkeypatch.setattr(busqueda_exacta, 'FILAS_MINIMAS_BLOQUE', 1)
+    rng = np.random.default_rng(1)
+    matriz = rng.normal(size=(500, 8)).astype(np.float32)
+    consultas = rng.normal(size=(3, 8)).astype(np.float32)
+    columna = rng.random(500).astype(np.float32)
+    ajustes = [(lambda filas: columna[filas], 0.5)]
+
+    obtenidas, puntajes = BuscadorExacto(hilos=3, filas_bloque=50).top_k(matriz, consultas, 20, ajustes=ajustes)
+    esperadas, esperados = top_k_directo(matriz, consultas, 20, ajustes=ajustes)
+    np.testing.assert_array_equal(obtenidas, esperadas)
+    np.testing.assert_allclose(puntajes, esperados, rtol=1e-5)
+
+
+def test_seleccionar_igual_a_las_filas():
+    rng = np.random.default_rng(2)
+    listas = [sorted(rng.choice(50, size=rng.integers(0, 6), replace=False)) for _ in range(40)]
+    matriz = MatrizCSR.desde_listas(listas)
+    valores = rng.random(int(matriz.indptr[-1]))
+    filas = [5, -1, 0, 39, 5, 12, -1]
+
+    submatriz, posiciones = matriz.seleccionar(filas)
+    for i, fila in enumerate(filas):
+        esperadas = listas[fila] if fila >= 0 else []
+        inicio, fin = submatriz.indptr[i], submatriz.indptr[i + 1]
+        assert submatriz.indices[inicio:fin].tolist() == esperadas
+        esperados = valores[matriz.indptr[fila]:matriz.indptr[fila + 1]] if fila >= 0 else []
+        assert valores[posiciones[inicio:fin]].tolist() == list(esperados)
@@ -0,0 +1,30 @@
+"""
+Pruebas de la lectura de planes de explain() en crear_indices_mongo.py, sin mongod.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crear_indices_mongo import etapas_del_plan, problema_del_plan  # noqa: E402
+
+CUBIERTO = {'stage': 'PROJECTION_COVERED',
+            'inputStage': {'stage': 'IXSCAN', 'indexName': 'institution_id_work_id'}}
+CON_FETCH = {'stage': 'PROJECTION_SIMPLE',
+             'inputStage': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': '_id_'}}}
+
+
+def test_etapas_con_indice():
+    assert etapas_del_plan(CUBIERTO) == [('PROJECTION_COVERED', None), ('IXSCAN', 'institution_id_work_id')]
+
+
+def test_problemas_del_plan():
+    assert problema_del_plan(etapas_del_plan(CUBIERTO), 'institution_id_work_id', True) is None
+    assert problema_del_plan(etapas_del_plan({'stage': 'COLLSCAN'}), None, False) == 'COLLSCAN'
+    # Usar _id_ en vez del índice esperado ya no pasa la verificación
+    assert problema_del_plan(etapas_del_plan(CON_FETCH), 'id_filtros', False) == 'usa _id_ en vez de id_filtros'
+    assert problema_del_plan(etapas_del_plan(CON_FETCH), '_id_', True) == 'FETCH en una consulta cubierta'
@@ -0,0 +1,27 @@
+"""
+Pruebas del parámetro 'figures' de los autores similares (figuras_pedidas).
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_final7 import FIGURAS_AUTORES, ParametroInvalido, figuras_pedidas  # noqa: E402
+
+
+def test_texto_y_lista():
+    assert figuras_pedidas(None) == (FIGURAS_AUTORES, False)
+    assert figuras_pedidas('datos') == ((), True)
+    assert figuras_pedidas([FIGURAS_AUTORES[0]]) == ((FIGURAS_AUTORES[0],), False)
+
+
+@pytest.mark.parametrize('valor', [1, 0, {'a': 1}, [1], True])
+def test_tipo_invalido(valor):
+    with pytest.raises(ParametroInvalido):
+        figuras_pedidas(valor)
@@ -0,0 +1,59 @@
+"""
+Pruebas del filtro por autor de los trabajos (construir_query_filtros) sobre
+mongomock: IDs del índice de nombres combinados con display_name, con y sin la
+posting list author_works_<pais>.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend_final7  # noqa: E402
+from backend_final7 import CONFIG_MONGO, RepositorioMongo, aplicar_filtros_trabajos, variantes_id_openalex  # noqa: E402
+
+OPENALEX = 'https://openalex.org/'
+OBRAS = [
+    # Autora indexada: el $regex no la encuentra por la tilde
+    {'_id': 'W1', 'authorships': [{'author': {'id': OPENALEX + 'A1', 'display_name': 'Ana Pérez'}}]},
+    # Coautor fuera del índice (p. ej. de otro país): solo coincide por display_name
+    {'_id': 'W2', 'authorships': [{'author': {'id': OPENALEX + 'A9', 'display_name': 'Ana Pereira'}}]},
+    {'_id': 'W3', 'authorships': [{'author': {'id': OPENALEX + 'A2', 'display_name': 'Luis Soto'}}]},
+]
+
+
+@pytest.fixture(params=[('por_pais', True), ('por_pais', False), ('consolidado', True)],
+                ids=['por_pais', 'sin_posting_list', 'consolidado'])
+def repositorio(request, monkeypatch):
+    almacenamiento, con_posting_list = request.param
+    repositorio = RepositorioMongo(dict(CONFIG_MONGO, db='pruebas'), almacenamiento)
+    repositorio.usar_cliente(mongomock.MongoClient())
+    relaciones = [{'author_id': a['author']['id'], 'work_id': o['_id']} for o in OBRAS for a in o['authorships']]
+    if almacenamiento == 'por_pais':
+        repositorio.db['works_cl'].insert_many([dict(o) for o in OBRAS])
+        if con_posting_list:
+            repositorio.db['author_works_cl'].insert_many(relaciones)
+    else:
+        repositorio.db['works'].insert_many([{**o, 'doc_id': o['_id'], '_id': i, 'country': 'cl'}
+                                             for i, o in enumerate(OBRAS)])
+        repositorio.db['author_works'].insert_many([dict(r, country='cl') for r in relaciones])
+    monkeypatch.setattr(backend_final7, 'repositorio', repositorio)
+    # El Author ID del HDF5 sin el prefijo de OpenAlex
+    monkeypatch.setattr(backend_final7, 'resolver_filtro_autor', lambda nombre: ['A1'])
+    return repositorio
+
+
+def test_filtro_incluye_indexados_y_coautores_por_nombre(repositorio):
+    filtrados = aplicar_filtros_trabajos('cl', ['W1', 'W2', 'W3'], {'autor': 'Ana Pe'})
+    assert sorted(filtrados) == ['W1', 'W2']
+
+
+def test_variantes_id_openalex():
+    assert variantes_id_openalex(['A1', OPENALEX + 'A2']) == ['A1', OPENALEX + 'A1', 'A2', OPENALEX + 'A2']
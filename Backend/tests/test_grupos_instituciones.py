@@ -0,0 +1,59 @@
+"""
+Pruebas del orden de las instituciones de la búsqueda semántica
+(agrupar_obras_por_institucion e instituciones_desde_grupos), sin matrices ni MongoDB.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend_final7  # noqa: E402
+from backend_final7 import agrupar_obras_por_institucion, instituciones_desde_grupos  # noqa: E402
+
+# Obra (fila de la matriz) -> instituciones
+AUTORIAS = {0: ['I1'], 1: ['I2'], 2: ['I1'], 3: ['I2'], 4: ['I3']}
+
+
+class Instituciones:
+    def de_obra(self, idx):
+        return AUTORIAS[idx]
+
+
+@pytest.fixture(autouse=True)
+def datos(monkeypatch):
+    monkeypatch.setattr(backend_final7, 'obtener_datos_matriz_obras',
+                        lambda: {'ids': [f'W{i}' for i in range(5)], 'instituciones': Instituciones()})
+    monkeypatch.setattr(backend_final7, 'obtener_instituciones_por_ids',
+                        lambda ids, pais: {i: {'name': i} for i in ids})
+    # W0 no pasa los filtros
+    monkeypatch.setattr(backend_final7, 'aplicar_filtros_trabajos',
+                        lambda pais, work_ids, filtros: [w for w in work_ids if w != 'W0'])
+
+
+def grupos(filtros=None):
+    indices = np.arange(5)
+    similitudes = np.array([0.9, 0.6, 0.7, 0.8, 0.6])
+    return agrupar_obras_por_institucion('cl', indices, similitudes, filtros)
+
+
+def test_orden_por_primera_obra_relevante_antes_de_filtros():
+    # I1 aparece primero (W0) aunque W0 no pase los filtros
+    instituciones = instituciones_desde_grupos(grupos({'year_from': 2020}))
+    assert [i['id'] for i in instituciones] == ['I1', 'I2', 'I3']
+    assert instituciones[0]['trabajos_ejemplo'] == ['W2']
+
+
+def test_orden_con_umbral_mayor():
+    # Con umbral 0.65, la primera obra relevante de I1 sigue siendo W0 (filtrada) y la de I2 es W3
+    instituciones = instituciones_desde_grupos(grupos({'year_from': 2020}), umbral_similitud=0.65)
+    assert [i['id'] for i in instituciones] == ['I1', 'I2']
+    assert [i['total_trabajos'] for i in instituciones] == [1, 1]
+    instituciones = instituciones_desde_grupos(grupos({'year_from': 2020}), umbral_similitud=0.75)
+    assert [i['id'] for i in instituciones] == ['I2']
@@ -0,0 +1,54 @@
+"""
+Pruebas de las métricas para Prometheus (tiempos.py) con varios procesos que
+publican en un directorio compartido.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tiempos import MedicionPeticion, Metricas  # noqa: E402
+
+RUTA = '/api/instituciones/<pais>'
+
+
+def registrar(metricas, peticiones):
+    for _ in range(peticiones):
+        medicion = MedicionPeticion()
+        medicion.sumar_consulta_mongo(0.01)
+        metricas.registrar(medicion, 'GET', RUTA, 200)
+
+
+def linea(texto, prefijo):
+    return next(l for l in texto.splitlines() if l.startswith(prefijo))
+
+
+def test_cada_worker_expone_la_suma_de_todos(tmp_path):
+    # Dos instancias con el mismo directorio hacen de dos workers
+    worker_a, worker_b = Metricas(str(tmp_path)), Metricas(str(tmp_path))
+    worker_a.fuente_caches = lambda: {'busquedas': {'aciertos': 3, 'fallos': 1, 'bytes': 100}}
+    worker_b.fuente_caches = lambda: {'busquedas': {'aciertos': 1, 'fallos': 3, 'bytes': 50}}
+    registrar(worker_a, 3)
+    registrar(worker_b, 2)
+    # Cada worker publica a lo sumo una vez por segundo; aquí, sin esperar
+    worker_a.publicar()
+    worker_b.publicar()
+
+    for worker in (worker_a, worker_b):
+        texto = worker.exponer(caches={})
+        assert linea(texto, 'authorcolab_peticion_segundos_count').endswith(' 5')
+        assert linea(texto, 'authorcolab_consultas_mongo_por_peticion_count').endswith(' 5')
+        assert 'authorcolab_cache_consultas_total{cache="busquedas",resultado="acierto"} 4' in texto
+        assert 'authorcolab_cache_tasa_aciertos{cache="busquedas"} 0.5' in texto
+        assert 'authorcolab_cache_bytes{cache="busquedas"} 150' in texto
+
+
+def test_sin_directorio_solo_el_proceso(tmp_path):
+    metricas = Metricas(None)
+    registrar(metricas, 2)
+    assert linea(metricas.exponer(), 'authorcolab_peticion_segundos_count').endswith(' 2')
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,59 @@
+"""
+Pruebas de la paginación con cursor de los trabajos de una institución
+(pagina_trabajos_institucion), sin matrices ni MongoDB.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend_final7  # noqa: E402
+from backend_final7 import CursorInvalido, pagina_trabajos_institucion  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def rankings(monkeypatch):
+    def rankear(pais, institution_id, *args):
+        return [(f'{institution_id}-W{i}', 1 - i / 100) for i in range(10)], 'matrices'
+
+    monkeypatch.setattr(backend_final7, 'rankear_trabajos_institucion', rankear)
+    monkeypatch.setattr(backend_final7, 'iterar_trabajos_rankeados',
+                        lambda pais, tramo: ({'_id': work_id, 'pais': pais} for work_id, _ in tramo))
+    backend_final7.cache_rankings.limpiar()
+
+
+def cursor(datos):
+    return base64.urlsafe_b64encode(json.dumps(datos).encode('utf-8')).decode('ascii')
+
+
+def test_cursor_recorre_el_ranking():
+    primera = pagina_trabajos_institucion('cl', 'I1', limite=4)
+    segunda = pagina_trabajos_institucion('cl', 'I1', primera['siguiente_cursor'])
+    assert [t['_id'] for t in segunda['trabajos']] == ['I1-W4', 'I1-W5', 'I1-W6', 'I1-W7']
+
+
+@pytest.mark.parametrize('pais, institution_id', [('cl', 'I2'), ('ar', 'I1')])
+def test_cursor_de_otra_institucion_es_rechazado(pais, institution_id):
+    siguiente = pagina_trabajos_institucion('cl', 'I1', limite=4)['siguiente_cursor']
+    with pytest.raises(CursorInvalido) as error:
+        pagina_trabajos_institucion(pais, institution_id, siguiente)
+    assert error.value.codigo == 400
+
+
+@pytest.mark.parametrize('datos', [
+    {'r': ['a'], 'o': 0, 'l': 10},
+    {'r': 'a', 'o': -5, 'l': 10},
+    {'r': 'a', 'o': 'x', 'l': 10},
+])
+def test_cursor_malformado_es_rechazado(datos):
+    with pytest.raises(CursorInvalido) as error:
+        pagina_trabajos_institucion('cl', 'I1', cursor(datos))
+    assert error.value.codigo == 400
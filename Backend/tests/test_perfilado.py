@@ -0,0 +1,44 @@
+"""
+Pruebas del perfilado bajo demanda: autorización (Perfilador.autorizado) y
+límite de perfiles conservados (Perfilador.podar).
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perfilado import Perfilador  # noqa: E402
+
+
+def test_token_correcto_e_incorrecto(tmp_path):
+    perfilador = Perfilador('secreto-ñandú', str(tmp_path))
+    assert perfilador.autorizado('secreto-ñandú')
+    assert not perfilador.autorizado('secreto')
+    assert not perfilador.autorizado('')
+
+
+def test_token_no_ascii_no_lanza_error(tmp_path):
+    # hmac.compare_digest con str no ASCII lanza TypeError (un 500 en la petición)
+    assert not Perfilador('secreto', str(tmp_path)).autorizado('señal')
+
+
+def test_sin_token_configurado_no_autoriza(tmp_path):
+    assert not Perfilador('', str(tmp_path)).autorizado('cualquiera')
+
+
+def test_se_conservan_los_perfiles_mas_recientes(tmp_path):
+    perfilador = Perfilador('secreto', str(tmp_path), max_perfiles=2)
+    for i in range(4):
+        for sufijo in ('.folded', '.asignaciones.txt', '.json'):
+            ruta = tmp_path / f'perfil{i}{sufijo}'
+            ruta.write_text('')
+            os.utime(ruta, (1000 + i, 1000 + i))
+    perfilador.podar()
+    assert sorted(os.listdir(tmp_path)) == [
+        'perfil2.asignaciones.txt', 'perfil2.folded', 'perfil2.json',
+        'perfil3.asignaciones.txt', 'perfil3.folded', 'perfil3.json',
+    ]
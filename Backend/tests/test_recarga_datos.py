@@ -0,0 +1,59 @@
+"""
+Pruebas del cierre del HDF5 de la matriz de obras de un ConjuntoDatos que ya no se
+usa (después de una recarga), sin snapshot ni MongoDB.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import gc
+import os
+import pickle
+import sys
+
+import h5py
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend_final7  # noqa: E402
+from backend_final7 import ConjuntoDatos, cargar_matrices_obras  # noqa: E402
+
+
+def datos_en(directorio):
+    with h5py.File(os.path.join(directorio, 'matriz_obras_separadas.h5'), 'w') as f:
+        f['titulo'] = np.zeros((2, 4), dtype=np.float32)
+    for nombre in ('pca_titulo.pkl', 'pca_conceptos.pkl'):
+        with open(os.path.join(directorio, nombre), 'wb') as f:
+            pickle.dump({'pca': nombre}, f)
+
+
+def test_el_h5_se_cierra_al_soltar_el_conjunto(tmp_path, monkeypatch):
+    datos_en(tmp_path)
+    monkeypatch.setattr(backend_final7, 'DATA_DIR', str(tmp_path))
+    conjunto = ConjuntoDatos('v1')
+    cargar_matrices_obras(conjunto)
+    archivo = conjunto.matriz_obras
+    assert archivo.id.valid
+
+    del conjunto
+    gc.collect()
+    assert not archivo.id.valid
+
+
+def test_el_h5_se_cierra_si_la_carga_falla(tmp_path, monkeypatch):
+    datos_en(tmp_path)
+    os.remove(tmp_path / 'pca_conceptos.pkl')
+    monkeypatch.setattr(backend_final7, 'DATA_DIR', str(tmp_path))
+    # La captura de logs de pytest guardaría el warning con la excepción, y su traceback el conjunto
+    monkeypatch.setattr(backend_final7.log, 'disabled', True)
+    abiertos = []
+    original = h5py.File
+    monkeypatch.setattr(backend_final7.h5py, 'File', lambda *a, **k: abiertos.append(original(*a, **k)) or abiertos[-1])
+    conjunto = ConjuntoDatos('v1')
+    cargar_matrices_obras(conjunto)
+    assert conjunto.matriz_obras is None and abiertos[0].id.valid
+
+    del conjunto
+    gc.collect()
+    assert not abiertos[0].id.valid
@@ -0,0 +1,105 @@
+"""
+Pruebas de RepositorioMongo sobre mongomock, con las dos disposiciones de los
+datos: una colección por país ('por_pais') y colecciones consolidadas con campo
+country y el _id original en doc_id ('consolidado').
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_final7 import CONFIG_MONGO, RepositorioMongo  # noqa: E402
+
+RELACIONES = {
+    'cl': [{'author_id': 'A1', 'work_id': 'W1'}, {'author_id': 'A1', 'work_id': 'W2'},
+           {'author_id': 'A2', 'work_id': 'W3'}],
+    'ar': [{'author_id': 'A1', 'work_id': 'W9'}],
+}
+OBRAS = {'cl': [{'_id': f'W{i}', 'title': f'Obra {i}', 'publication_year': 2000 + i} for i in range(1, 8)]}
+
+
+def sembrar(db, almacenamiento):
+    for entidad, por_pais in (('author_works', RELACIONES), ('works', OBRAS)):
+        for pais, documentos in por_pais.items():
+            if almacenamiento == 'por_pais':
+                db[f'{entidad}_{pais}'].insert_many([dict(d) for d in documentos])
+            else:
+                db[entidad].insert_many([
+                    {**{('doc_id' if k == '_id' else k): v for k, v in d.items()}, 'country': pais}
+                    for d in documentos
+                ])
+
+
+@pytest.fixture(params=['por_pais', 'consolidado'])
+def repositorio(request):
+    repositorio = RepositorioMongo(dict(CONFIG_MONGO, db='pruebas', max_in=3), request.param)
+    repositorio.usar_cliente(mongomock.MongoClient())
+    sembrar(repositorio.db, request.param)
+    return repositorio
+
+
+def test_proyeccion_inclusion_excluyendo_id(repositorio):
+    # La consulta de obtener_trabajos_de_autores
+    relaciones = list(repositorio.buscar('author_works', 'cl', {'author_id': {'$in': ['A1']}},
+                                         {'_id': 0, 'work_id': 1}))
+    assert sorted(relaciones, key=lambda r: r['work_id']) == [{'work_id': 'W1'}, {'work_id': 'W2'}]
+
+
+def test_proyeccion_inclusion_conserva_id(repositorio):
+    obra = repositorio.buscar_uno('works', 'cl', {'_id': 'W3'}, {'title': 1})
+    assert obra == {'_id': 'W3', 'title': 'Obra 3'}
+
+
+def test_proyeccion_exclusion(repositorio):
+    obra = repositorio.buscar_uno('works', 'cl', {'_id': 'W3'}, {'publication_year': 0})
+    assert obra == {'_id': 'W3', 'title': 'Obra 3'}
+
+
+def test_buscar_en_paises_devuelve_pais(repositorio):
+    pares = list(repositorio.buscar_en_paises('author_works', ['cl', 'ar'], {'author_id': 'A1'},
+                                              {'_id': 0, 'work_id': 1}))
+    assert sorted((pais, r['work_id']) for pais, r in pares) == [('ar', 'W9'), ('cl', 'W1'), ('cl', 'W2')]
+    assert all(list(r) == ['work_id'] for _, r in pares)
+
+
+def test_in_grande_se_parte_en_lotes(repositorio):
+    # max_in=3: los 7 IDs se piden en 3 consultas, también con la clave traducida a doc_id
+    ids = [f'W{i}' for i in range(1, 8)]
+    consultas = []
+    find_original = repositorio.db['works' if repositorio.consolidado else 'works_cl'].find
+
+    class Coleccion:
+        def find(self, query, *args, **kwargs):
+            consultas.append(query)
+            return find_original(query, *args, **kwargs)
+
+    repositorio.db = {'works': Coleccion(), 'works_cl': Coleccion()}
+    obras = list(repositorio.buscar('works', 'cl', {'_id': {'$in': ids}}, {'title': 1}))
+    assert sorted(o['_id'] for o in obras) == ids
+    assert len(consultas) == 3
+
+
+def test_version_datos_sigue_el_documento_de_metadatos(repositorio):
+    repositorio.config = dict(repositorio.config, version_ttl=0)
+    repositorio.db['metadatos'].insert_one({'_id': 'version_datos', 'version': 1})
+    anterior = repositorio.version_datos()
+    repositorio.db['metadatos'].update_one({'_id': 'version_datos'}, {'$set': {'version': 2}})
+    assert repositorio.version_datos() != anterior
+
+
+def test_version_datos_se_relee_tras_el_ttl(repositorio):
+    repositorio.config = dict(repositorio.config, version_ttl=3600)
+    repositorio.db['metadatos'].insert_one({'_id': 'version_datos', 'version': 1})
+    anterior = repositorio.version_datos()
+    repositorio.db['metadatos'].update_one({'_id': 'version_datos'}, {'$set': {'version': 2}})
+    assert repositorio.version_datos() == anterior
+    repositorio._version_expira = 0.0
+    assert repositorio.version_datos() != anterior
@@ -0,0 +1,69 @@
+"""
+Pruebas del plazo por país de la búsqueda en todos los países
+(buscar_instituciones_todos_paises), sin consulta semántica ni MongoDB.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend_final7  # noqa: E402
+from backend_final7 import PlazoVencido, buscar_instituciones_todos_paises, plazo_consultas  # noqa: E402
+
+
+def resultados(monkeypatch, buscar_pais, plazo, paises, plazo_total=30):
+    monkeypatch.setattr(backend_final7, 'buscar_instituciones_tradicional_sin_consulta', buscar_pais)
+    return {pais: (instituciones, error) for pais, instituciones, error in
+            buscar_instituciones_todos_paises('', 0.3, 0.5, 0.5, {}, plazo=plazo, paises=paises,
+                                              plazo_total=plazo_total)}
+
+
+def test_la_cola_del_pool_no_consume_el_plazo(monkeypatch):
+    # 20 países de 0.1 s con 8 hilos tardan ~0.3 s en total, pero cada uno cabe en su
+    # plazo: la espera en la cola solo cuenta para el plazo total
+    def buscar_pais(pais, filtros):
+        time.sleep(0.1)
+        return [{'id': pais}]
+
+    obtenidos = resultados(monkeypatch, buscar_pais, 0.25, backend_final7.PAISES_LATAM)
+    assert len(obtenidos) == len(backend_final7.PAISES_LATAM)
+    assert all(error is None for _, error in obtenidos.values())
+
+
+def test_plazo_total_incluye_la_cola(monkeypatch):
+    # Con 8 hilos, los países 9 a 20 siguen en la cola cuando vence el plazo total
+    def buscar_pais(pais, filtros):
+        time.sleep(0.1)
+        return [{'id': pais}]
+
+    inicio = time.monotonic()
+    obtenidos = resultados(monkeypatch, buscar_pais, 10, backend_final7.PAISES_LATAM, plazo_total=0.15)
+    assert time.monotonic() - inicio < 0.3
+    assert len(obtenidos) == len(backend_final7.PAISES_LATAM)
+    errores = [error for _, error in obtenidos.values()]
+    assert errores.count(None) == backend_final7.HILOS_FANOUT_PAISES
+    assert set(errores) == {None, 'timeout'}
+
+
+def test_pais_lento_vence_y_los_demas_terminan(monkeypatch):
+    def buscar_pais(pais, filtros):
+        if pais == 'BR':
+            # Como _find: deja de consultar cuando vence el plazo de la tarea
+            while time.monotonic() < plazo_consultas.get():
+                time.sleep(0.01)
+            raise PlazoVencido('plazo vencido')
+        if pais == 'MX':
+            raise RuntimeError('sin conexión')
+        return [{'id': pais}]
+
+    inicio = time.monotonic()
+    obtenidos = resultados(monkeypatch, buscar_pais, 0.2, ['cl', 'br', 'mx', 'ar'])
+    assert time.monotonic() - inicio < 1
+    assert obtenidos['BR'] == ([], 'timeout')
+    assert obtenidos['MX'] == ([], 'sin conexión')
+    assert obtenidos['CL'] == ([{'id': 'CL', 'pais': 'CL'}], None)
@@ -0,0 +1,50 @@
+"""
+Pruebas de la tabla de vecinos de autores (construir_vecinos_autores.py y
+leer_vecinos_autores_h5): se rechaza si el HDF5 de autores cambió.
+
+Uso (desde la raíz del proyecto):
+
+    python -m pytest Backend/tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_final7 import huella_autores, leer_vecinos_autores_h5, normalizar_filas  # noqa: E402
+from construir_vecinos_autores import calcular_vecinos, escribir  # noqa: E402
+
+IDS = ['A0', 'A1', 'A2', 'A3']
+
+
+@pytest.fixture
+def vectores():
+    return normalizar_filas(np.random.default_rng(0).normal(size=(len(IDS), 8)).astype(np.float32))
+
+
+@pytest.fixture
+def tabla(tmp_path, vectores):
+    ruta = str(tmp_path / 'vecinos_autores.h5')
+    escribir(ruta, IDS, *calcular_vecinos(vectores, 2, 1, 1), huella_autores(IDS, vectores))
+    return ruta
+
+
+def test_tabla_de_los_mismos_autores(tabla, vectores):
+    vecinos = leer_vecinos_autores_h5(tabla, IDS, huella_autores(IDS, vectores))
+    similitudes = vectores @ vectores.T
+    np.fill_diagonal(similitudes, -np.inf)
+    assert vecinos.vecinos[:, 0].tolist() == similitudes.argmax(axis=1).tolist()
+
+
+def test_tabla_de_otros_vectores_se_rechaza(tabla, vectores):
+    with pytest.raises(ValueError):
+        leer_vecinos_autores_h5(tabla, IDS, huella_autores(IDS, vectores[::-1]))
+
+
+def test_tabla_de_otros_autores_se_rechaza(tabla, vectores):
+    ids = IDS + ['A4']
+    with pytest.raises(ValueError):
+        leer_vecinos_autores_h5(tabla, ids, huella_autores(ids, np.vstack([vectores, vectores[:1]])))
@@ -0,0 +1,370 @@
+"""
+Tiempos por etapa de cada petición y métricas agregadas para Prometheus.
+
+Las funciones del backend marcan sus etapas con `with etapa('puntuar'):`. El
+tiempo se suma a la medición de la petición en curso (una contextvar: los hilos
+del fan-out por países la heredan con copy_context), junto con las consultas a
+MongoDB y los aciertos y fallos de cada cache. Al terminar la petición la
+medición se agrega a los histogramas de Metricas, que /metrics expone en el
+formato de texto de Prometheus; si se pide, también se devuelve en la cabecera
+Server-Timing. Fuera de una petición, etapa() no registra nada.
+
+Con AUTHORCOLAB_METRICAS_DIR (gunicorn.conf.py lo fija), cada proceso publica sus
+series en un archivo de ese directorio, desde un hilo, cada segundo en que registró
+alguna petición, y /metrics
+suma las de todos los workers: cualquier worker que atienda el scrape devuelve los
+mismos contadores. Los archivos de workers que ya terminaron se siguen sumando, para
+que los contadores no bajen. Sin el directorio, /metrics ve solo su propio proceso.
+
+Variables de entorno:
+    AUTHORCOLAB_SERVER_TIMING   1 para enviar Server-Timing en todas las respuestas
+                                (por defecto solo si la petición trae X-Server-Timing: 1)
+    AUTHORCOLAB_METRICAS_DIR    directorio compartido por los procesos (por defecto ninguno)
+"""
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+SERVER_TIMING = os.environ.get('AUTHORCOLAB_SERVER_TIMING', '0') == '1'
+DIR_METRICAS = os.environ.get('AUTHORCOLAB_METRICAS_DIR') or None
+# Intervalo del hilo que publica las métricas de cada proceso (si hubo peticiones)
+SEGUNDOS_ENTRE_PUBLICACIONES = 1.0
+
+# Límites superiores de los buckets (segundos, y consultas a MongoDB por petición)
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 25, 50, 100, 250, float('inf'))
+
+_medicion = contextvars.ContextVar('medicion', default=None)
+
+
+class MedicionPeticion:
+    """Tiempos por etapa, consultas a MongoDB y uso de caches de una petición (segura entre hilos)"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}  # nombre -> [segundos, veces], en el orden en que aparecen
+        self.consultas_mongo = 0
+        self.segundos_mongo = 0.0
+        self.cache = {}   # nombre -> [aciertos, fallos]
+        self.hilos = {}   # ident del hilo -> etapas abiertas en él (ver perfilado.py)
+        self._lock = threading.Lock()
+
+    def entrar_hilo(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self.hilos[ident] = self.hilos.get(ident, 0) + 1
+
+    def salir_hilo(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self.hilos[ident] -= 1
+
+    def hilos_activos(self):
+        """Hilos que están dentro de una etapa de la petición (el fan-out por países, p. ej.)"""
+        with self._lock:
+            return [ident for ident, abiertas in self.hilos.items() if abiertas > 0]
+
+    def sumar_etapa(self, nombre, segundos):
+        with self._lock:
+            etapa = self.etapas.setdefault(nombre, [0.0, 0])
+            etapa[0] += segundos
+            etapa[1] += 1
+
+    def sumar_consulta_mongo(self, segundos):
+        with self._lock:
+            self.consultas_mongo += 1
+            self.segundos_mongo += segundos
+
+    def sumar_cache(self, nombre, acierto):
+        with self._lock:
+            self.cache.setdefault(nombre, [0, 0])[0 if acierto else 1] += 1
+
+    def resumen(self):
+        """(segundos de cada etapa, consultas a MongoDB, segundos en MongoDB)"""
+        with self._lock:
+            etapas = {nombre: segundos for nombre, (segundos, _) in self.etapas.items()}
+            return etapas, self.consultas_mongo, self.segundos_mongo
+
+    def server_timing(self):
+        """
+        Valor de la cabecera Server-Timing: una entrada por etapa, otra para MongoDB
+        y el total hasta ahora. Las etapas pueden anidarse, así que no suman el total.
+        """
+        with self._lock:
+            entradas = [f'{nombre};dur={segundos * 1000:.1f}' for nombre, (segundos, _) in self.etapas.items()]
+            entradas.append(f'mongo;desc="{self.consultas_mongo} consultas";dur={self.segundos_mongo * 1000:.1f}')
+            for nombre, (aciertos, fallos) in self.cache.items():
+                entradas.append(f'cache_{nombre};desc="{aciertos} aciertos, {fallos} fallos"')
+        entradas.append(f'total;dur={(time.perf_counter() - self.inicio) * 1000:.1f}')
+        return ', '.join(entradas)
+
+
+def iniciar_medicion():
+    medicion = MedicionPeticion()
+    _medicion.set(medicion)
+    return medicion
+
+
+def terminar_medicion():
+    _medicion.set(None)
+
+
+def medicion_actual():
+    return _medicion.get()
+
+
+@contextmanager
+def etapa(nombre):
+    """Suma la duración del bloque a la etapa 'nombre' de la petición en curso"""
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+    medicion.entrar_hilo()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar_etapa(nombre, time.perf_counter() - inicio)
+        medicion.salir_hilo()
+
+
+def registrar_consulta_mongo(segundos):
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.sumar_consulta_mongo(segundos)
+
+
+def registrar_cache(nombre, acierto):
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.sumar_cache(nombre, acierto)
+
+
+def _valor(numero):
+    return '+Inf' if numero == float('inf') else repr(float(numero))
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ''
+    texto = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pares)
+    return '{' + texto + '}'
+
+
+class Histograma:
+    """Histograma acumulado al estilo de Prometheus, con una serie por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda, buckets, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        self.etiquetas = etiquetas
+        self._series = {}  # valores de las etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        with self._lock:
+            serie = self._serie(etiquetas)
+            serie[0][bisect_left(self.buckets, valor)] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def _serie(self, etiquetas):
+        serie = self._series.get(etiquetas)
+        if serie is None:
+            serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+        return serie
+
+    def estado(self):
+        """Series en forma serializable: [[valores de las etiquetas, conteos, suma, total], ...]"""
+        with self._lock:
+            return [[list(clave), list(conteos), suma, total] for clave, (conteos, suma, total) in self._series.items()]
+
+    def vacio(self):
+        """Histograma sin series, con el mismo nombre, buckets y etiquetas"""
+        return Histograma(self.nombre, self.ayuda, self.buckets, self.etiquetas)
+
+    def sumar(self, estado):
+        """Suma las series de estado() de otro proceso"""
+        with self._lock:
+            for clave, conteos, suma, total in estado:
+                serie = self._serie(tuple(clave))
+                serie[0] = [a + b for a, b in zip(serie[0], conteos)]
+                serie[1] += suma
+                serie[2] += total
+
+    def exponer(self):
+        with self._lock:
+            series = {clave: (list(conteos), suma, total) for clave, (conteos, suma, total) in self._series.items()}
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        for valores, (conteos, suma, total) in sorted(series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, [("le", _valor(limite))])} {acumulado}')
+            lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {suma!r}')
+            lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {total}')
+        return lineas
+
+
+def _contador(nombre, ayuda, tipo, etiquetas, valores):
+    """Líneas de una métrica simple (counter o gauge): valores es [(valores de etiquetas, número)]"""
+    lineas = [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+    lineas.extend(f'{nombre}{_etiquetas(etiquetas, clave)} {numero!r}' for clave, numero in valores)
+    return lineas
+
+
+def _sumar_caches(estadisticas):
+    """Estadísticas de las caches de varios procesos: aciertos, fallos y bytes sumados"""
+    suma = {}
+    for caches in estadisticas:
+        for nombre, stats in caches.items():
+            total = suma.setdefault(nombre, {'aciertos': 0, 'fallos': 0, 'bytes': 0})
+            for campo in total:
+                total[campo] += stats[campo]
+    for total in suma.values():
+        consultas = total['aciertos'] + total['fallos']
+        total['tasa_aciertos'] = total['aciertos'] / consultas if consultas else 0.0
+    return suma
+
+
+class Metricas:
+    """Histogramas de las peticiones terminadas, por ruta (la regla de Flask, no la URL) y etapa"""
+
+    def __init__(self, directorio=DIR_METRICAS):
+        self.directorio = directorio
+        # Función sin argumentos que devuelve las estadísticas de las caches (la fija el backend)
+        self.fuente_caches = None
+        self._archivo = None
+        self._pid = None
+        self._pid_publicador = None
+        self._pendiente = False
+        self._lock_publicacion = threading.Lock()
+        self.peticiones = Histograma(
+            'authorcolab_peticion_segundos', 'Duración de las peticiones, hasta enviar el último byte',
+            BUCKETS_SEGUNDOS, ('metodo', 'ruta', 'estado')
+        )
+        self.etapas = Histograma(
+            'authorcolab_etapa_segundos', 'Tiempo de cada etapa dentro de una petición',
+            BUCKETS_SEGUNDOS, ('ruta', 'etapa')
+        )
+        self.consultas_mongo = Histograma(
+            'authorcolab_consultas_mongo_por_peticion', 'Consultas a MongoDB de cada petición',
+            BUCKETS_CONSULTAS, ('ruta',)
+        )
+        self.segundos_mongo = Histograma(
+            'authorcolab_mongo_segundos_por_peticion', 'Tiempo en MongoDB de cada petición',
+            BUCKETS_SEGUNDOS, ('ruta',)
+        )
+
+    def registrar(self, medicion, metodo, ruta, estado):
+        self.peticiones.observar(time.perf_counter() - medicion.inicio, metodo, ruta, str(estado))
+        etapas, consultas, segundos_mongo = medicion.resumen()
+        for nombre, segundos in etapas.items():
+            self.etapas.observar(segundos, ruta, nombre)
+        self.consultas_mongo.observar(consultas, ruta)
+        self.segundos_mongo.observar(segundos_mongo, ruta)
+        if self.directorio:
+            self._pendiente = True
+            self._iniciar_publicador()
+
+    def _iniciar_publicador(self):
+        """Hilo que publica lo registrado cada SEGUNDOS_ENTRE_PUBLICACIONES (uno por proceso)"""
+        if self._pid_publicador == os.getpid():
+            return
+        with self._lock_publicacion:
+            # Los hilos no sobreviven a un fork: cada worker inicia el suyo
+            if self._pid_publicador == os.getpid():
+                return
+            self._pid_publicador = os.getpid()
+
+        def publicar_pendientes():
+            while True:
+                time.sleep(SEGUNDOS_ENTRE_PUBLICACIONES)
+                if self._pendiente:
+                    self.publicar()
+
+        threading.Thread(target=publicar_pendientes, name='publicar-metricas', daemon=True).start()
+
+    def _histogramas(self):
+        return (self.peticiones, self.etapas, self.consultas_mongo, self.segundos_mongo)
+
+    def publicar(self):
+        """Escribe las series de este proceso en su archivo de 'directorio'"""
+        if not self.directorio:
+            return
+        with self._lock_publicacion:
+            if self._pid != os.getpid():
+                # Un archivo por proceso; tras un fork (workers de gunicorn) el hijo usa uno nuevo
+                self._pid = os.getpid()
+                self._archivo = os.path.join(self.directorio, f'metricas_{self._pid}_{time.time_ns()}.json')
+            self._pendiente = False
+            estado = {
+                'histogramas': {h.nombre: h.estado() for h in self._histogramas()},
+                'caches': self.fuente_caches() if self.fuente_caches else {}
+            }
+            try:
+                os.makedirs(self.directorio, exist_ok=True)
+                temporal = f'{self._archivo}.tmp'
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(estado, f)
+                os.replace(temporal, self._archivo)
+            except OSError:
+                pass  # Las métricas no deben hacer fallar una petición ni el hilo que las publica
+
+    def _estados_publicados(self):
+        estados = []
+        for ruta in glob.glob(os.path.join(self.directorio, 'metricas_*.json')):
+            try:
+                with open(ruta, encoding='utf-8') as f:
+                    estados.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Un worker que termina entre el glob y la lectura
+        return estados
+
+    def exponer(self, caches=None):
+        """
+        Texto para /metrics. 'caches' son las estadísticas de cada cache de resultados
+        ({nombre: {'aciertos', 'fallos', 'tasa_aciertos', ...}}), acumuladas desde el arranque.
+        Con 'directorio', las series y las caches son la suma de todos los procesos.
+        """
+        histogramas = self._histogramas()
+        estados = []
+        if self.directorio:
+            self.publicar()
+            estados = self._estados_publicados()
+        if estados:
+            histogramas = [h.vacio() for h in histogramas]
+            for estado in estados:
+                for histograma in histogramas:
+                    histograma.sumar(estado['histogramas'].get(histograma.nombre, []))
+            caches = _sumar_caches(estado['caches'] for estado in estados) if caches is not None else None
+        lineas = []
+        for histograma in histogramas:
+            lineas.extend(histograma.exponer())
+        if caches:
+            lineas.extend(_contador(
+                'authorcolab_cache_consultas_total', 'Consultas a cada cache de resultados', 'counter',
+                ('cache', 'resultado'),
+                [((nombre, resultado), stats[campo]) for nombre, stats in sorted(caches.items())
+                 for resultado, campo in (('acierto', 'aciertos'), ('fallo', 'fallos'))]
+            ))
+            lineas.extend(_contador(
+                'authorcolab_cache_tasa_aciertos', 'Aciertos / consultas de cada cache de resultados', 'gauge',
+                ('cache',), [((nombre,), stats['tasa_aciertos']) for nombre, stats in sorted(caches.items())]
+            ))
+            lineas.extend(_contador(
+                'authorcolab_cache_bytes', 'Bytes estimados en cada cache de resultados', 'gauge',
+                ('cache',), [((nombre,), stats['bytes']) for nombre, stats in sorted(caches.items())]
+            ))
+        return '\n'.join(lineas) + '\n'
+
+
+metricas = Metricas()
@@ -0,0 +1,17 @@
+"""
+Punto de entrada WSGI para producción.
+
+Importar este módulo carga todo el backend (modelo, PCA, autores, matrices) y
+precarga lo que normalmente se construye en la primera petición. Con
+preload_app = True (gunicorn.conf.py) esto ocurre una sola vez en el master y los
+workers heredan la memoria por copy-on-write.
+
+Uso (desde la raíz del proyecto):
+
+    gunicorn -c Backend/gunicorn.conf.py
+"""
+import backend_final7
+
+backend_final7.precargar()
+
+app = backend_final7.app